@@ -1,8 +1,57 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
 
 from . import models
 
+# Below this many (estimated) rows the exact COUNT(*) is cheap enough to keep.
+ESTIMATED_COUNT_THRESHOLD = 50_000
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses the planner's row estimate (pg_class.reltuples) for unfiltered changelists
+    on large PostgreSQL tables instead of a full COUNT(*).
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [queryset.model._meta.db_table])
+                row = cursor.fetchone()
+            if row and row[0] >= ESTIMATED_COUNT_THRESHOLD:
+                return int(row[0])
+        return super().count
+
+
+class ClinicalModelAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    list_select_related = ('patient',)
+    autocomplete_fields = ('patient', 'professional')
+    # Prefix/exact lookups only, see get_search_results; icontains can't use an index.
+    search_fields = ('patient__search_name__startswith',)
+
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Matches the whole term against each search field. search_name lookups get the
+        term through normalize_name, so names match regardless of case and accents.
+        """
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        name_term = models.normalize_name(search_term)
+        matches = Q()
+        for lookup in self.get_search_fields(request):
+            matches |= Q(**{lookup: name_term if lookup.endswith('search_name__startswith') else search_term})
+        return queryset.filter(matches), False
+
 
 @admin.register(models.Professional)
 class ProfessionalAdmin(UserAdmin):
@@ -11,6 +60,7 @@ class ProfessionalAdmin(UserAdmin):
     list_filter = ('profession', 'is_active', 'is_staff')
     ordering = ('email',)
     search_fields = ('email', 'full_name', 'crp', 'institution')
+    show_full_result_count = False
     fieldsets = UserAdmin.fieldsets + (
         (
             'Informações Profissionais',
@@ -20,63 +70,70 @@ class ProfessionalAdmin(UserAdmin):
 
 
 @admin.register(models.Patient)
-class PatientAdmin(admin.ModelAdmin):
+class PatientAdmin(ClinicalModelAdmin):
     list_display = ('full_name', 'professional', 'birth_date', 'active')
-    search_fields = ('full_name', 'professional__full_name')
+    list_select_related = ('professional',)
+    autocomplete_fields = ('professional',)
+    search_fields = ('search_name__startswith',)
     list_filter = ('active', 'sex')
 
 
 @admin.register(models.Assessment)
-class AssessmentAdmin(admin.ModelAdmin):
+class AssessmentAdmin(ClinicalModelAdmin):
     list_display = ('patient', 'scale', 'application_date', 'score_total')
-    list_filter = ('scale', 'application_date')
-    search_fields = ('patient__full_name',)
+    list_filter = ('scale',)
+    date_hierarchy = 'application_date'
 
 
 @admin.register(models.DiagnosticAssessment)
-class DiagnosticAssessmentAdmin(admin.ModelAdmin):
-    list_display = ('patient', 'functional_level', 'score_total', 'created_at')
-    list_filter = ('functional_level', 'created_at')
-    search_fields = ('patient__full_name', 'professional__full_name')
+class DiagnosticAssessmentAdmin(ClinicalModelAdmin):
+    list_display = ('patient', 'professional', 'functional_level', 'score_total', 'created_at')
+    list_select_related = ('patient', 'professional')
+    list_filter = ('functional_level',)
+    date_hierarchy = 'created_at'
 
 
 @admin.register(models.TherapeuticPlan)
-class TherapeuticPlanAdmin(admin.ModelAdmin):
+class TherapeuticPlanAdmin(ClinicalModelAdmin):
     list_display = ('patient', 'start_date', 'next_review_date')
-    search_fields = ('patient__full_name',)
+    date_hierarchy = 'next_review_date'
 
 
 @admin.register(models.Session)
-class SessionAdmin(admin.ModelAdmin):
+class SessionAdmin(ClinicalModelAdmin):
     list_display = ('patient', 'session_type', 'session_date', 'duration_minutes')
-    list_filter = ('session_type', 'session_date')
-    search_fields = ('patient__full_name',)
+    # On the largest tables date_hierarchy's SELECT DISTINCT over every row is too slow;
+    # DateFieldListFilter only issues indexed range filters.
+    list_filter = ('session_type', ('session_date', admin.DateFieldListFilter))
 
 
 @admin.register(models.Report)
-class ReportAdmin(admin.ModelAdmin):
+class ReportAdmin(ClinicalModelAdmin):
     list_display = ('patient', 'report_type', 'generated_at')
-    list_filter = ('report_type', 'generated_at')
-    search_fields = ('patient__full_name',)
+    list_filter = ('report_type',)
+    date_hierarchy = 'generated_at'
 
 
 @admin.register(models.SatisfactionSurvey)
-class SatisfactionSurveyAdmin(admin.ModelAdmin):
+class SatisfactionSurveyAdmin(ClinicalModelAdmin):
     list_display = ('patient', 'conducted_at', 'engagement_index')
-    list_filter = ('conducted_at',)
-    search_fields = ('patient__full_name',)
+    date_hierarchy = 'conducted_at'
 
 
 @admin.register(models.FamilySession)
-class FamilySessionAdmin(admin.ModelAdmin):
+class FamilySessionAdmin(ClinicalModelAdmin):
     list_display = ('patient', 'session_date', 'topic', 'follow_up_date')
-    search_fields = ('patient__full_name', 'topic')
+    search_fields = ('patient__search_name__startswith', 'topic__startswith')
+    date_hierarchy = 'session_date'
 
 
 @admin.register(models.AuditLog)
-class AuditLogAdmin(admin.ModelAdmin):
-    list_display = ('action', 'entity', 'entity_id', 'created_at')
-    search_fields = ('action', 'entity', 'entity_id')
+class AuditLogAdmin(ClinicalModelAdmin):
+    list_display = ('action', 'entity', 'entity_id', 'professional', 'created_at')
+    list_select_related = ('professional',)
+    autocomplete_fields = ('professional',)
+    search_fields = ('entity_id__exact', 'action__exact', 'entity__exact')
+    list_filter = (('created_at', admin.DateFieldListFilter),)
 
 
 admin.site.site_header = 'TEA Care • Painel Administrativo'
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class ClinicalConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'clinical'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+
+        from core.sqlite import apply_sqlite_pragmas
+
+        from . import signals  # noqa: F401
+
+        connection_created.connect(apply_sqlite_pragmas, dispatch_uid='sqlite-high-concurrency')
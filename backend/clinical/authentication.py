@@ -0,0 +1,79 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from core.caching import cache_is_shared
+from core.instrumentation import timed
+
+
+def user_cache_enabled():
+    """
+    Only cache users in a cache every worker shares: with a per-process LocMem
+    cache an invalidation would reach one worker while the others keep the old user.
+    """
+    return settings.JWT_USER_CACHE_TIMEOUT > 0 and cache_is_shared()
+
+
+def user_version_key(user_id):
+    return f'jwt-user-version:{user_id}'
+
+
+def user_cache_key(user_id, version):
+    return f'jwt-user:{user_id}:{version}'
+
+
+def get_user_version(user_id):
+    version = cache.get(user_version_key(user_id))
+    if version is None:
+        cache.add(user_version_key(user_id), 1, timeout=None)
+        version = cache.get(user_version_key(user_id), 1)
+    return version
+
+
+def invalidate_cached_user(user_id):
+    """Bump the user's version stamp so every cached copy keyed on the old stamp is ignored."""
+    if not user_cache_enabled():
+        return
+    try:
+        cache.incr(user_version_key(user_id))
+    except ValueError:
+        cache.set(user_version_key(user_id), 2, timeout=None)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication that keeps the resolved Professional in the cache for a
+    short TTL instead of loading it from the database on every request, when
+    the cache is shared (see user_cache_enabled).
+    """
+
+    def authenticate(self, request):
+        with timed('auth'):
+            return super().authenticate(request)
+
+    def get_user(self, validated_token):
+        if not user_cache_enabled():
+            return super().get_user(validated_token)
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        key = user_cache_key(user_id, get_user_version(user_id))
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            cache.set(key, user, settings.JWT_USER_CACHE_TIMEOUT)
+            return user
+
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code='password_changed')
+        return user
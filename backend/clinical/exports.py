@@ -0,0 +1,139 @@
+import csv
+import hashlib
+import io
+import json
+import zlib
+from datetime import timedelta, timezone as dt_timezone
+
+from django.apps import apps
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+EXPORT_FORMATS = ('ndjson', 'csv')
+EXCLUDED_COLUMNS = {'password'}
+# Rows committed by transactions that were still open when the previous export
+# read the table can carry an updated_at slightly older than its max_updated_at;
+# re-exporting this window keeps them from being skipped. Consumers upsert by
+# DEDUPE_KEY, so the repeated rows are harmless.
+SINCE_OVERLAP = timedelta(seconds=5)
+DEDUPE_KEY = 'id'
+# Derived from other tables (rebuild_search_index recreates it).
+EXCLUDED_MODELS = {'searchdocument'}
+
+
+def export_models():
+    return [
+        model for model in apps.get_app_config('clinical').get_models() if model._meta.model_name not in EXCLUDED_MODELS
+    ]
+
+
+def get_export_model(table):
+    for model in export_models():
+        if model._meta.db_table == table or model._meta.model_name == table:
+            return model
+    return None
+
+
+def export_columns(model):
+    return [field.attname for field in model._meta.concrete_fields if field.attname not in EXCLUDED_COLUMNS]
+
+
+def parse_since(value):
+    """Aware datetime from an ISO 8601 string; ValueError when malformed or out of range."""
+    since = parse_datetime(value)
+    if since is None:
+        raise ValueError(value)
+    try:
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since)
+        # export_queryset subtracts the overlap and the database stores UTC; both must fit in datetime.
+        (since - SINCE_OVERLAP).astimezone(dt_timezone.utc)
+        since.astimezone(dt_timezone.utc)
+    except OverflowError:
+        raise ValueError(value) from None
+    return since
+
+
+def supports_since(model):
+    return any(field.name == 'updated_at' for field in model._meta.concrete_fields)
+
+
+def export_queryset(model, since=None):
+    queryset = model.objects.all()
+    if since is not None and supports_since(model):
+        queryset = queryset.filter(updated_at__gt=since - SINCE_OVERLAP)
+    return queryset.order_by('pk').values_list(*export_columns(model))
+
+
+def iter_lines(model, export_format, rows):
+    columns = export_columns(model)
+    if export_format == 'ndjson':
+        for row in rows:
+            yield json.dumps(dict(zip(columns, row)), cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+        return
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow(
+            json.dumps(value, cls=DjangoJSONEncoder, ensure_ascii=False) if isinstance(value, (dict, list)) else value
+            for value in row
+        )
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+def gzip_stream(lines, flush_bytes=64 * 1024):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    pending = []
+    pending_size = 0
+    for line in lines:
+        data = line.encode('utf-8')
+        pending.append(data)
+        pending_size += len(data)
+        if pending_size >= flush_bytes:
+            chunk = compressor.compress(b''.join(pending))
+            pending = []
+            pending_size = 0
+            if chunk:
+                yield chunk
+    chunk = compressor.compress(b''.join(pending)) + compressor.flush()
+    if chunk:
+        yield chunk
+
+
+def write_export(model, path, export_format, since=None, chunk_size=2000):
+    """Stream one table into a gzip file and return its manifest entry."""
+    digest = hashlib.sha256()
+    stats = {'rows': 0, 'max_updated_at': since}
+    updated_at_index = export_columns(model).index('updated_at') if supports_since(model) else None
+
+    def counted_rows():
+        for row in export_queryset(model, since).iterator(chunk_size=chunk_size):
+            stats['rows'] += 1
+            if updated_at_index is not None:
+                updated_at = row[updated_at_index]
+                if stats['max_updated_at'] is None or updated_at > stats['max_updated_at']:
+                    stats['max_updated_at'] = updated_at
+            yield row
+
+    with path.open('wb') as handle:
+        for chunk in gzip_stream(iter_lines(model, export_format, counted_rows())):
+            digest.update(chunk)
+            handle.write(chunk)
+
+    max_updated_at = stats['max_updated_at']
+    return {
+        'file': path.name,
+        'format': export_format,
+        'rows': stats['rows'],
+        'sha256': digest.hexdigest(),
+        'since': since.isoformat() if since else None,
+        'overlap_seconds': SINCE_OVERLAP.total_seconds() if since else 0,
+        'dedupe_key': DEDUPE_KEY,
+        'max_updated_at': max_updated_at.isoformat() if max_updated_at else None,
+    }
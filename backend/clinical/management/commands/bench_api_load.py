@@ -0,0 +1,196 @@
+import json
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.request
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.models import Count
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from clinical.models import DiagnosticAssessment, Patient, Professional
+
+
+def percentile(latencies, pct):
+    if not latencies:
+        return None
+    if len(latencies) == 1:
+        return latencies[0]
+    return statistics.quantiles(latencies, n=100, method='inclusive')[pct - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark de carga ponta a ponta da API: clientes concorrentes chamando listagem e detalhe de "
+        "pacientes, linha do tempo, dashboard e PDF diagnostico, com p50/p95/p99 e vazao em JSON. "
+        "Usa o test client do Django ou, com --base-url, um servidor local. Gere dados com seed_synthetic."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', help='Profissional usado nas requisicoes (padrao: o que tem mais pacientes).')
+        parser.add_argument('--concurrency', type=int, default=4, help='Clientes simultaneos.')
+        parser.add_argument('--requests', type=int, default=50, help='Requisicoes por endpoint.')
+        parser.add_argument('--base-url', help='URL de um servidor em execucao (ex.: http://127.0.0.1:8000).')
+        parser.add_argument('--skip-pdf', action='store_true', help='Nao inclui a geracao de PDF.')
+        parser.add_argument('--output', help='Arquivo onde o JSON do resultado sera gravado.')
+
+    def handle(self, *args, **options):
+        professional = self.get_professional(options['email'])
+        patient_ids = list(Patient.objects.filter(professional=professional).values_list('pk', flat=True)[:200])
+        if not patient_ids:
+            raise CommandError('O profissional nao possui pacientes. Rode seed_synthetic antes.')
+        diagnostic_ids = list(
+            DiagnosticAssessment.objects.filter(professional=professional).values_list('pk', flat=True)[:200]
+        )
+
+        endpoints = {
+            'patient-list': lambda index: '/api/patients/',
+            'patient-detail': lambda index: f'/api/patients/{patient_ids[index % len(patient_ids)]}/',
+            'patient-timeline': lambda index: f'/api/patients/{patient_ids[index % len(patient_ids)]}/timeline/',
+            'dashboard': lambda index: '/api/dashboard/',
+        }
+        if diagnostic_ids and not options['skip_pdf']:
+            endpoints['diagnostic-assessment-pdf'] = (
+                lambda index: f'/api/assessment/diagnostic/{diagnostic_ids[index % len(diagnostic_ids)]}/pdf/'
+            )
+
+        token = str(RefreshToken.for_user(professional).access_token)
+        fetch = self.live_fetcher(options['base_url'], token) if options['base_url'] else self.client_fetcher(token)
+
+        results = {}
+        started_at = time.perf_counter()
+        for name, build_path in endpoints.items():
+            results[name] = self.run_endpoint(fetch, build_path, options['requests'], options['concurrency'])
+            self.stderr.write(
+                f"{name}: p50={results[name]['p50_ms']}ms p95={results[name]['p95_ms']}ms "
+                f"{results[name]['throughput_rps']} req/s"
+            )
+        elapsed = time.perf_counter() - started_at
+
+        total_requests = sum(result['requests'] for result in results.values())
+        report = {
+            'mode': 'live-server' if options['base_url'] else 'test-client',
+            'base_url': options['base_url'],
+            'professional': professional.email,
+            'concurrency': options['concurrency'],
+            'requests_per_endpoint': options['requests'],
+            'endpoints': results,
+            'total': {
+                'requests': total_requests,
+                'errors': sum(result['errors'] for result in results.values()),
+                'elapsed_s': round(elapsed, 3),
+                'throughput_rps': round(total_requests / elapsed, 2),
+            },
+        }
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            Path(options['output']).write_text(output)
+        self.stdout.write(output)
+
+    def get_professional(self, email):
+        if email:
+            professional = Professional.objects.filter(email=email).first()
+            if professional is None:
+                raise CommandError(f'Profissional nao encontrado: {email}')
+            return professional
+        top = (
+            Patient.objects.values('professional')
+            .annotate(total=Count('pk'))
+            .order_by('-total')
+            .first()
+        )
+        if top is None:
+            raise CommandError('Nenhum paciente cadastrado. Rode seed_synthetic antes.')
+        return Professional.objects.get(pk=top['professional'])
+
+    def client_fetcher(self, token):
+        local = threading.local()
+
+        def fetch(path):
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = APIClient()
+                client.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+            response = client.get(path)
+            # Consome o corpo de respostas em streaming (PDF) para medir a geracao completa.
+            body = b''.join(response.streaming_content) if response.streaming else response.content
+            return response.status_code, len(body)
+
+        return fetch
+
+    def live_fetcher(self, base_url, token):
+        base_url = base_url.rstrip('/')
+
+        def fetch(path):
+            request = urllib.request.Request(base_url + path, headers={'Authorization': f'Bearer {token}'})
+            try:
+                with urllib.request.urlopen(request, timeout=60) as response:
+                    return response.status, len(response.read())
+            except urllib.error.HTTPError as exc:
+                return exc.code, 0
+
+        return fetch
+
+    def run_endpoint(self, fetch, build_path, total, concurrency):
+        latencies = []
+        errors = 0
+        response_bytes = 0
+        lock = threading.Lock()
+        counter = iter(range(total))
+
+        def worker():
+            nonlocal errors, response_bytes
+            try:
+                while True:
+                    with lock:
+                        index = next(counter, None)
+                    if index is None:
+                        return
+                    request_started_at = time.perf_counter()
+                    try:
+                        status_code, size = fetch(build_path(index))
+                    except Exception:
+                        status_code, size = 0, 0
+                    latency = (time.perf_counter() - request_started_at) * 1000
+                    with lock:
+                        latencies.append(latency)
+                        response_bytes += size
+                        if status_code >= 400 or status_code == 0:
+                            errors += 1
+            finally:
+                connections.close_all()
+
+        started_at = time.perf_counter()
+        threads = [threading.Thread(target=worker) for _index in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started_at
+
+        if not latencies:
+            # Nenhuma requisicao medida (--requests 0 ou todos os clientes falharam antes de chamar a API).
+            return {
+                'requests': 0,
+                'errors': errors,
+                'p50_ms': None,
+                'p95_ms': None,
+                'p99_ms': None,
+                'max_ms': None,
+                'throughput_rps': 0.0,
+                'avg_response_bytes': None,
+            }
+        return {
+            'requests': len(latencies),
+            'errors': errors,
+            'p50_ms': round(percentile(latencies, 50), 2),
+            'p95_ms': round(percentile(latencies, 95), 2),
+            'p99_ms': round(percentile(latencies, 99), 2),
+            'max_ms': round(max(latencies), 2),
+            'throughput_rps': round(len(latencies) / elapsed, 2),
+            'avg_response_bytes': round(response_bytes / len(latencies)),
+        }
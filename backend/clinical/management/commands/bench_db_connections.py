@@ -0,0 +1,63 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connection
+from django.db.backends.signals import connection_created
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o custo de conexao com o banco por requisicao simulando o ciclo request_started/"
+        "request_finished do Django com conexoes nao persistentes, persistentes e a configuracao atual. "
+        "Use com um PostgreSQL local descartavel (DATABASE_URL) ou com o SQLite de desenvolvimento."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=300, help='Requisicoes simuladas por modo.')
+
+    def handle(self, *args, **options):
+        settings_dict = connection.settings_dict
+        configured = (settings_dict.get('CONN_MAX_AGE', 0), settings_dict.get('CONN_HEALTH_CHECKS', False))
+        modes = [
+            ('sem persistencia (CONN_MAX_AGE=0)', 0, False),
+            ('persistente + health check', 600, True),
+            (f'configurado (CONN_MAX_AGE={configured[0]})', *configured),
+        ]
+
+        self.stdout.write(f"Banco: {connection.vendor} ({settings_dict.get('NAME')}), {options['requests']} requisicoes por modo")
+        self.stdout.write(f"{'modo':<40} {'conexoes':>9} {'media(ms)':>10} {'p95(ms)':>9}")
+        try:
+            for label, max_age, health_checks in modes:
+                connection.close()
+                settings_dict['CONN_MAX_AGE'] = max_age
+                settings_dict['CONN_HEALTH_CHECKS'] = health_checks
+                opened, latencies = self.run_requests(options['requests'])
+                p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+                self.stdout.write(f'{label:<40} {opened:>9} {statistics.mean(latencies):>10.3f} {p95:>9.3f}')
+        finally:
+            connection.close()
+            settings_dict['CONN_MAX_AGE'], settings_dict['CONN_HEALTH_CHECKS'] = configured
+
+    def run_requests(self, total):
+        opened = 0
+
+        def count_connection(sender, **kwargs):
+            nonlocal opened
+            opened += 1
+
+        connection_created.connect(count_connection)
+        latencies = []
+        try:
+            for _index in range(total):
+                started_at = time.perf_counter()
+                request_started.send(sender=self.__class__)
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+                request_finished.send(sender=self.__class__)
+                latencies.append((time.perf_counter() - started_at) * 1000)
+        finally:
+            connection_created.disconnect(count_connection)
+        return opened, latencies
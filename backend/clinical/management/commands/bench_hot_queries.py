@@ -0,0 +1,163 @@
+import io
+import json
+import statistics
+import time
+from datetime import date, timedelta
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from clinical import models
+from clinical.management.commands.send_review_reminders import Command as ReminderCommand
+from clinical.search import patient_typeahead
+from core.slow_queries import explain_query
+
+# Indexes kept for the hot paths (migrations 0012 and 0014); dropped for the "sem indice" run.
+HOT_PATH_INDEXES = {
+    models.Assessment: ('clinical_assessment_prof_idx',),
+    models.DiagnosticAssessment: ('clinical_diagnostic_list_idx',),
+    models.Session: ('clinical_session_prof_idx',),
+}
+
+
+def hot_queries(professional, patient):
+    """The queries behind the dashboard, the reminder job and the nested lists, as the views issue them."""
+    today = date.today()
+    sessions = models.Session.objects.filter(professional=professional)
+
+    def child_list(model):
+        return lambda: list(model.objects.filter(patient=patient, professional=professional)[:20])
+
+    return {
+        'dashboard: pacientes ativos': lambda: models.Patient.objects.filter(professional=professional, active=True).count(),
+        'dashboard: escalas do mes': lambda: models.Assessment.objects.filter(
+            professional=professional, application_date__gte=today.replace(day=1)
+        ).count(),
+        'dashboard: ultimas sessoes': lambda: list(sessions.select_related('patient').order_by('-session_date')[:12]),
+        'dashboard: adesao 6 meses': lambda: sessions.filter(session_date__gte=today - timedelta(days=180)).count(),
+        'dashboard: reavaliacoes pendentes': lambda: models.Patient.objects.filter(
+            professional=professional, active=True, therapeutic_plan__next_review_date__lt=today
+        ).count(),
+        'lembretes: PTS a revisar': lambda: list(
+            ReminderCommand().pending_plans(today, today + timedelta(days=3))
+        ),
+        'pacientes ativos: busca': lambda: list(
+            patient_typeahead(models.Patient.objects.filter(professional=professional, active=True), 'ana')[:20]
+        ),
+        'lista: escalas do paciente': child_list(models.Assessment),
+        'lista: sessoes do paciente': child_list(models.Session),
+        'lista: relatorios do paciente': child_list(models.Report),
+        'lista: pesquisas do paciente': child_list(models.SatisfactionSurvey),
+        'lista: acoes com familias': child_list(models.FamilySession),
+        'lista: avaliacoes diagnosticas': lambda: list(
+            models.DiagnosticAssessment.objects.filter(professional=professional).order_by('-created_at')[:20]
+        ),
+    }
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark das queries quentes (dashboard, lembretes, listas aninhadas) com e sem os indices "
+        "compostos/parciais: cria um banco descartavel, gera dados com seed_synthetic e mostra plano "
+        "(EXPLAIN) e latencia de cada query nos dois cenarios."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--professionals', type=int, default=10, help='Profissionais gerados.')
+        parser.add_argument('--patients', type=int, default=300, help='Pacientes por profissional.')
+        parser.add_argument('--sessions', type=int, default=40, help='Sessoes por paciente.')
+        parser.add_argument('--repeat', type=int, default=20, help='Execucoes de cada query por cenario.')
+        parser.add_argument('--seed', type=int, default=1, help='Semente do seed_synthetic.')
+        parser.add_argument('--json', action='store_true', help='Emite o resultado em JSON.')
+
+    def handle(self, *args, **options):
+        # Banco de teste do Django: nada e gravado no banco configurado.
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            results = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2, ensure_ascii=False))
+            return
+        self.stdout.write(f"{'query':<36} {'sem indice':>11} {'com indice':>11} {'ganho':>7}")
+        for name, result in results['queries'].items():
+            self.stdout.write(
+                f"{name:<36} {result['without_ms']:>9.3f}ms {result['with_ms']:>9.3f}ms {result['speedup']:>6.1f}x"
+            )
+        for name, result in results['queries'].items():
+            self.stdout.write(self.style.WARNING(f'\n{name}'))
+            self.stdout.write('  sem indice:')
+            for line in result['without_plan'].splitlines():
+                self.stdout.write(f'    {line}')
+            self.stdout.write('  com indice:')
+            for line in result['with_plan'].splitlines():
+                self.stdout.write(f'    {line}')
+
+    def run(self, options):
+        started_at = time.perf_counter()
+        call_command(
+            'seed_synthetic',
+            professionals=options['professionals'],
+            patients=options['patients'],
+            sessions=options['sessions'],
+            email_prefix='bench',
+            seed=options['seed'],
+            stdout=io.StringIO(),
+        )
+        self.analyze()
+        self.stderr.write(f'Dados gerados em {time.perf_counter() - started_at:.1f}s')
+
+        professional = models.Professional.objects.order_by('pk').first()
+        patient = models.Patient.objects.filter(professional=professional).order_by('pk').first()
+        queries = hot_queries(professional, patient)
+
+        with_index = {name: self.measure(query, options['repeat']) for name, query in queries.items()}
+        with connection.schema_editor() as editor:
+            for model, index in self.hot_path_indexes():
+                editor.remove_index(model, index)
+        self.analyze()
+        without_index = {name: self.measure(query, options['repeat']) for name, query in queries.items()}
+
+        return {
+            'vendor': connection.vendor,
+            'rows': {
+                model.__name__: model.objects.count()
+                for model in (models.Patient, models.Session, models.Assessment, models.Report)
+            },
+            'queries': {
+                name: {
+                    'with_ms': with_index[name][0],
+                    'without_ms': without_index[name][0],
+                    'speedup': round(without_index[name][0] / max(with_index[name][0], 0.001), 1),
+                    'with_plan': with_index[name][1],
+                    'without_plan': without_index[name][1],
+                }
+                for name in queries
+            },
+        }
+
+    def hot_path_indexes(self):
+        for model, names in HOT_PATH_INDEXES.items():
+            for index in model._meta.indexes:
+                if index.name in names:
+                    yield model, index
+
+    def analyze(self):
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def measure(self, query, repeat):
+        with CaptureQueriesContext(connection) as context:
+            query()
+        plan = explain_query(connection.alias, context.captured_queries[-1]['sql'], None)
+        timings = []
+        for _index in range(repeat):
+            started_at = time.perf_counter()
+            query()
+            timings.append((time.perf_counter() - started_at) * 1000)
+        return round(statistics.median(timings), 3), plan
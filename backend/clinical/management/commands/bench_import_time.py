@@ -0,0 +1,91 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+# Modules that must only be loaded on demand (e.g. when a PDF is rendered).
+LAZY_MODULES = ('reportlab',)
+
+STARTUP_TARGETS = {
+    'core.wsgi': [
+        '-c',
+        'import core.wsgi, django.urls; django.urls.get_resolver().url_patterns',
+    ],
+}
+
+COMMAND_TARGETS = (
+    'send_review_reminders',
+    'import_professionals',
+    'import_legacy_clinical',
+    'export_clinical',
+    'prune_tokens',
+)
+
+
+def parse_importtime(stderr):
+    """Return {module: (self_us, cumulative_us, depth)} from `python -X importtime` output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede o tempo de importacao (python -X importtime) da inicializacao do core.wsgi e dos comandos "
+        "de gerenciamento e falha se modulos pesados forem carregados sem necessidade ou se o orcamento for excedido."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--budget-ms',
+            type=float,
+            help='Falha se o tempo total de importacao de algum alvo exceder este valor (ms).',
+        )
+        parser.add_argument('--top', type=int, default=8, help='Quantidade de pacotes mais lentos exibidos por alvo.')
+
+    def handle(self, *args, **options):
+        targets = dict(STARTUP_TARGETS)
+        for command in COMMAND_TARGETS:
+            targets[f'manage.py {command}'] = ['manage.py', 'help', command]
+
+        failures = []
+        for label, arguments in targets.items():
+            modules = self.measure(arguments)
+            total_ms = sum(self_us for self_us, _cumulative, _depth in modules.values()) / 1000
+            self.stdout.write(f'{label}: {total_ms:.0f} ms em {len(modules)} modulo(s)')
+
+            top_level = sorted(
+                ((cumulative, name) for name, (_self_us, cumulative, depth) in modules.items() if depth == 0),
+                reverse=True,
+            )
+            for cumulative, name in top_level[:options['top']]:
+                self.stdout.write(f'    {cumulative / 1000:>8.1f} ms  {name}')
+
+            eager = sorted({name.split('.')[0] for name in modules if name.split('.')[0] in LAZY_MODULES})
+            if eager:
+                failures.append(f"{label} importa {', '.join(eager)} na inicializacao")
+            if options['budget_ms'] is not None and total_ms > options['budget_ms']:
+                failures.append(f"{label} excedeu o orcamento ({total_ms:.0f} ms > {options['budget_ms']:.0f} ms)")
+
+        if failures:
+            raise CommandError('; '.join(failures))
+        self.stdout.write(self.style.SUCCESS('Nenhum modulo pesado carregado na inicializacao.'))
+
+    def measure(self, arguments):
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', *arguments],
+            cwd=Path(settings.BASE_DIR),
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(f"Falha ao executar {' '.join(arguments)}: {result.stderr[-500:]}")
+        return parse_importtime(result.stderr)
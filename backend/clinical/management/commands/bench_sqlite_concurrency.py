@@ -0,0 +1,144 @@
+import multiprocessing
+import queue
+import tempfile
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connection, connections, transaction
+
+PROFILES = (
+    ('padrao', False),
+    ('alta-concorrencia', True),
+)
+
+
+def configure_profile(db_path, high_concurrency):
+    settings.SQLITE_HIGH_CONCURRENCY = high_concurrency
+    settings_dict = connection.settings_dict
+    settings_dict['NAME'] = str(db_path)
+    options = settings_dict.setdefault('OPTIONS', {})
+    if high_concurrency:
+        options['transaction_mode'] = 'IMMEDIATE'
+    else:
+        options.pop('transaction_mode', None)
+
+
+def run_writer(worker, db_path, high_concurrency, writes, start_event, results):
+    committed = 0
+    lock_errors = 0
+    error = None
+    started_at = time.perf_counter()
+    try:
+        configure_profile(db_path, high_concurrency)
+        start_event.wait()
+        started_at = time.perf_counter()
+        for index in range(writes):
+            try:
+                # Leitura seguida de escrita na mesma transacao, como em save() + log_audit.
+                with transaction.atomic():
+                    with connection.cursor() as cursor:
+                        cursor.execute('SELECT COUNT(*) FROM bench_write WHERE worker = %s', [worker])
+                        cursor.fetchone()
+                        cursor.execute(
+                            'INSERT INTO bench_write (worker, seq, payload) VALUES (%s, %s, %s)',
+                            [worker, index, 'x' * 200],
+                        )
+                committed += 1
+            except OperationalError as exc:
+                if 'locked' not in str(exc) and 'busy' not in str(exc):
+                    raise
+                lock_errors += 1
+        connection.close()
+    except Exception as exc:
+        error = f'{type(exc).__name__}: {exc}'
+    finally:
+        # Always report, or the parent would wait for this worker forever.
+        results.put((committed, lock_errors, time.perf_counter() - started_at, error))
+
+
+class Command(BaseCommand):
+    help = (
+        "Teste de estresse de escrita concorrente no SQLite: N processos gravando em paralelo num "
+        "arquivo temporario, comparando o perfil padrao com SQLITE_HIGH_CONCURRENCY (vazao e erros de lock)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=8, help='Processos escritores em paralelo.')
+        parser.add_argument('--writes', type=int, default=200, help='Transacoes de escrita por processo.')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('Este benchmark so se aplica ao SQLite.')
+
+        original_settings = dict(connection.settings_dict)
+        original_options = dict(connection.settings_dict.get('OPTIONS', {}))
+        original_profile = settings.SQLITE_HIGH_CONCURRENCY
+        workers = options['workers']
+        writes = options['writes']
+
+        self.stdout.write(f'{workers} processo(s) x {writes} escrita(s)')
+        self.stdout.write(f"{'perfil':<20} {'gravadas':>9} {'locks':>7} {'tempo(s)':>9} {'escritas/s':>11}")
+        try:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                for label, high_concurrency in PROFILES:
+                    db_path = Path(tmp_dir) / f'{label}.sqlite3'
+                    committed, lock_errors, elapsed = self.run_profile(db_path, high_concurrency, workers, writes)
+                    self.stdout.write(
+                        f'{label:<20} {committed:>9} {lock_errors:>7} {elapsed:>9.2f} {committed / elapsed:>11.0f}'
+                    )
+        finally:
+            connections.close_all()
+            connection.settings_dict.update(original_settings)
+            connection.settings_dict['OPTIONS'] = original_options
+            settings.SQLITE_HIGH_CONCURRENCY = original_profile
+
+    def run_profile(self, db_path, high_concurrency, workers, writes):
+        connections.close_all()
+        configure_profile(db_path, high_concurrency)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'CREATE TABLE bench_write (id INTEGER PRIMARY KEY, worker INTEGER, seq INTEGER, payload TEXT)'
+            )
+        # Os processos filhos abrem suas proprias conexoes.
+        connections.close_all()
+
+        context = multiprocessing.get_context('fork')
+        start_event = context.Event()
+        results = context.Queue()
+        processes = [
+            context.Process(target=run_writer, args=(worker, db_path, high_concurrency, writes, start_event, results))
+            for worker in range(workers)
+        ]
+        for process in processes:
+            process.start()
+        started_at = time.perf_counter()
+        start_event.set()
+        try:
+            outcomes = self.wait_results(processes, results)
+            elapsed = time.perf_counter() - started_at
+        finally:
+            for process in processes:
+                if process.is_alive():
+                    process.terminate()
+                process.join()
+
+        errors = [outcome[3] for outcome in outcomes if outcome[3]]
+        if errors:
+            raise CommandError(f'{len(errors)} processo(s) escritor(es) falharam: {errors[0]}')
+        committed = sum(outcome[0] for outcome in outcomes)
+        lock_errors = sum(outcome[1] for outcome in outcomes)
+        return committed, lock_errors, elapsed
+
+    def wait_results(self, processes, results):
+        outcomes = []
+        while len(outcomes) < len(processes):
+            try:
+                outcomes.append(results.get(timeout=1))
+            except queue.Empty:
+                # A worker killed before reporting (e.g. by a signal) never puts its result.
+                if all(process.exitcode is not None for process in processes) and results.empty():
+                    exitcodes = [process.exitcode for process in processes]
+                    raise CommandError(f'Processo escritor encerrou sem resultado (exit codes: {exitcodes}).')
+        return outcomes
@@ -0,0 +1,77 @@
+import statistics
+import time
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+from clinical.models import Professional
+from clinical.tokens import prune_expired_tokens, token_table_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Mede a latencia do refresh de JWT enquanto as tabelas de tokens crescem, com e sem a poda de "
+        "tokens expirados. Todas as escritas sao desfeitas ao final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=5, help='Numero de rodadas de crescimento.')
+        parser.add_argument('--bloat', type=int, default=20000, help='Tokens expirados inseridos por rodada.')
+        parser.add_argument('--refreshes', type=int, default=200, help='Refreshes medidos por rodada.')
+        parser.add_argument(
+            '--no-prune',
+            action='store_true',
+            help='Nao executa a poda entre as rodadas (mostra o crescimento da latencia).',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            professional = Professional.objects.create(
+                email=f'bench-{uuid.uuid4().hex}@bench.local',
+                full_name='Benchmark',
+                crp='0',
+            )
+            refresh = str(RefreshToken.for_user(professional))
+            self.stdout.write('rodada  pendentes  bloqueados   p50(ms)   p95(ms)')
+            for round_number in range(1, options['rounds'] + 1):
+                self.insert_expired_tokens(professional, options['bloat'])
+                if not options['no_prune']:
+                    prune_expired_tokens()
+
+                latencies = []
+                for _index in range(options['refreshes']):
+                    started_at = time.perf_counter()
+                    serializer = TokenRefreshSerializer(data={'refresh': refresh})
+                    serializer.is_valid(raise_exception=True)
+                    refresh = serializer.validated_data['refresh']
+                    latencies.append((time.perf_counter() - started_at) * 1000)
+
+                stats = token_table_stats()
+                p95 = statistics.quantiles(latencies, n=20)[-1] if len(latencies) > 1 else latencies[0]
+                self.stdout.write(
+                    f"{round_number:>6}  {stats['outstanding']:>9}  {stats['blacklisted']:>10}  "
+                    f"{statistics.median(latencies):>8.2f}  {p95:>8.2f}"
+                )
+            transaction.set_rollback(True)
+        self.stdout.write(self.style.SUCCESS('Benchmark concluido; dados temporarios descartados.'))
+
+    def insert_expired_tokens(self, professional, total, batch_size=5000):
+        expired_at = aware_utcnow() - timedelta(days=1)
+        for offset in range(0, total, batch_size):
+            tokens = OutstandingToken.objects.bulk_create(
+                OutstandingToken(
+                    user=professional,
+                    jti=uuid.uuid4().hex,
+                    token='',
+                    created_at=expired_at - timedelta(days=1),
+                    expires_at=expired_at,
+                )
+                for _index in range(min(batch_size, total - offset))
+            )
+            BlacklistedToken.objects.bulk_create(BlacklistedToken(token=token) for token in tokens)
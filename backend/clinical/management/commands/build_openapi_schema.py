@@ -0,0 +1,23 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from drf_spectacular.generators import SchemaGenerator
+from drf_spectacular.renderers import OpenApiYamlRenderer
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera o documento OpenAPI uma unica vez (por deploy) e grava em OPENAPI_SCHEMA_FILE, "
+        "de onde /api/schema/ passa a servi-lo sem regenerar a cada requisicao."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', type=str, help='Caminho de saida (padrao: settings.OPENAPI_SCHEMA_FILE).')
+
+    def handle(self, *args, **options):
+        output = Path(options['file'] or settings.OPENAPI_SCHEMA_FILE)
+        schema = SchemaGenerator().get_schema(request=None, public=True)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_bytes(OpenApiYamlRenderer().render(schema, renderer_context={}))
+        self.stdout.write(self.style.SUCCESS(f'Schema OpenAPI {schema["info"]["version"]} gravado em {output}'))
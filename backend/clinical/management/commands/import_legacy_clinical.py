@@ -0,0 +1,409 @@
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import models as db_models, transaction
+from django.utils import timezone
+
+from clinical import models
+from clinical.search import rebuild_index
+
+
+# Tables grouped by dependency level. Tables in the same level only reference
+# tables from previous levels, so they are read from the legacy file in parallel.
+IMPORT_LEVELS = [
+    [models.Professional],
+    [models.Patient],
+    [
+        models.Assessment,
+        models.DiagnosticAssessment,
+        models.TherapeuticPlan,
+        models.Session,
+        models.Report,
+        models.SatisfactionSurvey,
+        models.FamilySession,
+    ],
+    [models.AuditLog],
+]
+
+PREFETCH_CHUNKS = 2
+
+# Columns refreshed when a legacy professional matches an existing account by email.
+# Credentials, permissions and login history of the existing account are kept.
+PROFESSIONAL_PROFILE_FIELDS = [
+    'full_name',
+    'crp',
+    'profession',
+    'institution',
+    'accepts_notifications',
+    'first_name',
+    'last_name',
+]
+
+
+def convert_value(field, value):
+    if value is None:
+        return None
+    if isinstance(field, db_models.JSONField):
+        return json.loads(value) if isinstance(value, str) else value
+    if isinstance(field, db_models.DateTimeField):
+        dt = datetime.fromisoformat(value) if isinstance(value, str) else value
+        if timezone.is_naive(dt):
+            dt = timezone.make_aware(dt, dt_timezone.utc)
+        return dt
+    if isinstance(field, db_models.DateField):
+        return date.fromisoformat(value[:10]) if isinstance(value, str) else value
+    if isinstance(field, db_models.BooleanField):
+        return bool(value)
+    if isinstance(field, db_models.DecimalField):
+        return Decimal(str(value))
+    return field.to_python(value)
+
+
+@contextmanager
+def preserve_timestamps(model_list):
+    """Disable auto_now/auto_now_add so legacy timestamps are copied as-is."""
+    toggled = []
+    for model in model_list:
+        for field in model._meta.concrete_fields:
+            if getattr(field, 'auto_now', False) or getattr(field, 'auto_now_add', False):
+                toggled.append((field, field.auto_now, field.auto_now_add))
+                field.auto_now = field.auto_now_add = False
+    try:
+        yield {field for field, _auto_now, _auto_now_add in toggled}
+    finally:
+        for field, auto_now, auto_now_add in toggled:
+            field.auto_now = auto_now
+            field.auto_now_add = auto_now_add
+
+
+class IdMap:
+    """Legacy id -> new id map persisted as an append-only checkpoint file."""
+
+    def __init__(self, path):
+        self.path = path
+        self.ids = {}
+        if path.exists():
+            with path.open() as handle:
+                for line in handle:
+                    legacy_id, new_id = line.split(',')
+                    self.ids[int(legacy_id)] = int(new_id)
+
+    @property
+    def last_legacy_id(self):
+        return max(self.ids, default=0)
+
+    def get(self, legacy_id):
+        return self.ids.get(legacy_id)
+
+    def append(self, pairs):
+        with self.path.open('a') as handle:
+            handle.writelines(f'{legacy_id},{new_id}\n' for legacy_id, new_id in pairs)
+            handle.flush()
+            os.fsync(handle.fileno())
+        self.ids.update(pairs)
+
+    def discard_missing(self, model, tail_size):
+        """Drop trailing entries whose rows were rolled back after the map was written."""
+        tail = sorted(self.ids.items())[-tail_size:]
+        if not tail:
+            return 0
+        present = set(model.objects.filter(pk__in=[new_id for _legacy_id, new_id in tail]).values_list('pk', flat=True))
+        missing = [legacy_id for legacy_id, new_id in tail if new_id not in present]
+        if missing:
+            for legacy_id in missing:
+                del self.ids[legacy_id]
+            tmp_path = self.path.with_suffix('.tmp')
+            with tmp_path.open('w') as handle:
+                handle.writelines(f'{legacy_id},{new_id}\n' for legacy_id, new_id in sorted(self.ids.items()))
+            os.replace(tmp_path, self.path)
+        return len(missing)
+
+
+class LegacyTableReader(threading.Thread):
+    """Streams a legacy table in id order into a bounded queue from its own SQLite connection."""
+
+    def __init__(self, db_path, table, columns, after_id, chunk_size):
+        super().__init__(daemon=True)
+        self.db_path = db_path
+        self.table = table
+        self.columns = columns
+        self.after_id = after_id
+        self.chunk_size = chunk_size
+        self.chunks = queue.Queue(maxsize=PREFETCH_CHUNKS)
+
+    def run(self):
+        try:
+            connection = open_legacy_db(self.db_path)
+            try:
+                cursor = connection.execute(
+                    f"SELECT id, {', '.join(self.columns)} FROM {self.table} WHERE id > ? ORDER BY id",
+                    (self.after_id,),
+                )
+                while True:
+                    rows = cursor.fetchmany(self.chunk_size)
+                    if not rows:
+                        break
+                    self.chunks.put(rows)
+            finally:
+                connection.close()
+        except Exception as exc:
+            self.chunks.put(exc)
+            return
+        self.chunks.put(None)
+
+    def __iter__(self):
+        while True:
+            item = self.chunks.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+
+
+def open_legacy_db(db_path):
+    connection = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    connection.row_factory = sqlite3.Row
+    return connection
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa todas as tabelas clinicas de um arquivo SQLite legado para o banco atual, "
+        "remapeando chaves primarias e estrangeiras. A execucao e retomavel a partir do checkpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--db-path',
+            type=str,
+            default='backend/db.sqlite3',
+            help='Caminho para o arquivo SQLite legado (relativo à raiz do projeto, por padrão backend/db.sqlite3).',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=2000,
+            help='Quantidade de linhas inseridas e confirmadas por transacao.',
+        )
+        parser.add_argument(
+            '--checkpoint-dir',
+            type=str,
+            help='Diretorio dos mapas de ids usados para retomar a importacao (padrao: <db-path>.import-state).',
+        )
+        parser.add_argument(
+            '--reset',
+            action='store_true',
+            help='Descarta o checkpoint existente e reinicia a importacao do zero.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Mostra quantas linhas restam por tabela sem gravar no banco atual.',
+        )
+        parser.add_argument(
+            '--skip-search-index',
+            action='store_true',
+            help='Nao recria o indice de busca textual ao final (rode rebuild_search_index depois).',
+        )
+
+    def handle(self, *args, **options):
+        db_path = Path(options['db_path'])
+        if not db_path.is_absolute():
+            db_path = Path(settings.BASE_DIR).parent / db_path
+        if not db_path.exists():
+            raise CommandError(f"Arquivo SQLite não encontrado: {db_path}")
+
+        self.chunk_size = options['chunk_size']
+        if self.chunk_size < 1:
+            raise CommandError('--chunk-size deve ser maior que zero.')
+
+        checkpoint_dir = Path(options['checkpoint_dir'] or f'{db_path}.import-state')
+        if options['reset'] and checkpoint_dir.exists():
+            for map_file in checkpoint_dir.glob('*.map'):
+                map_file.unlink()
+        checkpoint_dir.mkdir(parents=True, exist_ok=True)
+
+        self.db_path = db_path
+        self.legacy_columns = self.read_legacy_columns()
+        self.id_maps = {}
+        for level in IMPORT_LEVELS:
+            for model in level:
+                id_map = IdMap(checkpoint_dir / f'{model._meta.db_table}.map')
+                discarded = id_map.discard_missing(model, self.chunk_size)
+                if discarded:
+                    self.stdout.write(self.style.WARNING(f'{model._meta.db_table}: {discarded} id(s) sem linha correspondente foram descartados do checkpoint.'))
+                self.id_maps[model] = id_map
+
+        if options['dry_run']:
+            self.report_pending()
+            return
+
+        self.stdout.write(f"Importando dados clinicos a partir de {db_path} (checkpoint em {checkpoint_dir})")
+        started_at = time.perf_counter()
+        totals = {}
+        all_models = [model for level in IMPORT_LEVELS for model in level]
+        with preserve_timestamps(all_models) as self.timestamp_fields:
+            for level in IMPORT_LEVELS:
+                readers = {}
+                for model in level:
+                    table = model._meta.db_table
+                    if table not in self.legacy_columns:
+                        self.stdout.write(self.style.WARNING(f'{table}: tabela ausente no banco legado, ignorada.'))
+                        continue
+                    readers[model] = LegacyTableReader(
+                        db_path,
+                        table,
+                        self.columns_for(model),
+                        self.id_maps[model].last_legacy_id,
+                        self.chunk_size,
+                    )
+                    readers[model].start()
+                for model, reader in readers.items():
+                    totals[model._meta.db_table] = self.import_table(model, reader)
+
+        elapsed = time.perf_counter() - started_at
+        copied = sum(total for total, _skipped in totals.values())
+        for table, (total, skipped) in totals.items():
+            self.stdout.write(f'  {table}: {total} copiada(s), {skipped} ignorada(s)')
+        rate = copied / elapsed if elapsed else copied
+        self.stdout.write(self.style.SUCCESS(f'Importação concluída: {copied} linha(s) em {elapsed:.1f}s ({rate:.0f} linhas/s).'))
+
+        # bulk_create skips the post_save signals that keep the search index in sync.
+        if options['skip_search_index']:
+            self.stdout.write(self.style.WARNING('Indice de busca nao atualizado: rode python manage.py rebuild_search_index.'))
+            return
+        started_at = time.perf_counter()
+        indexed = rebuild_index(batch_size=self.chunk_size)
+        self.stdout.write(f'{indexed} documento(s) de busca indexados em {time.perf_counter() - started_at:.1f}s.')
+
+    def read_legacy_columns(self):
+        connection = open_legacy_db(self.db_path)
+        try:
+            tables = [row['name'] for row in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+            return {
+                table: {row['name'] for row in connection.execute(f'PRAGMA table_info({table})')}
+                for table in tables
+                if table.startswith('clinical_')
+            }
+        finally:
+            connection.close()
+
+    def fields_for(self, model):
+        legacy_columns = self.legacy_columns.get(model._meta.db_table, set())
+        return [
+            field
+            for field in model._meta.concrete_fields
+            if not field.primary_key and field.column in legacy_columns
+        ]
+
+    def columns_for(self, model):
+        return [field.column for field in self.fields_for(model)]
+
+    def report_pending(self):
+        connection = open_legacy_db(self.db_path)
+        try:
+            for level in IMPORT_LEVELS:
+                for model in level:
+                    table = model._meta.db_table
+                    if table not in self.legacy_columns:
+                        continue
+                    pending = connection.execute(
+                        f'SELECT COUNT(*) FROM {table} WHERE id > ?',
+                        (self.id_maps[model].last_legacy_id,),
+                    ).fetchone()[0]
+                    self.stdout.write(f'[DRY-RUN] {table}: {pending} linha(s) pendente(s)')
+        finally:
+            connection.close()
+        self.stdout.write(self.style.WARNING('Dry-run finalizado. Nenhuma alteração foi aplicada.'))
+
+    def import_table(self, model, reader):
+        table = model._meta.db_table
+        fields = self.fields_for(model)
+        copied = 0
+        skipped = 0
+        for rows in reader:
+            legacy_ids = []
+            instances = []
+            for row in rows:
+                values = self.build_values(model, fields, row)
+                if values is None:
+                    skipped += 1
+                    continue
+                legacy_ids.append(row['id'])
+                instances.append(model(**values))
+
+            if instances:
+                with transaction.atomic():
+                    new_ids = self.insert(model, instances)
+                    self.id_maps[model].append(list(zip(legacy_ids, new_ids)))
+            copied += len(instances)
+            self.stdout.write(f'{table}: {copied} linha(s) copiada(s)...')
+        return copied, skipped
+
+    def build_values(self, model, fields, row):
+        values = {}
+        for field in fields:
+            raw_value = row[field.column]
+            if field.is_relation:
+                new_id = self.id_maps[field.related_model].get(raw_value) if raw_value is not None else None
+                if new_id is None and not field.null:
+                    return None
+                values[field.attname] = new_id
+                continue
+            value = convert_value(field, raw_value)
+            if value is None and field in self.timestamp_fields:
+                value = timezone.now()
+            values[field.attname] = value
+
+        if model is models.Professional:
+            if not values.get('email'):
+                return None
+            values['username'] = values.get('username') or values['email']
+        if model is models.Patient:
+            values['search_name'] = models.normalize_name(values.get('full_name') or '')
+        if model is models.AuditLog:
+            values['entity_id'] = self.remap_audit_entity(values.get('entity'), values.get('entity_id'))
+        return values
+
+    def remap_audit_entity(self, entity, entity_id):
+        entity_model = getattr(models, entity or '', None)
+        id_map = self.id_maps.get(entity_model)
+        if id_map is None or not str(entity_id or '').isdigit():
+            return entity_id
+        new_id = id_map.get(int(entity_id))
+        return str(new_id) if new_id is not None else entity_id
+
+    def insert(self, model, instances):
+        if model is models.Professional:
+            # Legacy rows sharing an email collapse into one account; the last row wins.
+            batch = {instance.email: instance for instance in instances}
+            existing = dict(models.Professional.objects.filter(email__in=list(batch)).values_list('email', 'pk'))
+            legacy_fields = {field.name for field in self.fields_for(model)}
+            update_fields = [name for name in PROFESSIONAL_PROFILE_FIELDS if name in legacy_fields]
+            if update_fields:
+                models.Professional.objects.bulk_create(
+                    batch.values(),
+                    update_conflicts=True,
+                    unique_fields=['email'],
+                    update_fields=update_fields,
+                )
+            else:
+                models.Professional.objects.bulk_create(batch.values(), ignore_conflicts=True)
+            # bulk_create nao dispara post_save: descarta o cache de autenticacao dos atualizados.
+            models.invalidate_cached_users(existing.values())
+            new_ids = dict(models.Professional.objects.filter(email__in=list(batch)).values_list('email', 'pk'))
+            return [new_ids[instance.email] for instance in instances]
+
+        created = model.objects.bulk_create(instances)
+        return [instance.pk for instance in created]
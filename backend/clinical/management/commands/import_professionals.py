@@ -1,4 +1,5 @@
 import sqlite3
+import time
 from datetime import datetime
 from pathlib import Path
 
@@ -7,7 +8,7 @@ from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 from django.utils import timezone
 
-from clinical.models import Professional
+from clinical.models import Professional, invalidate_cached_users
 
 
 def parse_datetime(value):
@@ -19,6 +20,45 @@ def parse_datetime(value):
     return dt
 
 
+UPDATE_FIELDS = [
+    "username",
+    "password",
+    "full_name",
+    "crp",
+    "profession",
+    "institution",
+    "accepts_notifications",
+    "is_active",
+    "is_staff",
+    "is_superuser",
+    "first_name",
+    "last_name",
+    "last_login",
+    "date_joined",
+]
+
+
+def build_professional(row_data):
+    email = row_data["email"]
+    return Professional(
+        email=email,
+        username=row_data["username"] or email,
+        password=row_data["password"],
+        full_name=row_data["full_name"] or "",
+        crp=row_data["crp"] or "",
+        profession=row_data["profession"] or "",
+        institution=row_data["institution"] or "",
+        accepts_notifications=bool(row_data["accepts_notifications"]),
+        is_active=bool(row_data["is_active"]),
+        is_staff=bool(row_data["is_staff"]),
+        is_superuser=bool(row_data["is_superuser"]),
+        first_name=row_data["first_name"] or "",
+        last_name=row_data["last_name"] or "",
+        last_login=parse_datetime(row_data["last_login"]),
+        date_joined=parse_datetime(row_data["date_joined"]) or timezone.now(),
+    )
+
+
 class Command(BaseCommand):
     help = "Importa registros da tabela clinical_professional de um arquivo SQLite legado para o banco atual."
 
@@ -34,6 +74,12 @@ class Command(BaseCommand):
             action="store_true",
             help="Mostra o que seria importado sem gravar no banco atual.",
         )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Quantidade de linhas lidas do SQLite legado e gravadas por lote.",
+        )
 
     def handle(self, *args, **options):
         db_path = Path(options["db_path"])
@@ -68,64 +114,77 @@ class Command(BaseCommand):
             "date_joined",
         ]
 
-        cursor.execute(f"SELECT {', '.join(columns)} FROM clinical_professional")
-        rows = cursor.fetchall()
-
-        if not rows:
-            self.stdout.write(self.style.WARNING("Nenhum registro encontrado no banco legado."))
-            return
-
         dry_run = options["dry_run"]
+        batch_size = options["batch_size"]
+        if batch_size < 1:
+            raise CommandError("--batch-size deve ser maior que zero.")
+
         imported = 0
         updated = 0
+        skipped = 0
+        processed = 0
+        started_at = time.perf_counter()
+
+        try:
+            cursor.execute(f"SELECT {', '.join(columns)} FROM clinical_professional")
+            with transaction.atomic():
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+
+                    batch = {}
+                    for row in rows:
+                        row_data = {column: row[column] for column in columns}
+                        email = row_data["email"]
+                        if not email:
+                            skipped += 1
+                            self.stdout.write(self.style.WARNING("Registro ignorado por email vazio."))
+                            continue
+                        batch[email] = build_professional(row_data)
+
+                    existing = dict(
+                        Professional.objects.filter(email__in=list(batch)).values_list("email", "pk")
+                    )
+                    for email in batch:
+                        exists = email in existing
+                        if dry_run:
+                            verb = "atualizaria" if exists else "cria"
+                            self.stdout.write(f"[DRY-RUN] {verb} registro para {email}")
+                        elif options["verbosity"] > 1:
+                            self.stdout.write(f"Atualizado registro de {email} ({'atualizado' if exists else 'criado'})")
+
+                    if not dry_run and batch:
+                        Professional.objects.bulk_create(
+                            batch.values(),
+                            update_conflicts=True,
+                            unique_fields=["email"],
+                            update_fields=UPDATE_FIELDS,
+                        )
+                        # bulk_create nao dispara post_save: descarta o cache de autenticacao dos atualizados.
+                        invalidate_cached_users(existing.values())
+
+                    updated += len(existing)
+                    imported += len(batch) - len(existing)
+                    processed += len(rows)
+                    self.stdout.write(f"{processed} registro(s) processado(s)...")
+        finally:
+            cursor.close()
+            connection.close()
+
+        if not processed:
+            self.stdout.write(self.style.WARNING("Nenhum registro encontrado no banco legado."))
+            return
 
-        with transaction.atomic():
-            for row in rows:
-                row_data = {column: row[column] for column in columns}
-                email = row_data["email"]
-                if not email:
-                    self.stdout.write(self.style.WARNING("Registro ignorado por email vazio."))
-                    continue
-
-                defaults = {
-                    "username": row_data["username"] or email,
-                    "password": row_data["password"],
-                    "full_name": row_data["full_name"] or "",
-                    "crp": row_data["crp"] or "",
-                    "profession": row_data["profession"] or "",
-                    "institution": row_data["institution"] or "",
-                    "accepts_notifications": bool(row_data["accepts_notifications"]),
-                    "is_active": bool(row_data["is_active"]),
-                    "is_staff": bool(row_data["is_staff"]),
-                    "is_superuser": bool(row_data["is_superuser"]),
-                    "first_name": row_data["first_name"] or "",
-                    "last_name": row_data["last_name"] or "",
-                    "last_login": parse_datetime(row_data["last_login"]),
-                    "date_joined": parse_datetime(row_data["date_joined"]) or timezone.now(),
-                }
-
-                action = "Atualizaria" if dry_run else "Atualizado"
-
-                if dry_run:
-                    exists = Professional.objects.filter(email=email).exists()
-                    verb = "atualizaria" if exists else "cria"
-                    self.stdout.write(f"[DRY-RUN] {verb} registro para {email}")
-                    continue
-
-                professional, created = Professional.objects.update_or_create(email=email, defaults=defaults)
-
-                self.stdout.write(
-                    f"{action} registro de {email} "
-                    f"({'criado' if created else 'atualizado'})"
-                )
-
-                imported += int(created)
-                updated += int(not created)
+        elapsed = time.perf_counter() - started_at
+        rate = processed / elapsed if elapsed else processed
+        self.stdout.write(f"{processed} registro(s) lidos em {elapsed:.2f}s ({rate:.0f} registros/s). Ignorados: {skipped}")
 
         if not dry_run:
             self.stdout.write(self.style.SUCCESS(f"Importação concluída. Criados: {imported}, Atualizados: {updated}"))
         else:
-            self.stdout.write(self.style.WARNING("Dry-run finalizado. Nenhuma alteração foi aplicada."))
-
-        cursor.close()
-        connection.close()
+            self.stdout.write(
+                self.style.WARNING(
+                    f"Dry-run finalizado. Seriam criados: {imported}, atualizados: {updated}. Nenhuma alteração foi aplicada."
+                )
+            )
@@ -0,0 +1,62 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from clinical.tokens import prune_expired_tokens, token_table_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove tokens JWT expirados das tabelas de tokens pendentes e bloqueados em lotes limitados. "
+        "Agende diariamente para manter o /api/auth/refresh/ com latencia estavel."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Quantidade maxima de tokens removidos por transacao.',
+        )
+        parser.add_argument(
+            '--max-batches',
+            type=int,
+            help='Interrompe apos este numero de lotes (o restante fica para a proxima execucao).',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Mostra apenas o tamanho atual das tabelas de tokens.',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size deve ser maior que zero.')
+
+        before = token_table_stats()
+        self.write_stats('Antes', before)
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING('Dry-run finalizado. Nenhum token foi removido.'))
+            return
+
+        started_at = time.perf_counter()
+        outstanding_deleted, blacklisted_deleted = prune_expired_tokens(
+            batch_size=options['batch_size'],
+            max_batches=options['max_batches'],
+        )
+        elapsed = time.perf_counter() - started_at
+        self.write_stats('Depois', token_table_stats())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{outstanding_deleted} token(s) pendente(s) e {blacklisted_deleted} bloqueado(s) removidos em {elapsed:.2f}s.'
+            )
+        )
+
+    def write_stats(self, label, stats):
+        line = (
+            f"{label}: pendentes={stats['outstanding']} (expirados={stats['outstanding_expired']}), "
+            f"bloqueados={stats['blacklisted']}"
+        )
+        if 'outstanding_bytes' in stats:
+            line += f", tamanho={stats['outstanding_bytes'] + stats['blacklisted_bytes']} bytes"
+        self.stdout.write(line)
@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from clinical.models import Tombstone
+
+
+class Command(BaseCommand):
+    help = (
+        "Remove registros de remocao (tombstones) mais antigos que SYNC_TOMBSTONE_RETENTION_DAYS em lotes. "
+        "Clientes com cursor anterior a esse prazo recebem 410 em /api/sync/ e refazem a sincronizacao completa."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Quantidade maxima de registros removidos por transacao.')
+        parser.add_argument('--dry-run', action='store_true', help='Mostra apenas quantos registros seriam removidos.')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size deve ser maior que zero.')
+
+        cutoff = Tombstone.retention_start()
+        expired = Tombstone.objects.filter(deleted_at__lt=cutoff)
+        if options['dry_run']:
+            self.stdout.write(
+                f'[DRY-RUN] {expired.count()} registro(s) anteriores a {cutoff:%d/%m/%Y %H:%M} '
+                f'(retencao de {settings.SYNC_TOMBSTONE_RETENTION_DAYS} dias).'
+            )
+            return
+
+        started_at = time.perf_counter()
+        deleted = 0
+        while True:
+            ids = list(expired.order_by('pk').values_list('pk', flat=True)[: options['batch_size']])
+            if not ids:
+                break
+            with transaction.atomic():
+                deleted += Tombstone.objects.filter(pk__in=ids).delete()[0]
+        self.stdout.write(
+            self.style.SUCCESS(f'{deleted} registro(s) de remocao excluidos em {time.perf_counter() - started_at:.2f}s.')
+        )
@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from clinical.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Recria o indice de busca textual (pacientes, sessoes e relatorios). Necessario apos cargas em "
+        "massa que nao disparam signals, como seed_synthetic e import_legacy_clinical."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000, help='Tamanho dos lotes de leitura e escrita.')
+        parser.add_argument('--database', default='default', help='Alias do banco de dados.')
+
+    def handle(self, *args, **options):
+        started_at = time.perf_counter()
+        total = rebuild_index(batch_size=options['batch_size'], using=options['database'])
+        elapsed = time.perf_counter() - started_at
+        self.stdout.write(self.style.SUCCESS(f'{total} documento(s) indexados em {elapsed:.1f}s.'))
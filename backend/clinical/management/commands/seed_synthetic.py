@@ -0,0 +1,295 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from clinical.constants import DIAGNOSTIC_QUESTIONS
+from clinical.models import (
+    Assessment,
+    DiagnosticAssessment,
+    FamilySession,
+    Patient,
+    Professional,
+    Report,
+    SatisfactionSurvey,
+    Session,
+    TherapeuticPlan,
+    normalize_name,
+)
+from clinical.search import rebuild_index
+
+FIRST_NAMES = (
+    'Ana', 'Beatriz', 'Carla', 'Daniela', 'Eduarda', 'Fernanda', 'Gabriela', 'Helena', 'Isabela', 'Julia',
+    'Arthur', 'Bernardo', 'Caio', 'Davi', 'Enzo', 'Felipe', 'Gustavo', 'Heitor', 'Joao', 'Lucas',
+    'Miguel', 'Nicolas', 'Otavio', 'Pedro', 'Rafael', 'Samuel', 'Theo', 'Vinicius', 'Laura', 'Sofia',
+)
+LAST_NAMES = (
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Rodrigues', 'Ferreira', 'Alves', 'Pereira', 'Lima', 'Gomes',
+    'Costa', 'Ribeiro', 'Martins', 'Carvalho', 'Almeida', 'Lopes', 'Soares', 'Fernandes', 'Vieira', 'Barbosa',
+)
+ACTIVITIES = (
+    'Treino de habilidades sociais com jogos cooperativos.',
+    'Atividade de atencao compartilhada com livros ilustrados.',
+    'Rotina visual e antecipacao de transicoes.',
+    'Integracao sensorial com circuito motor.',
+    'Treino de comunicacao alternativa (PECS).',
+    'Brincadeira simbolica mediada pela terapeuta.',
+    'Exercicios de regulacao emocional com cartoes.',
+)
+OBSERVATIONS = (
+    'Manteve contato visual por periodos curtos.',
+    'Apresentou boa tolerancia a mudancas de atividade.',
+    'Demonstrou irritabilidade com ruidos no inicio da sessao.',
+    'Iniciou interacao espontanea em dois momentos.',
+    'Precisou de apoio verbal frequente para concluir as tarefas.',
+)
+TOPICS = (
+    'Manejo de crises em casa',
+    'Rotina de sono',
+    'Seletividade alimentar',
+    'Comunicacao com a escola',
+    'Uso de recursos visuais',
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Gera dados sinteticos em volume de producao (profissionais, pacientes, sessoes, escalas, "
+        "avaliacoes diagnosticas, PTS, relatorios e acoes com familias) usando bulk_create."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--professionals', type=int, default=5, help='Quantidade de profissionais.')
+        parser.add_argument('--patients', type=int, default=50, help='Pacientes por profissional.')
+        parser.add_argument('--sessions', type=int, default=24, help='Sessoes por paciente.')
+        parser.add_argument('--assessments', type=int, default=4, help='Escalas aplicadas por paciente.')
+        parser.add_argument('--diagnostics', type=int, default=1, help='Avaliacoes diagnosticas por paciente.')
+        parser.add_argument('--reports', type=int, default=2, help='Relatorios por paciente.')
+        parser.add_argument('--surveys', type=int, default=2, help='Pesquisas de satisfacao por paciente.')
+        parser.add_argument('--family-sessions', type=int, default=2, help='Acoes psicoeducativas por paciente.')
+        parser.add_argument('--email-prefix', default='synthetic', help='Prefixo dos e-mails dos profissionais gerados.')
+        parser.add_argument('--password', default='synthetic123', help='Senha de todos os profissionais gerados.')
+        parser.add_argument('--seed', type=int, default=None, help='Semente aleatoria para gerar dados reproduziveis.')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Tamanho dos lotes do bulk_create.')
+        parser.add_argument(
+            '--skip-search-index',
+            action='store_true',
+            help='Nao recria o indice de busca textual ao final (rode rebuild_search_index depois).',
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.today = date.today()
+
+        emails = [f"{options['email_prefix']}{index:04d}@teacare.local" for index in range(options['professionals'])]
+        existing = list(Professional.objects.filter(email__in=emails).values_list('email', flat=True))
+        if existing:
+            raise CommandError(f'Profissionais ja existem ({existing[0]}...). Use outro --email-prefix.')
+
+        started_at = time.perf_counter()
+        totals = {}
+        with transaction.atomic():
+            password = make_password(options['password'])
+            professionals = self.create(
+                Professional,
+                (
+                    Professional(
+                        email=email,
+                        username=email,
+                        password=password,
+                        full_name=self.person_name(),
+                        crp=f'06/{self.random.randint(10000, 99999)}',
+                        profession=self.random.choice(Professional.Profession.values),
+                        institution='Clinica Sintetica',
+                    )
+                    for email in emails
+                ),
+                totals,
+            )
+            patients = self.create(
+                Patient,
+                (
+                    self.patient(professional, index)
+                    for professional in professionals
+                    for index in range(options['patients'])
+                ),
+                totals,
+            )
+            self.create(TherapeuticPlan, (self.plan(patient) for patient in patients), totals)
+            self.create(Session, self.per_patient(patients, options['sessions'], self.session), totals)
+            self.create(Assessment, self.assessments(patients, options['assessments']), totals)
+            self.create(DiagnosticAssessment, self.per_patient(patients, options['diagnostics'], self.diagnostic), totals)
+            self.create(Report, self.per_patient(patients, options['reports'], self.report), totals)
+            self.create(SatisfactionSurvey, self.per_patient(patients, options['surveys'], self.survey), totals)
+            self.create(FamilySession, self.per_patient(patients, options['family_sessions'], self.family_session), totals)
+
+        elapsed = time.perf_counter() - started_at
+        for label, count in totals.items():
+            self.stdout.write(f'{label}: {count}')
+        total_rows = sum(totals.values())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{total_rows} registro(s) sinteticos gerados em {elapsed:.1f}s ({total_rows / elapsed:.0f} linhas/s). '
+                f"Login: {emails[0] if emails else '-'} / {options['password']}"
+            )
+        )
+
+        # bulk_create nao dispara os signals que alimentam a busca textual.
+        if options['skip_search_index']:
+            self.stdout.write(self.style.WARNING('Indice de busca nao atualizado: rode python manage.py rebuild_search_index.'))
+            return
+        started_at = time.perf_counter()
+        indexed = rebuild_index(batch_size=self.batch_size)
+        self.stdout.write(f'{indexed} documento(s) de busca indexados em {time.perf_counter() - started_at:.1f}s.')
+
+    def create(self, model, objects, totals):
+        created = []
+        batch = []
+        for obj in objects:
+            batch.append(obj)
+            if len(batch) >= self.batch_size:
+                created.extend(model.objects.bulk_create(batch))
+                batch = []
+        if batch:
+            created.extend(model.objects.bulk_create(batch))
+        totals[model.__name__] = len(created)
+        return created
+
+    def per_patient(self, patients, count, build):
+        for patient in patients:
+            for index in range(count):
+                yield build(patient, index, count)
+
+    def person_name(self):
+        return f'{self.random.choice(FIRST_NAMES)} {self.random.choice(LAST_NAMES)} {self.random.choice(LAST_NAMES)}'
+
+    def past_date(self, index, count, span_days=365):
+        step = span_days // max(count, 1)
+        return self.today - timedelta(days=index * step + self.random.randint(0, max(step - 1, 0)))
+
+    def patient(self, professional, index):
+        full_name = self.person_name()
+        return Patient(
+            professional=professional,
+            full_name=full_name,
+            # bulk_create skips Patient.save, which normally fills search_name
+            search_name=normalize_name(full_name),
+            birth_date=self.today - timedelta(days=self.random.randint(2 * 365, 17 * 365)),
+            sex=self.random.choice(Patient.Sex.values),
+            contact_email=f'familia{professional.pk}.{index}@example.com',
+            contact_phone=f'11 9{self.random.randint(10000000, 99999999)}',
+            initial_diagnosis='TEA nivel 1' if index % 3 else 'TEA nivel 2',
+            notes=self.random.choice(OBSERVATIONS),
+            active=self.random.random() > 0.1,
+        )
+
+    def plan(self, patient):
+        start_date = self.today - timedelta(days=self.random.randint(30, 365))
+        return TherapeuticPlan(
+            patient=patient,
+            professional_id=patient.professional_id,
+            general_objectives='Ampliar comunicacao funcional e autonomia nas rotinas.',
+            specific_objectives='Aumentar pedidos espontaneos; reduzir crises em transicoes.',
+            strategies=self.random.choice(ACTIVITIES),
+            start_date=start_date,
+            next_review_date=self.today + timedelta(days=self.random.randint(-30, 180)),
+            monitoring_indicators={'adesao_familiar': self.random.randint(40, 100)},
+        )
+
+    def session(self, patient, index, count):
+        return Session(
+            patient=patient,
+            professional_id=patient.professional_id,
+            session_type=self.random.choice(Session.SessionType.values),
+            session_date=self.past_date(index, count),
+            duration_minutes=self.random.choice((30, 45, 50, 60)),
+            activities=self.random.choice(ACTIVITIES),
+            behaviour_observations=self.random.choice(OBSERVATIONS),
+            progress_notes=self.random.choice(OBSERVATIONS),
+            progress_scales={'progress': self.random.randint(20, 100)},
+        )
+
+    def assessments(self, patients, count):
+        scales = Assessment.ScaleType.values
+        for patient in patients:
+            for index in range(count):
+                yield Assessment(
+                    patient=patient,
+                    professional_id=patient.professional_id,
+                    scale=scales[index % len(scales)],
+                    # (patient, scale, application_date) e unico: cada indice cai numa data propria
+                    application_date=self.today - timedelta(days=index * 45 + 1),
+                    score_total=self.random.randint(10, 120),
+                    interpretation=self.random.choice(OBSERVATIONS),
+                )
+
+    def diagnostic(self, patient, index, count):
+        responses = []
+        total_failures = 0
+        critical_failures = 0
+        for question in DIAGNOSTIC_QUESTIONS:
+            answer = 'yes' if self.random.random() < 0.7 else 'no'
+            failed = answer == question.get('risk_answer', 'no')
+            critical = question.get('critical', False)
+            total_failures += failed
+            critical_failures += failed and critical
+            responses.append(
+                {
+                    'question_id': question['id'],
+                    'question': question['text'],
+                    'axis': question['axis'],
+                    'score': 1 if answer == 'yes' else 0,
+                    'answer': answer,
+                    'answer_label': 'Sim' if answer == 'yes' else 'Não',
+                    'failed': failed,
+                    'critical': critical,
+                    'observation': '',
+                }
+            )
+        if total_failures >= 8:
+            level = DiagnosticAssessment.FunctionalLevel.SEVERE
+        elif total_failures >= 3 or critical_failures >= 2:
+            level = DiagnosticAssessment.FunctionalLevel.MODERATE
+        else:
+            level = DiagnosticAssessment.FunctionalLevel.MILD
+        return DiagnosticAssessment(
+            patient=patient,
+            professional_id=patient.professional_id,
+            responses=responses,
+            score_total=total_failures,
+            functional_level=level,
+        )
+
+    def report(self, patient, index, count):
+        return Report(
+            patient=patient,
+            professional_id=patient.professional_id,
+            report_type=self.random.choice(Report.ReportType.values),
+            summary=f'Relatorio de acompanhamento {index + 1}',
+            content=' '.join(self.random.choice(OBSERVATIONS) for _index in range(8)),
+        )
+
+    def survey(self, patient, index, count):
+        return SatisfactionSurvey(
+            patient=patient,
+            professional_id=patient.professional_id,
+            responses={'satisfacao': self.random.choice(OBSERVATIONS)},
+            engagement_index=self.random.randint(40, 100),
+            conducted_at=self.past_date(index, count),
+        )
+
+    def family_session(self, patient, index, count):
+        session_date = self.past_date(index, count)
+        return FamilySession(
+            patient=patient,
+            professional_id=patient.professional_id,
+            session_date=session_date,
+            topic=self.random.choice(TOPICS),
+            activities=self.random.choice(ACTIVITIES),
+            action_items='Registrar episodios de crise e gatilhos durante a semana.',
+            follow_up_date=session_date + timedelta(days=14),
+        )
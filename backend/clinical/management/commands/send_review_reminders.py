@@ -1,97 +1,206 @@
-from datetime import timedelta
+import argparse
+import time
+from collections import Counter
+from datetime import date, timedelta
 
 from django.conf import settings
 from django.core.mail import send_mail
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, F
 from django.utils import timezone
 
 from clinical.models import AuditLog, TherapeuticPlan
+from core import metrics
+
+
+REMINDER_DAYS_AHEAD = 3
+
+
+def parse_date_option(value):
+    try:
+        return date.fromisoformat(value)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(f"Data invalida '{value}'. Utilize o formato AAAA-MM-DD.") from exc
 
 
 class Command(BaseCommand):
-    help = "Envia lembretes por e-mail para pacientes com reavaliacao marcada para daqui a tres dias."
+    help = (
+        "Envia lembretes por e-mail para pacientes com reavaliacao marcada para os proximos tres dias "
+        "que ainda nao receberam lembrete (falhas sao reenviadas nas execucoes seguintes). "
+        "Use --from/--to para recuperar janelas perdidas em uma unica execucao."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--from',
+            dest='date_from',
+            type=parse_date_option,
+            help='Primeira data de reavaliacao da janela (AAAA-MM-DD). Padrao: hoje.',
+        )
+        parser.add_argument(
+            '--to',
+            dest='date_to',
+            type=parse_date_option,
+            help='Ultima data de reavaliacao da janela (AAAA-MM-DD). Padrao: hoje + 3 dias.',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=200,
+            help='Quantidade de planos lidos por consulta.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Mostra quantos lembretes seriam enviados por data sem enviar e-mails.',
+        )
 
     def handle(self, *args, **options):
         today = timezone.now().date()
-        reminder_date = today + timedelta(days=3)
+        reminder_date = today + timedelta(days=REMINDER_DAYS_AHEAD)
+        # The default window starts today so a reminder that failed is retried
+        # by the following runs until the review date itself.
+        date_from = options['date_from'] or min(today, options['date_to'] or today)
+        date_to = options['date_to'] or max(reminder_date, date_from)
+        chunk_size = options['chunk_size']
+
+        if date_from > date_to:
+            raise CommandError('--from deve ser anterior ou igual a --to.')
+        if chunk_size < 1:
+            raise CommandError('--chunk-size deve ser maior que zero.')
+
+        plans = self.pending_plans(date_from, date_to)
+
+        if options['dry_run']:
+            self.report_dry_run(plans, date_from, date_to)
+            return
 
-        plans = (
+        default_from = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@teacare.local')
+        started_at = time.perf_counter()
+        sent_count = 0
+        failed_count = 0
+        last_pk = 0
+
+        while True:
+            chunk = list(plans.filter(pk__gt=last_pk).order_by('pk')[:chunk_size])
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+
+            for plan in chunk:
+                email = (plan.patient.contact_email or '').strip()
+                if not email:
+                    continue
+                # Claimed before sending: a run killed mid-chunk can lose a
+                # reminder but never send it twice.
+                if not self.claim(plan):
+                    continue
+                try:
+                    self.send_reminder(plan, email, default_from)
+                except Exception as exc:
+                    self.release(plan)
+                    failed_count += 1
+                    self.stderr.write(f"Falha ao enviar lembrete para {plan.patient.full_name}: {exc}")
+                    continue
+
+                self.build_audit_log(plan, email, today).save()
+                sent_count += 1
+                self.stdout.write(f"Lembrete enviado para {plan.patient.full_name} ({email}).")
+
+        metrics.inc('review_reminders_sent_total', value=sent_count)
+        metrics.inc('review_reminders_failed_total', value=failed_count)
+        metrics.observe('review_reminder_run_duration_seconds', time.perf_counter() - started_at)
+        metrics.flush()
+
+        if not sent_count and not failed_count:
+            self.stdout.write("Nenhum lembrete de reavaliacao para enviar hoje.")
+            return
+
+        summary = f"{sent_count} lembrete(s) enviados para reavaliacoes entre {date_from:%d/%m/%Y} e {date_to:%d/%m/%Y}."
+        if failed_count:
+            summary += f" {failed_count} falha(s) serao reprocessadas nas proximas execucoes, ate a data da reavaliacao."
+        self.stdout.write(self.style.SUCCESS(summary))
+
+    def pending_plans(self, date_from, date_to):
+        return (
             TherapeuticPlan.objects.select_related('patient', 'professional')
-            .filter(next_review_date=reminder_date, patient__active=True)
-            .exclude(review_reminder_sent_for=reminder_date)
+            .filter(next_review_date__range=(date_from, date_to), patient__active=True)
+            .exclude(review_reminder_sent_for=F('next_review_date'))
+            .exclude(patient__contact_email='')
         )
 
-        plans = [plan for plan in plans if (plan.patient.contact_email or '').strip()]
-
-        if not plans:
-            self.stdout.write("Nenhum lembrete de reavaliacao para enviar hoje.")
-            return
+    def claim(self, plan):
+        """Mark the plan as reminded for the review date that was read; False if it changed meanwhile."""
+        return bool(
+            TherapeuticPlan.objects.filter(pk=plan.pk, next_review_date=plan.next_review_date)
+            .exclude(review_reminder_sent_for=F('next_review_date'))
+            .update(review_reminder_sent_for=plan.next_review_date, updated_at=timezone.now())
+        )
 
-        sent_count = 0
-        default_from = getattr(settings, 'DEFAULT_FROM_EMAIL', 'noreply@teacare.local')
+    def release(self, plan):
+        TherapeuticPlan.objects.filter(pk=plan.pk, review_reminder_sent_for=plan.next_review_date).update(
+            review_reminder_sent_for=plan.review_reminder_sent_for,
+            updated_at=timezone.now(),
+        )
 
-        for plan in plans:
-            patient = plan.patient
-            professional = plan.professional
-            email = (patient.contact_email or '').strip()
-            if not email:
-                continue
-
-            subject = f"Lembrete de reavaliacao - {patient.full_name}"
-            review_date_str = plan.next_review_date.strftime('%d/%m/%Y')
-            profession_display = (
-                professional.get_profession_display()
-                if getattr(professional, 'profession', None)
-                else 'Profissional responsavel'
-            )
-            message = "\n".join(
-                [
-                    f"Prezados responsaveis por {patient.full_name},",
-                    "",
-                    "Este e um lembrete automatico da equipe NeuroAtlas TEA.",
-                    f"A reavaliacao do plano terapeutico esta agendada para {review_date_str}.",
-                    "",
-                    f"Profissional responsavel: {professional.full_name} ({profession_display})",
-                    f"Instituição de referência: {professional.institution or 'Não informada'}",
-                    "",
-                    "Por gentileza, confirme a disponibilidade ou sinalize ajustes diretamente com a profissional responsavel.",
-                    "",
-                    "Atenciosamente,",
-                    "Equipe NeuroAtlas TEA",
-                ]
-            )
-
-            try:
-                send_mail(
-                    subject=subject,
-                    message=message,
-                    from_email=default_from,
-                    recipient_list=[email],
-                    fail_silently=False,
-                )
-            except Exception as exc:
-                self.stderr.write(f"Falha ao enviar lembrete para {patient.full_name}: {exc}")
-                continue
-
-            plan.review_reminder_sent_for = plan.next_review_date
-            plan.save(update_fields=['review_reminder_sent_for', 'updated_at'])
-
-            AuditLog.objects.create(
-                professional=professional,
-                action='email_reminder',
-                entity='TherapeuticPlan',
-                entity_id=str(plan.pk),
-                metadata={
-                    'patient': patient.full_name,
-                    'next_review_date': review_date_str,
-                    'recipient': email,
-                    'reminder_type': 'review_due_in_3_days',
-                },
-            )
-
-            sent_count += 1
-            self.stdout.write(f"Lembrete enviado para {patient.full_name} ({email}).")
-
-        summary = f"{sent_count} lembrete(s) enviados para reavaliacoes em {reminder_date.strftime('%d/%m/%Y')}."
-        self.stdout.write(self.style.SUCCESS(summary))
+    def report_dry_run(self, plans, date_from, date_to):
+        per_date = Counter(
+            {
+                row['next_review_date']: row['total']
+                for row in plans.order_by().values('next_review_date').annotate(total=Count('id'))
+            }
+        )
+        total = sum(per_date.values())
+        self.stdout.write(f"[DRY-RUN] Janela de {date_from:%d/%m/%Y} a {date_to:%d/%m/%Y}: {total} lembrete(s) pendente(s).")
+        for review_date in sorted(per_date):
+            self.stdout.write(f"  {review_date:%d/%m/%Y}: {per_date[review_date]}")
+        self.stdout.write(self.style.WARNING("Dry-run finalizado. Nenhum e-mail foi enviado."))
+
+    def send_reminder(self, plan, email, default_from):
+        patient = plan.patient
+        professional = plan.professional
+        subject = f"Lembrete de reavaliacao - {patient.full_name}"
+        review_date_str = plan.next_review_date.strftime('%d/%m/%Y')
+        profession_display = (
+            professional.get_profession_display()
+            if getattr(professional, 'profession', None)
+            else 'Profissional responsavel'
+        )
+        message = "\n".join(
+            [
+                f"Prezados responsaveis por {patient.full_name},",
+                "",
+                "Este e um lembrete automatico da equipe NeuroAtlas TEA.",
+                f"A reavaliacao do plano terapeutico esta agendada para {review_date_str}.",
+                "",
+                f"Profissional responsavel: {professional.full_name} ({profession_display})",
+                f"Instituição de referência: {professional.institution or 'Não informada'}",
+                "",
+                "Por gentileza, confirme a disponibilidade ou sinalize ajustes diretamente com a profissional responsavel.",
+                "",
+                "Atenciosamente,",
+                "Equipe NeuroAtlas TEA",
+            ]
+        )
+        send_mail(
+            subject=subject,
+            message=message,
+            from_email=default_from,
+            recipient_list=[email],
+            fail_silently=False,
+        )
 
+    def build_audit_log(self, plan, email, today):
+        days_ahead = (plan.next_review_date - today).days
+        return AuditLog(
+            professional=plan.professional,
+            action='email_reminder',
+            entity='TherapeuticPlan',
+            entity_id=str(plan.pk),
+            metadata={
+                'patient': plan.patient.full_name,
+                'next_review_date': plan.next_review_date.strftime('%d/%m/%Y'),
+                'recipient': email,
+                'reminder_type': f'review_due_in_{days_ahead}_days',
+            },
+        )
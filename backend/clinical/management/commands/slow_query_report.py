@@ -0,0 +1,103 @@
+import json
+import statistics
+from collections import Counter
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+def parse_aware(value):
+    """parse_datetime, reading naive values in the current time zone."""
+    value = parse_datetime(value)
+    if value is not None and timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+class Command(BaseCommand):
+    help = (
+        "Resume o log de queries lentas (SLOW_QUERY_LOG_FILE e arquivos rotacionados) agrupando por "
+        "fingerprint normalizado: ocorrencias, tempo total/medio/p95/maximo, origem no codigo e plano."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--file', default=None, help='Arquivo de log (padrao: SLOW_QUERY_LOG_FILE).')
+        parser.add_argument('--top', type=int, default=10, help='Quantidade de fingerprints exibidos.')
+        parser.add_argument('--since', help='Considera apenas amostras a partir desta data/hora ISO 8601.')
+        parser.add_argument('--json', action='store_true', help='Emite o resumo em JSON.')
+
+    def handle(self, *args, **options):
+        path = Path(options['file'] or settings.SLOW_QUERY_LOG_FILE)
+        files = sorted(path.parent.glob(f'{path.name}.*'), key=lambda item: item.name, reverse=True) + [path]
+        files = [item for item in files if item.exists()]
+        if not files:
+            raise CommandError(f'Nenhum log de queries lentas em {path}.')
+
+        since = None
+        if options['since']:
+            try:
+                since = parse_aware(options['since'])
+            except ValueError:
+                since = None
+            if since is None:
+                raise CommandError(f"Data invalida para --since: {options['since']}")
+
+        groups = {}
+        for log_file in files:
+            with log_file.open(encoding='utf-8') as handle:
+                for line in handle:
+                    try:
+                        sample = json.loads(line)
+                    except ValueError:
+                        continue
+                    if since is not None and parse_aware(sample['at']) < since:
+                        continue
+                    group = groups.setdefault(
+                        sample['fingerprint'], {'durations': [], 'origins': Counter(), 'sample': sample}
+                    )
+                    group['durations'].append(sample['duration_ms'])
+                    group['origins'][sample.get('origin') or '(fora do app clinical)'] += 1
+                    if sample.get('plan'):
+                        group['sample'] = sample
+
+        summary = []
+        for query_fingerprint, group in groups.items():
+            durations = sorted(group['durations'])
+            p95 = statistics.quantiles(durations, n=20, method='inclusive')[-1] if len(durations) > 1 else durations[0]
+            summary.append(
+                {
+                    'fingerprint': query_fingerprint,
+                    'count': len(durations),
+                    'total_ms': round(sum(durations), 2),
+                    'mean_ms': round(statistics.mean(durations), 2),
+                    'p95_ms': round(p95, 2),
+                    'max_ms': durations[-1],
+                    'origins': dict(group['origins'].most_common(3)),
+                    'plan': group['sample'].get('plan'),
+                }
+            )
+        summary.sort(key=lambda item: item['total_ms'], reverse=True)
+        summary = summary[: options['top']]
+
+        if options['json']:
+            self.stdout.write(json.dumps(summary, indent=2, ensure_ascii=False))
+            return
+
+        total = sum(len(group['durations']) for group in groups.values())
+        self.stdout.write(f'{total} amostra(s), {len(groups)} fingerprint(s) em {len(files)} arquivo(s)')
+        for position, item in enumerate(summary, 1):
+            self.stdout.write(
+                self.style.WARNING(
+                    f"\n#{position} {item['count']}x total={item['total_ms']}ms media={item['mean_ms']}ms "
+                    f"p95={item['p95_ms']}ms max={item['max_ms']}ms"
+                )
+            )
+            self.stdout.write(f"  {item['fingerprint'][:400]}")
+            for origin, count in item['origins'].items():
+                self.stdout.write(f'  origem: {origin} ({count}x)')
+            if item['plan']:
+                for plan_line in item['plan'].splitlines():
+                    self.stdout.write(f'  plano: {plan_line}')
@@ -0,0 +1,22 @@
+# Generated by Django 5.1.1 on 2026-10-19 04:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinical', '0005_therapeuticplan_review_reminder_sent_for'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='report',
+            name='report_type',
+            field=models.CharField(choices=[('technical', 'Geral'), ('semiannual_review', 'Reavaliação Semestral'), ('weekly', 'Acompanhamento Semanal'), ('monthly', 'Acompanhamento Mensal')], max_length=32),
+        ),
+        migrations.AddIndex(
+            model_name='therapeuticplan',
+            index=models.Index(fields=['next_review_date', 'review_reminder_sent_for'], name='clinical_pts_review_idx'),
+        ),
+    ]
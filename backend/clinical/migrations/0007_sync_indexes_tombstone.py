@@ -0,0 +1,69 @@
+# Generated by Django 5.1.1 on 2026-10-19 04:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinical', '0006_therapeuticplan_review_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity', models.CharField(max_length=120)),
+                ('entity_id', models.BigIntegerField()),
+                ('patient_id', models.BigIntegerField(blank=True, null=True)),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'ordering': ['deleted_at'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='assessment',
+            index=models.Index(fields=['professional', 'updated_at'], name='clinical_assessment_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='diagnosticassessment',
+            index=models.Index(fields=['professional', 'updated_at'], name='clinical_diagnostic_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='familysession',
+            index=models.Index(fields=['professional', 'updated_at'], name='clinical_family_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['professional', 'updated_at'], name='clinical_patient_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['professional', 'updated_at'], name='clinical_report_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='satisfactionsurvey',
+            index=models.Index(fields=['professional', 'updated_at'], name='clinical_survey_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['professional', 'updated_at'], name='clinical_session_sync_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='therapeuticplan',
+            index=models.Index(fields=['professional', 'updated_at'], name='clinical_pts_sync_idx'),
+        ),
+        migrations.AddField(
+            model_name='tombstone',
+            name='professional',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['professional', 'deleted_at'], name='clinical_tombstone_sync_idx'),
+        ),
+    ]
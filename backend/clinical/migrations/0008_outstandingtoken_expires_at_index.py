@@ -0,0 +1,19 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinical', '0007_sync_indexes_tombstone'),
+        ('token_blacklist', '0012_alter_outstandingtoken_user'),
+    ]
+
+    # token_blacklist is a third-party app, so the index used by prune_tokens
+    # to find expired rows is created here.
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE INDEX IF NOT EXISTS token_blacklist_outstanding_expires_idx '
+            'ON token_blacklist_outstandingtoken (expires_at);',
+            reverse_sql='DROP INDEX IF EXISTS token_blacklist_outstanding_expires_idx;',
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.1 on 2026-10-19 04:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinical', '0008_outstandingtoken_expires_at_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditlog',
+            name='entity_id',
+            field=models.CharField(db_index=True, max_length=64),
+        ),
+        migrations.AlterField(
+            model_name='patient',
+            name='full_name',
+            field=models.CharField(db_index=True, max_length=180),
+        ),
+        migrations.AddIndex(
+            model_name='auditlog',
+            index=models.Index(fields=['-created_at'], name='clinical_auditlog_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['-session_date'], name='clinical_session_date_idx'),
+        ),
+    ]
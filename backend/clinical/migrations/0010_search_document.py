@@ -0,0 +1,100 @@
+# Generated by Django 5.1.1 on 2026-10-19 04:42
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+SEARCH_FIELDS = {
+    'patient': ('Patient', ('initial_diagnosis', 'behavior_history', 'school_history', 'family_history', 'notes')),
+    'session': ('Session', ('progress_notes', 'behaviour_observations')),
+    'report': ('Report', ('content',)),
+}
+
+POSTGRESQL_FORWARD = [
+    "CREATE INDEX clinical_searchdoc_fts_idx ON clinical_searchdocument "
+    "USING gin (to_tsvector('portuguese'::regconfig, content))",
+]
+POSTGRESQL_BACKWARD = ['DROP INDEX IF EXISTS clinical_searchdoc_fts_idx']
+
+# External-content FTS5 table: the text lives only in clinical_searchdocument and
+# the triggers keep the index in step with every insert, upsert and delete.
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE clinical_searchdocument_fts USING fts5("
+    "content, content='clinical_searchdocument', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER clinical_searchdocument_fts_ai AFTER INSERT ON clinical_searchdocument BEGIN "
+    "INSERT INTO clinical_searchdocument_fts(rowid, content) VALUES (new.id, new.content); END",
+    "CREATE TRIGGER clinical_searchdocument_fts_ad AFTER DELETE ON clinical_searchdocument BEGIN "
+    "INSERT INTO clinical_searchdocument_fts(clinical_searchdocument_fts, rowid, content) "
+    "VALUES ('delete', old.id, old.content); END",
+    "CREATE TRIGGER clinical_searchdocument_fts_au AFTER UPDATE ON clinical_searchdocument BEGIN "
+    "INSERT INTO clinical_searchdocument_fts(clinical_searchdocument_fts, rowid, content) "
+    "VALUES ('delete', old.id, old.content); "
+    "INSERT INTO clinical_searchdocument_fts(rowid, content) VALUES (new.id, new.content); END",
+]
+SQLITE_BACKWARD = [
+    'DROP TRIGGER IF EXISTS clinical_searchdocument_fts_au',
+    'DROP TRIGGER IF EXISTS clinical_searchdocument_fts_ad',
+    'DROP TRIGGER IF EXISTS clinical_searchdocument_fts_ai',
+    'DROP TABLE IF EXISTS clinical_searchdocument_fts',
+]
+
+
+def run_vendor_sql(statements):
+    def run(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+
+    return run
+
+
+def backfill_documents(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    SearchDocument = apps.get_model('clinical', 'SearchDocument')
+    for source, (model_name, fields) in SEARCH_FIELDS.items():
+        model = apps.get_model('clinical', model_name)
+        batch = []
+        for instance in model.objects.using(alias).iterator(chunk_size=2000):
+            content = '\n'.join(value for value in (getattr(instance, field) for field in fields) if value)
+            if content:
+                batch.append(
+                    SearchDocument(
+                        professional_id=instance.professional_id,
+                        patient_id=instance.pk if source == 'patient' else instance.patient_id,
+                        source=source,
+                        object_id=instance.pk,
+                        content=content,
+                    )
+                )
+            if len(batch) >= 2000:
+                SearchDocument.objects.using(alias).bulk_create(batch)
+                batch = []
+        SearchDocument.objects.using(alias).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinical', '0009_admin_changelist_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('patient', 'Paciente'), ('session', 'Sessão'), ('report', 'Relatório')], max_length=16)),
+                ('object_id', models.BigIntegerField()),
+                ('content', models.TextField()),
+                ('patient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='clinical.patient')),
+                ('professional', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('source', 'object_id'), name='clinical_searchdoc_source_uniq')],
+            },
+        ),
+        migrations.RunPython(
+            run_vendor_sql({'postgresql': POSTGRESQL_FORWARD, 'sqlite': SQLITE_FORWARD}),
+            run_vendor_sql({'postgresql': POSTGRESQL_BACKWARD, 'sqlite': SQLITE_BACKWARD}),
+        ),
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 5.1.1 on 2026-10-19 04:45
+
+import unicodedata
+
+from django.db import migrations, models
+
+TRIGRAM_FORWARD = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    'CREATE INDEX clinical_patient_name_trgm_idx ON clinical_patient USING gin (search_name gin_trgm_ops)',
+]
+TRIGRAM_BACKWARD = ['DROP INDEX IF EXISTS clinical_patient_name_trgm_idx']
+
+
+def normalize_name(value):
+    decomposed = unicodedata.normalize('NFKD', value)
+    return ' '.join(''.join(char for char in decomposed if not unicodedata.combining(char)).lower().split())
+
+
+def backfill_search_name(apps, schema_editor):
+    Patient = apps.get_model('clinical', 'Patient')
+    alias = schema_editor.connection.alias
+    batch = []
+    for patient in Patient.objects.using(alias).only('pk', 'full_name').iterator(chunk_size=2000):
+        patient.search_name = normalize_name(patient.full_name)
+        batch.append(patient)
+        if len(batch) >= 2000:
+            Patient.objects.using(alias).bulk_update(batch, ['search_name'])
+            batch = []
+    Patient.objects.using(alias).bulk_update(batch, ['search_name'])
+
+
+def run_on_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'postgresql':
+            for statement in statements:
+                schema_editor.execute(statement)
+
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinical', '0010_search_document'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='patient',
+            name='search_name',
+            field=models.CharField(blank=True, editable=False, max_length=180),
+        ),
+        migrations.RunPython(backfill_search_name, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(fields=['professional', 'search_name'], name='clinical_patient_search_idx'),
+        ),
+        migrations.RunPython(run_on_postgresql(TRIGRAM_FORWARD), run_on_postgresql(TRIGRAM_BACKWARD)),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.1.1 on 2026-10-19 04:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinical', '0011_patient_search_name'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='assessment',
+            index=models.Index(fields=['professional', 'application_date'], name='clinical_assessment_prof_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='assessment',
+            index=models.Index(fields=['patient', '-application_date'], name='clinical_assessment_list_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='diagnosticassessment',
+            index=models.Index(fields=['professional', '-created_at'], name='clinical_diagnostic_list_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='familysession',
+            index=models.Index(fields=['patient', '-session_date'], name='clinical_family_list_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='patient',
+            index=models.Index(condition=models.Q(('active', True)), fields=['professional', 'search_name'], name='clinical_patient_active_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='report',
+            index=models.Index(fields=['patient', '-generated_at'], name='clinical_report_list_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='satisfactionsurvey',
+            index=models.Index(fields=['patient', '-conducted_at'], name='clinical_survey_list_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['professional', '-session_date'], name='clinical_session_prof_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='session',
+            index=models.Index(fields=['patient', '-session_date'], name='clinical_session_list_idx'),
+        ),
+    ]
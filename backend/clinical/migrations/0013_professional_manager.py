@@ -0,0 +1,20 @@
+# Generated by Django 5.1.1 on 2026-10-19 05:08
+
+import clinical.models
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinical', '0012_hot_path_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='professional',
+            managers=[
+                ('objects', clinical.models.ProfessionalManager()),
+            ],
+        ),
+    ]
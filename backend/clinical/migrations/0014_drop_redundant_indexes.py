@@ -0,0 +1,89 @@
+# Generated by Django 5.1.1 on 2026-10-19 05:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinical', '0013_professional_manager'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='assessment',
+            name='clinical_assessment_list_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='familysession',
+            name='clinical_family_list_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='patient',
+            name='clinical_patient_active_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='report',
+            name='clinical_report_list_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='satisfactionsurvey',
+            name='clinical_survey_list_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='session',
+            name='clinical_session_list_idx',
+        ),
+        migrations.AlterField(
+            model_name='assessment',
+            name='patient',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='assessments', to='clinical.patient'),
+        ),
+        migrations.AlterField(
+            model_name='assessment',
+            name='professional',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='assessments', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='diagnosticassessment',
+            name='professional',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='diagnostic_assessments', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='familysession',
+            name='professional',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='family_sessions', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='patient',
+            name='professional',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='patients', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='report',
+            name='professional',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='reports', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='satisfactionsurvey',
+            name='professional',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='surveys', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='session',
+            name='professional',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='sessions', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='therapeuticplan',
+            name='professional',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='therapeutic_plans', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='tombstone',
+            name='professional',
+            field=models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -1,16 +1,115 @@
-from django.contrib.auth.models import AbstractUser
+import json
+import unicodedata
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models.fields.files import FieldFile
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 
+def normalize_name(value):
+    """Lowercase, accent-free, single-spaced form of a name used for typeahead matching."""
+    decomposed = unicodedata.normalize('NFKD', value)
+    return ' '.join(''.join(char for char in decomposed if not unicodedata.combining(char)).lower().split())
+
+
 class TimeStampedModel(models.Model):
+    """
+    Besides the timestamps, remembers the values loaded from the database so
+    save() only writes the columns that changed and skips no-op updates.
+    """
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         abstract = True
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._snapshot()
+        return instance
+
+    def _snapshot(self):
+        self._loaded_values = {
+            field.attname: self._snapshot_value(field, self.__dict__[field.attname])
+            for field in self._meta.concrete_fields
+            if field.attname in self.__dict__
+        }
+
+    @staticmethod
+    def _snapshot_value(field, value):
+        # JSON values can change in place, so they are kept serialized (much cheaper on
+        # every row load than a deep copy); files are compared by their stored name.
+        if isinstance(field, models.JSONField):
+            return json.dumps(value, cls=field.encoder, sort_keys=True)
+        if isinstance(value, FieldFile):
+            return value.name
+        return value
+
+    def changed_fields(self):
+        """Names of the fields that differ from the loaded values (untracked fields count as changed)."""
+        loaded = getattr(self, '_loaded_values', None)
+        if loaded is None:
+            return [field.name for field in self._meta.concrete_fields if not field.primary_key]
+        return [
+            field.name
+            for field in self._meta.concrete_fields
+            if not field.primary_key
+            and field.attname in self.__dict__
+            and (
+                field.attname not in loaded
+                or self._snapshot_value(field, self.__dict__[field.attname]) != loaded[field.attname]
+            )
+        ]
+
+    def has_changed(self, field_name):
+        return field_name in self.changed_fields()
+
+    def save(self, *args, **kwargs):
+        tracked = not self._state.adding and getattr(self, '_loaded_values', None) is not None
+        if tracked and not args and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            changed = [name for name in self.changed_fields() if name != 'updated_at']
+            if not changed:
+                return
+            kwargs['update_fields'] = changed + ['updated_at']
+        super().save(*args, **kwargs)
+        self._snapshot()
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._snapshot()
+
+
+def invalidate_cached_users(user_ids, using=None):
+    """Drop the cached JWT users once the transaction that changed them commits."""
+    from .authentication import invalidate_cached_user
+
+    user_ids = list(user_ids)
+
+    def invalidate():
+        for user_id in user_ids:
+            invalidate_cached_user(user_id)
+
+    if user_ids:
+        transaction.on_commit(invalidate, using=using)
+
+
+class ProfessionalQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        # Bulk updates skip post_save, which is what normally invalidates the JWT user cache.
+        invalidate_cached_users(self.values_list('pk', flat=True), using=self.db)
+        return super().update(**kwargs)
+
+
+class ProfessionalManager(UserManager.from_queryset(ProfessionalQuerySet)):
+    pass
+
 
 class Professional(AbstractUser):
     class Profession(models.TextChoices):
@@ -24,6 +123,8 @@ class Professional(AbstractUser):
     institution = models.CharField(_('instituição'), max_length=180, blank=True)
     accepts_notifications = models.BooleanField(default=True)
 
+    objects = ProfessionalManager()
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'full_name', 'crp']
 
@@ -43,8 +144,12 @@ class Patient(TimeStampedModel):
         MALE = 'M', _('Masculino')
         OTHER = 'O', _('Outro')
 
-    professional = models.ForeignKey(Professional, on_delete=models.CASCADE, related_name='patients')
-    full_name = models.CharField(max_length=180)
+    # The professional foreign keys of the clinical models lead a composite index (at least
+    # the *_sync_idx one), so Django's default single-column index is left out (db_index=False).
+    professional = models.ForeignKey(Professional, on_delete=models.CASCADE, related_name='patients', db_index=False)
+    full_name = models.CharField(max_length=180, db_index=True)
+    # normalize_name(full_name), kept by save(); see clinical.search.filter_patients
+    search_name = models.CharField(max_length=180, blank=True, editable=False)
     birth_date = models.DateField()
     sex = models.CharField(max_length=1, choices=Sex.choices)
     contact_email = models.EmailField(blank=True)
@@ -60,9 +165,22 @@ class Patient(TimeStampedModel):
     notes = models.TextField(blank=True)
     active = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['professional', 'updated_at'], name='clinical_patient_sync_idx'),
+            models.Index(fields=['professional', 'search_name'], name='clinical_patient_search_idx'),
+        ]
+
     def __str__(self):
         return self.full_name
 
+    def save(self, *args, **kwargs):
+        self.search_name = normalize_name(self.full_name)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'full_name' in update_fields and 'search_name' not in update_fields:
+            kwargs['update_fields'] = [*update_fields, 'search_name']
+        super().save(*args, **kwargs)
+
 
 class Assessment(TimeStampedModel):
     class ScaleType(models.TextChoices):
@@ -72,8 +190,9 @@ class Assessment(TimeStampedModel):
         ATEC = 'ATEC', _('ATEC')
         CGAS = 'CGAS', _('C-GAS/AGF')
 
-    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='assessments')
-    professional = models.ForeignKey(Professional, on_delete=models.CASCADE, related_name='assessments')
+    # Leading column of the (patient, scale, application_date) unique index.
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='assessments', db_index=False)
+    professional = models.ForeignKey(Professional, on_delete=models.CASCADE, related_name='assessments', db_index=False)
     scale = models.CharField(max_length=20, choices=ScaleType.choices)
     application_date = models.DateField()
     score_total = models.DecimalField(max_digits=7, decimal_places=2, null=True, blank=True)
@@ -84,6 +203,10 @@ class Assessment(TimeStampedModel):
     class Meta:
         ordering = ['-application_date']
         unique_together = ('patient', 'scale', 'application_date')
+        indexes = [
+            models.Index(fields=['professional', 'updated_at'], name='clinical_assessment_sync_idx'),
+            models.Index(fields=['professional', 'application_date'], name='clinical_assessment_prof_idx'),
+        ]
 
     def __str__(self):
         return f'{self.patient.full_name} - {self.get_scale_display()} ({self.application_date})'
@@ -95,7 +218,7 @@ class DiagnosticAssessment(TimeStampedModel):
         MODERATE = 'moderate', _('Moderado')
         MILD = 'mild', _('Leve')
 
-    professional = models.ForeignKey(Professional, on_delete=models.CASCADE, related_name='diagnostic_assessments')
+    professional = models.ForeignKey(Professional, on_delete=models.CASCADE, related_name='diagnostic_assessments', db_index=False)
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='diagnostic_assessments')
     responses = models.JSONField(default=list)
     score_total = models.FloatField()
@@ -103,6 +226,10 @@ class DiagnosticAssessment(TimeStampedModel):
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['professional', 'updated_at'], name='clinical_diagnostic_sync_idx'),
+            models.Index(fields=['professional', '-created_at'], name='clinical_diagnostic_list_idx'),
+        ]
 
     def __str__(self):
         return f'Avaliação Diagnóstica TEA - {self.patient.full_name} ({self.created_at:%d/%m/%Y})'
@@ -110,7 +237,7 @@ class DiagnosticAssessment(TimeStampedModel):
 
 class TherapeuticPlan(TimeStampedModel):
     patient = models.OneToOneField(Patient, on_delete=models.CASCADE, related_name='therapeutic_plan')
-    professional = models.ForeignKey(Professional, on_delete=models.CASCADE, related_name='therapeutic_plans')
+    professional = models.ForeignKey(Professional, on_delete=models.CASCADE, related_name='therapeutic_plans', db_index=False)
     general_objectives = models.TextField()
     specific_objectives = models.TextField()
     strategies = models.TextField()
@@ -120,14 +247,18 @@ class TherapeuticPlan(TimeStampedModel):
     pdf_storage_path = models.CharField(max_length=255, blank=True)
     review_reminder_sent_for = models.DateField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['next_review_date', 'review_reminder_sent_for'], name='clinical_pts_review_idx'),
+            models.Index(fields=['professional', 'updated_at'], name='clinical_pts_sync_idx'),
+        ]
+
     def __str__(self):
         return f'PTS - {self.patient.full_name}'
 
     def save(self, *args, **kwargs):
-        if self.pk:
-            original = type(self).objects.filter(pk=self.pk).values('next_review_date', 'review_reminder_sent_for').first()
-            if original and original['next_review_date'] != self.next_review_date:
-                self.review_reminder_sent_for = None
+        if not self._state.adding and self.has_changed('next_review_date'):
+            self.review_reminder_sent_for = None
         super().save(*args, **kwargs)
 
 
@@ -139,7 +270,7 @@ class Session(TimeStampedModel):
         REEVALUATION = 'reevaluation', _('Reavaliação')
 
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='sessions')
-    professional = models.ForeignKey(Professional, on_delete=models.CASCADE, related_name='sessions')
+    professional = models.ForeignKey(Professional, on_delete=models.CASCADE, related_name='sessions', db_index=False)
     session_type = models.CharField(max_length=24, choices=SessionType.choices)
     session_date = models.DateField()
     duration_minutes = models.PositiveIntegerField(default=50)
@@ -151,6 +282,11 @@ class Session(TimeStampedModel):
 
     class Meta:
         ordering = ['-session_date']
+        indexes = [
+            models.Index(fields=['professional', 'updated_at'], name='clinical_session_sync_idx'),
+            models.Index(fields=['-session_date'], name='clinical_session_date_idx'),
+            models.Index(fields=['professional', '-session_date'], name='clinical_session_prof_idx'),
+        ]
 
     def __str__(self):
         return f'{self.patient.full_name} - {self.get_session_type_display()} ({self.session_date})'
@@ -164,7 +300,7 @@ class Report(TimeStampedModel):
         MONTHLY = 'monthly', _('Acompanhamento Mensal')
 
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='reports')
-    professional = models.ForeignKey(Professional, on_delete=models.CASCADE, related_name='reports')
+    professional = models.ForeignKey(Professional, on_delete=models.CASCADE, related_name='reports', db_index=False)
     report_type = models.CharField(max_length=32, choices=ReportType.choices)
     generated_at = models.DateTimeField(auto_now_add=True)
     summary = models.CharField(max_length=255)
@@ -173,6 +309,9 @@ class Report(TimeStampedModel):
 
     class Meta:
         ordering = ['-generated_at']
+        indexes = [
+            models.Index(fields=['professional', 'updated_at'], name='clinical_report_sync_idx'),
+        ]
 
     def __str__(self):
         return f'{self.get_report_type_display()} - {self.patient.full_name}'
@@ -180,7 +319,7 @@ class Report(TimeStampedModel):
 
 class SatisfactionSurvey(TimeStampedModel):
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='surveys')
-    professional = models.ForeignKey(Professional, on_delete=models.CASCADE, related_name='surveys')
+    professional = models.ForeignKey(Professional, on_delete=models.CASCADE, related_name='surveys', db_index=False)
     responses = models.JSONField(default=dict)
     engagement_index = models.PositiveIntegerField(
         validators=[MinValueValidator(0), MaxValueValidator(100)],
@@ -191,6 +330,9 @@ class SatisfactionSurvey(TimeStampedModel):
 
     class Meta:
         ordering = ['-conducted_at']
+        indexes = [
+            models.Index(fields=['professional', 'updated_at'], name='clinical_survey_sync_idx'),
+        ]
 
     def __str__(self):
         return f'Satisfação {self.patient.full_name} - {self.conducted_at}'
@@ -198,7 +340,7 @@ class SatisfactionSurvey(TimeStampedModel):
 
 class FamilySession(TimeStampedModel):
     patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='family_sessions')
-    professional = models.ForeignKey(Professional, on_delete=models.CASCADE, related_name='family_sessions')
+    professional = models.ForeignKey(Professional, on_delete=models.CASCADE, related_name='family_sessions', db_index=False)
     session_date = models.DateField()
     topic = models.CharField(max_length=180)
     activities = models.TextField()
@@ -208,6 +350,9 @@ class FamilySession(TimeStampedModel):
 
     class Meta:
         ordering = ['-session_date']
+        indexes = [
+            models.Index(fields=['professional', 'updated_at'], name='clinical_family_sync_idx'),
+        ]
 
     def __str__(self):
         return f'Ação Psicoeducativa - {self.patient.full_name} ({self.session_date})'
@@ -217,13 +362,70 @@ class AuditLog(TimeStampedModel):
     professional = models.ForeignKey(Professional, on_delete=models.SET_NULL, null=True, blank=True, related_name='audit_logs')
     action = models.CharField(max_length=180)
     entity = models.CharField(max_length=120)
-    entity_id = models.CharField(max_length=64)
+    entity_id = models.CharField(max_length=64, db_index=True)
     metadata = models.JSONField(default=dict, blank=True)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.CharField(max_length=255, blank=True)
 
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['-created_at'], name='clinical_auditlog_created_idx'),
+        ]
 
     def __str__(self):
         return f'{self.action} on {self.entity}#{self.entity_id}'
+
+
+class Tombstone(models.Model):
+    professional = models.ForeignKey(
+        Professional,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+',
+        db_index=False,
+    )
+    entity = models.CharField(max_length=120)
+    entity_id = models.BigIntegerField()
+    patient_id = models.BigIntegerField(null=True, blank=True)
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ['deleted_at']
+        indexes = [
+            models.Index(fields=['professional', 'deleted_at'], name='clinical_tombstone_sync_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.entity}#{self.entity_id} removido em {self.deleted_at:%d/%m/%Y %H:%M}'
+
+    @staticmethod
+    def retention_start():
+        """Tombstones older than this may be pruned; sync cursors older than it must resync."""
+        return timezone.now() - timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+
+
+class SearchDocument(models.Model):
+    """
+    Free text of a patient, session or report flattened into one row, indexed
+    for full-text search (GIN on PostgreSQL, FTS5 on SQLite; see clinical.search).
+    """
+
+    class Source(models.TextChoices):
+        PATIENT = 'patient', _('Paciente')
+        SESSION = 'session', _('Sessão')
+        REPORT = 'report', _('Relatório')
+
+    professional = models.ForeignKey(Professional, on_delete=models.CASCADE, related_name='+')
+    patient = models.ForeignKey(Patient, on_delete=models.CASCADE, related_name='+')
+    source = models.CharField(max_length=16, choices=Source.choices)
+    object_id = models.BigIntegerField()
+    content = models.TextField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'object_id'], name='clinical_searchdoc_source_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.source}#{self.object_id}'
@@ -11,16 +11,13 @@ class IsOwnerProfessional(permissions.BasePermission):
         if not user.is_authenticated:
             return False
 
-        owner = getattr(obj, 'professional', None)
-        if owner:
-            return owner_id(owner) == owner_id(user)
+        # Compare foreign key ids so the check never loads the related rows.
+        owner_pk = getattr(obj, 'professional_id', None)
+        if owner_pk is not None:
+            return owner_pk == user.pk
 
         patient = getattr(obj, 'patient', None)
-        if patient and patient.professional:
-            return owner_id(patient.professional) == owner_id(user)
+        if patient is not None and patient.professional_id is not None:
+            return patient.professional_id == user.pk
 
         return False
-
-
-def owner_id(professional):
-    return getattr(professional, 'pk', None)
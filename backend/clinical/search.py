@@ -0,0 +1,218 @@
+import html
+import math
+import re
+from datetime import timedelta
+
+from django.db import connections, router, transaction
+from django.db.models import Case, IntegerField, Q, Value, When
+from django.db.models.functions import Length
+from django.utils import timezone
+
+from .models import Patient, Report, SearchDocument, Session, normalize_name
+
+SEARCH_FIELDS = {
+    SearchDocument.Source.PATIENT: (
+        Patient,
+        ('initial_diagnosis', 'behavior_history', 'school_history', 'family_history', 'notes'),
+    ),
+    SearchDocument.Source.SESSION: (Session, ('progress_notes', 'behaviour_observations')),
+    SearchDocument.Source.REPORT: (Report, ('content',)),
+}
+
+FTS_TABLE = 'clinical_searchdocument_fts'
+
+# Matched terms come back wrapped in control characters so the rest of the
+# snippet can be HTML-escaped before they become <mark> tags.
+MARK_START = '\x02'
+MARK_END = '\x03'
+SNIPPET_WORDS = 16
+
+
+def source_for(model):
+    for source, (source_model, fields) in SEARCH_FIELDS.items():
+        if source_model is model:
+            return source, fields
+    raise LookupError(model)
+
+
+def build_document(source, instance, fields):
+    content = '\n'.join(value for value in (getattr(instance, field) for field in fields) if value)
+    if not content:
+        return None
+    return SearchDocument(
+        professional_id=instance.professional_id,
+        patient_id=instance.pk if source == SearchDocument.Source.PATIENT else instance.patient_id,
+        source=source,
+        object_id=instance.pk,
+        content=content,
+    )
+
+
+def upsert_documents(documents, using=None):
+    SearchDocument.objects.using(using).bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=['source', 'object_id'],
+        update_fields=['professional', 'patient', 'content'],
+    )
+
+
+def index_instance(sender, instance, created=False, update_fields=None, using=None, **kwargs):
+    """post_save hook: upsert the search document of a patient, session or report."""
+    source, fields = source_for(sender)
+    if update_fields is not None and not set(update_fields) & set(fields):
+        return
+    document = build_document(source, instance, fields)
+    if document is not None:
+        upsert_documents([document], using=using)
+    elif not created:
+        SearchDocument.objects.using(using).filter(source=source, object_id=instance.pk).delete()
+
+
+def remove_instance(sender, instance, using=None, **kwargs):
+    source, _fields = source_for(sender)
+    SearchDocument.objects.using(using).filter(source=source, object_id=instance.pk).delete()
+
+
+def rebuild_index(batch_size=2000, using='default'):
+    """Recreate every search document; needed after bulk loads that skip signals."""
+    total = 0
+    with transaction.atomic(using=using):
+        SearchDocument.objects.using(using).all().delete()
+        for source, (model, fields) in SEARCH_FIELDS.items():
+            columns = ['pk', 'professional_id', *fields]
+            if model is not Patient:
+                columns.append('patient_id')
+            batch = []
+            for instance in model.objects.using(using).only(*columns).iterator(chunk_size=batch_size):
+                document = build_document(source, instance, fields)
+                if document is not None:
+                    batch.append(document)
+                if len(batch) >= batch_size:
+                    SearchDocument.objects.using(using).bulk_create(batch)
+                    total += len(batch)
+                    batch = []
+            if batch:
+                SearchDocument.objects.using(using).bulk_create(batch)
+                total += len(batch)
+    return total
+
+
+def fts_match_expression(text):
+    """User text as an FTS5 MATCH expression: every word required, as a prefix."""
+    return ' '.join(f'"{term}"*' for term in re.findall(r'\w+', text))
+
+
+def search(professional, text, limit=20):
+    """Ranked documents of the professional matching `text`, best first."""
+    alias = router.db_for_read(SearchDocument)
+    vendor = connections[alias].vendor
+    if vendor == 'postgresql':
+        rows = _search_postgresql(alias, professional.pk, text, limit)
+    elif vendor == 'sqlite':
+        rows = _search_sqlite(alias, professional.pk, text, limit)
+    else:
+        rows = _search_fallback(alias, professional.pk, text, limit)
+    return [
+        {
+            'source': source,
+            'object_id': object_id,
+            'patient_id': patient_id,
+            'patient_name': patient_name,
+            'rank': round(float(rank), 6),
+            'snippet': html.escape(snippet).replace(MARK_START, '<mark>').replace(MARK_END, '</mark>'),
+        }
+        for source, object_id, patient_id, patient_name, rank, snippet in rows
+    ]
+
+
+def _search_postgresql(alias, professional_id, text, limit):
+    # The WHERE clause repeats the expression of clinical_searchdoc_fts_idx so the GIN index is used;
+    # ts_headline is expensive, so it only runs for the rows that survive the LIMIT.
+    headline_options = (
+        f'StartSel={MARK_START}, StopSel={MARK_END}, MaxWords={SNIPPET_WORDS}, MinWords=6, '
+        'MaxFragments=2, FragmentDelimiter=" … "'
+    )
+    sql = """
+        SELECT hit.source, hit.object_id, hit.patient_id, patient.full_name, hit.rank,
+               ts_headline('portuguese'::regconfig, hit.content, hit.query, %s)
+        FROM (
+            SELECT document.source, document.object_id, document.patient_id, document.content, query,
+                   ts_rank(to_tsvector('portuguese'::regconfig, document.content), query) AS rank
+            FROM clinical_searchdocument document,
+                 websearch_to_tsquery('portuguese'::regconfig, %s) query
+            WHERE document.professional_id = %s
+              AND to_tsvector('portuguese'::regconfig, document.content) @@ query
+            ORDER BY rank DESC, document.id
+            LIMIT %s
+        ) hit
+        JOIN clinical_patient patient ON patient.id = hit.patient_id
+        ORDER BY hit.rank DESC
+    """
+    with connections[alias].cursor() as cursor:
+        cursor.execute(sql, [headline_options, text, professional_id, limit])
+        return cursor.fetchall()
+
+
+def _search_sqlite(alias, professional_id, text, limit):
+    expression = fts_match_expression(text)
+    if not expression:
+        return []
+    # CROSS JOIN keeps SQLite from driving the join by professional_id and
+    # probing the FTS index once per document.
+    sql = f"""
+        SELECT document.source, document.object_id, document.patient_id, patient.full_name,
+               -bm25({FTS_TABLE}), snippet({FTS_TABLE}, 0, %s, %s, ' … ', {SNIPPET_WORDS})
+        FROM {FTS_TABLE}
+        CROSS JOIN clinical_searchdocument document ON document.id = {FTS_TABLE}.rowid
+        JOIN clinical_patient patient ON patient.id = document.patient_id
+        WHERE {FTS_TABLE} MATCH %s AND document.professional_id = %s
+        ORDER BY bm25({FTS_TABLE})
+        LIMIT %s
+    """
+    with connections[alias].cursor() as cursor:
+        cursor.execute(sql, [MARK_START, MARK_END, expression, professional_id, limit])
+        return cursor.fetchall()
+
+
+def _search_fallback(alias, professional_id, text, limit):
+    terms = re.findall(r'\w+', text)
+    if not terms:
+        return []
+    queryset = SearchDocument.objects.using(alias).filter(professional_id=professional_id)
+    for term in terms:
+        queryset = queryset.filter(content__icontains=term)
+    rows = []
+    for document in queryset.select_related('patient').order_by('-pk')[:limit]:
+        position = document.content.lower().find(terms[0].lower())
+        start = max(position - 60, 0)
+        snippet = document.content[start:position + 60]
+        for term in terms:
+            snippet = re.sub(f'({re.escape(term)})', f'{MARK_START}\\1{MARK_END}', snippet, flags=re.IGNORECASE)
+        rows.append((document.source, document.object_id, document.patient_id, document.patient.full_name, 0, snippet))
+    return rows
+
+
+def patient_typeahead(queryset, text):
+    """
+    Patients whose name has a word starting with each typed term, ignoring case
+    and accents; whole-name prefix matches first, then shorter names.
+
+    The LIKE patterns are served by clinical_patient_name_trgm_idx on PostgreSQL
+    and by scanning clinical_patient_search_idx (professional, search_name) on SQLite.
+    """
+    terms = normalize_name(text).split()
+    if not terms:
+        return queryset
+    for term in terms:
+        queryset = queryset.filter(Q(search_name__startswith=term) | Q(search_name__contains=f' {term}'))
+    rank = Case(When(search_name__startswith=' '.join(terms), then=Value(0)), default=Value(1), output_field=IntegerField())
+    return queryset.annotate(search_rank=rank).order_by('search_rank', Length('search_name'), 'search_name', 'pk')
+
+
+def birth_date_range(min_age=None, max_age=None, today=None):
+    """(earliest, latest) birth dates for ages in [min_age, max_age], as serializers.calculate_age counts them."""
+    today = today or timezone.localdate()
+    latest = today - timedelta(days=math.ceil(min_age * 365.25)) if min_age is not None else None
+    earliest = today - timedelta(days=math.ceil((max_age + 1) * 365.25) - 1) if max_age is not None else None
+    return earliest, latest
@@ -1,10 +1,12 @@
-from datetime import date
-
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from rest_framework import serializers
 
+from core.instrumentation import current_timings, timed
+
 from . import models
 from .constants import DIAGNOSTIC_QUESTIONS, DIAGNOSTIC_RECOMMENDATIONS
 
@@ -12,7 +14,22 @@ from .constants import DIAGNOSTIC_QUESTIONS, DIAGNOSTIC_RECOMMENDATIONS
 Professional = get_user_model()
 
 
-class ProfessionalSerializer(serializers.ModelSerializer):
+def calculate_age(birth_date, today=None):
+    if not birth_date:
+        return None
+    delta = (today or timezone.localdate()) - birth_date
+    return int(delta.days / 365.25)
+
+
+class TimedModelSerializer(serializers.ModelSerializer):
+    def to_representation(self, instance):
+        if current_timings() is None:
+            return super().to_representation(instance)
+        with timed('serialize'):
+            return super().to_representation(instance)
+
+
+class ProfessionalSerializer(TimedModelSerializer):
     class Meta:
         model = Professional
         fields = (
@@ -50,7 +67,7 @@ class ProfessionalSerializer(serializers.ModelSerializer):
         return instance
 
 
-class PatientSerializer(serializers.ModelSerializer):
+class PatientSerializer(TimedModelSerializer):
     age = serializers.SerializerMethodField()
     school_history_file = serializers.FileField(required=False, allow_null=True)
 
@@ -80,13 +97,10 @@ class PatientSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'created_at', 'updated_at', 'age')
 
     def get_age(self, obj):
-        if not obj.birth_date:
-            return None
-        delta = date.today() - obj.birth_date
-        return int(delta.days / 365.25)
+        return calculate_age(obj.birth_date)
 
 
-class AssessmentSerializer(serializers.ModelSerializer):
+class AssessmentSerializer(TimedModelSerializer):
     class Meta:
         model = models.Assessment
         fields = (
@@ -110,7 +124,7 @@ class AssessmentSerializer(serializers.ModelSerializer):
         return attrs
 
 
-class DiagnosticAssessmentSerializer(serializers.ModelSerializer):
+class DiagnosticAssessmentSerializer(TimedModelSerializer):
     patient = serializers.PrimaryKeyRelatedField(queryset=models.Patient.objects.all())
     pdf_url = serializers.SerializerMethodField(read_only=True)
     recommendations = serializers.SerializerMethodField(read_only=True)
@@ -192,7 +206,7 @@ class DiagnosticAssessmentSerializer(serializers.ModelSerializer):
 
     def validate_patient(self, value):
         request = self.context.get('request')
-        if request and value.professional != request.user:
+        if request and value.professional_id != request.user.pk:
             raise serializers.ValidationError(_('O paciente selecionado não pertence à profissional autenticada.'))
         return value
 
@@ -311,7 +325,7 @@ class DiagnosticAssessmentSerializer(serializers.ModelSerializer):
         return obj.get_functional_level_display()
 
 
-class TherapeuticPlanSerializer(serializers.ModelSerializer):
+class TherapeuticPlanSerializer(TimedModelSerializer):
     class Meta:
         model = models.TherapeuticPlan
         fields = (
@@ -330,7 +344,7 @@ class TherapeuticPlanSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'created_at', 'updated_at', 'pdf_storage_path', 'review_reminder_sent_for')
 
 
-class SessionSerializer(serializers.ModelSerializer):
+class SessionSerializer(TimedModelSerializer):
     class Meta:
         model = models.Session
         fields = (
@@ -349,7 +363,7 @@ class SessionSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'created_at', 'updated_at')
 
 
-class ReportSerializer(serializers.ModelSerializer):
+class ReportSerializer(TimedModelSerializer):
     report_type_display = serializers.CharField(source='get_report_type_display', read_only=True)
 
     class Meta:
@@ -366,7 +380,7 @@ class ReportSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'generated_at', 'exported_pdf_path', 'report_type_display')
 
 
-class SatisfactionSurveySerializer(serializers.ModelSerializer):
+class SatisfactionSurveySerializer(TimedModelSerializer):
     class Meta:
         model = models.SatisfactionSurvey
         fields = (
@@ -381,7 +395,7 @@ class SatisfactionSurveySerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'created_at', 'updated_at')
 
 
-class FamilySessionSerializer(serializers.ModelSerializer):
+class FamilySessionSerializer(TimedModelSerializer):
     class Meta:
         model = models.FamilySession
         fields = (
@@ -398,7 +412,7 @@ class FamilySessionSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'created_at', 'updated_at')
 
 
-class PatientDetailSerializer(serializers.ModelSerializer):
+class PatientDetailSerializer(TimedModelSerializer):
     assessments = AssessmentSerializer(many=True, read_only=True)
     therapeutic_plan = TherapeuticPlanSerializer(read_only=True)
     sessions = SessionSerializer(many=True, read_only=True)
@@ -457,3 +471,17 @@ class DashboardIndicatorSerializer(serializers.Serializer):
     therapeutic_adherence_rate = serializers.FloatField()
     last_update = serializers.DateTimeField()
     progress_series = serializers.ListField(child=serializers.DictField(), default=list)
+
+
+class BatchSubRequestSerializer(serializers.Serializer):
+    path = serializers.CharField(max_length=500)
+
+
+class BatchRequestSerializer(serializers.Serializer):
+    requests = BatchSubRequestSerializer(many=True, allow_empty=False)
+
+    def validate_requests(self, value):
+        limit = settings.API_BATCH_MAX_REQUESTS
+        if len(value) > limit:
+            raise serializers.ValidationError(_('Máximo de %(limit)d requisições por lote.') % {'limit': limit})
+        return value
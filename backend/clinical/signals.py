@@ -0,0 +1,49 @@
+from django.db.models.signals import post_delete, post_save
+
+from core.db_router import pin_to_primary
+
+from . import models, search
+
+SYNCED_MODELS = (
+    models.Patient,
+    models.Assessment,
+    models.DiagnosticAssessment,
+    models.TherapeuticPlan,
+    models.Session,
+    models.Report,
+    models.SatisfactionSurvey,
+    models.FamilySession,
+)
+
+
+def record_tombstone(sender, instance, **kwargs):
+    patient_id = instance.pk if sender is models.Patient else instance.patient_id
+    models.Tombstone.objects.create(
+        professional_id=instance.professional_id,
+        entity=sender.__name__,
+        entity_id=instance.pk,
+        patient_id=patient_id,
+    )
+
+
+def pin_writer_to_primary(sender, instance, **kwargs):
+    pin_to_primary(instance.professional_id)
+
+
+for synced_model in SYNCED_MODELS:
+    post_delete.connect(record_tombstone, sender=synced_model, dispatch_uid=f'tombstone-{synced_model.__name__}')
+    post_save.connect(pin_writer_to_primary, sender=synced_model, dispatch_uid=f'replica-pin-save-{synced_model.__name__}')
+    post_delete.connect(pin_writer_to_primary, sender=synced_model, dispatch_uid=f'replica-pin-delete-{synced_model.__name__}')
+
+for indexed_model, _fields in search.SEARCH_FIELDS.values():
+    post_save.connect(search.index_instance, sender=indexed_model, dispatch_uid=f'search-index-{indexed_model.__name__}')
+    post_delete.connect(search.remove_instance, sender=indexed_model, dispatch_uid=f'search-remove-{indexed_model.__name__}')
+
+
+def invalidate_professional_cache(sender, instance, using=None, **kwargs):
+    # After commit, or a concurrent request could cache the old row again before it is visible.
+    models.invalidate_cached_users([instance.pk], using=using)
+
+
+post_save.connect(invalidate_professional_cache, sender=models.Professional, dispatch_uid='jwt-user-cache-save')
+post_delete.connect(invalidate_professional_cache, sender=models.Professional, dispatch_uid='jwt-user-cache-delete')
@@ -1,3 +1,936 @@
-from django.test import TestCase
+import io
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, router
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core import db_router, metrics
+from core.slow_queries import fingerprint
+
+from . import authentication, exports, models
+from .constants import DIAGNOSTIC_QUESTIONS
+from .management.commands.import_legacy_clinical import Command as LegacyImportCommand
+from .management.commands.send_review_reminders import Command as ReminderCommand
+from .views import encode_sync_cursor as views_cursor
+
+
+class QueryBudgetTestCase(TestCase):
+    """
+    Each endpoint must issue the same number of queries whatever the row
+    counts (no N+1), and writes must stay within a fixed budget.
+    """
+
+    def setUp(self):
+        self.professional = models.Professional.objects.create_user(
+            'budget@teacare.local', 'budget@teacare.local', 'budget123', full_name='Profissional', crp='06/12345'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.professional)
+        self.patient = self.create_patient()
+        self.populate(self.patient, 1)
+
+    def create_patient(self):
+        patient = models.Patient.objects.create(
+            professional=self.professional, full_name='Paciente', birth_date=date(2016, 5, 1), sex='F'
+        )
+        models.TherapeuticPlan.objects.create(
+            patient=patient,
+            professional=self.professional,
+            general_objectives='Objetivos',
+            specific_objectives='Especificos',
+            strategies='Estrategias',
+            start_date=date.today(),
+            next_review_date=date.today() + timedelta(days=90),
+        )
+        return patient
+
+    def populate(self, patient, count):
+        today = date.today()
+        start = models.Assessment.objects.filter(patient=patient).count()
+        for index in range(start, start + count):
+            common = {'patient': patient, 'professional': self.professional}
+            models.Assessment.objects.create(
+                scale='ATEC', application_date=today - timedelta(days=index), score_total=10, **common
+            )
+            models.Session.objects.create(
+                session_type='psychological', session_date=today, activities='Atividade', progress_scales={'progress': 50}, **common
+            )
+            models.Report.objects.create(report_type='technical', summary='Resumo', content='Conteudo', **common)
+            models.SatisfactionSurvey.objects.create(engagement_index=80, conducted_at=today, **common)
+            models.FamilySession.objects.create(session_date=today, topic='Tema', activities='Atividade', **common)
+            models.DiagnosticAssessment.objects.create(
+                responses=self.stored_responses(), score_total=0, functional_level='mild', **common
+            )
+
+    def grow(self):
+        for _index in range(4):
+            self.populate(self.create_patient(), 3)
+        self.populate(self.patient, 5)
+
+    def stored_responses(self):
+        return [
+            {
+                'question_id': question['id'],
+                'question': question['text'],
+                'axis': question['axis'],
+                'score': 1,
+                'answer': 'yes',
+                'answer_label': 'Sim',
+                'failed': False,
+                'critical': question.get('critical', False),
+                'observation': '',
+            }
+            for question in DIAGNOSTIC_QUESTIONS
+        ]
+
+    def diagnostic_payload(self):
+        return {
+            'patient': self.patient.pk,
+            'responses': [{'question_id': question['id'], 'score': 'sim'} for question in DIAGNOSTIC_QUESTIONS],
+        }
+
+    def capture(self, method, path, data=None):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(self.client, method)(path, data, format='json')
+        self.assertLess(response.status_code, 400, f'{method.upper()} {path}: {response.status_code}')
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return [query['sql'] for query in context.captured_queries]
+
+    def assertConstantQueries(self, path):
+        baseline = self.capture('get', path)
+        self.grow()
+        grown = self.capture('get', path)
+        if len(grown) != len(baseline):
+            repeated = Counter(map(fingerprint, grown)) - Counter(map(fingerprint, baseline))
+            details = '\n'.join(f'  +{count}x {sql}' for sql, count in repeated.most_common())
+            self.fail(f'GET {path}: {len(baseline)} -> {len(grown)} queries as rows grew. Extra queries:\n{details}')
+
+    def assertQueryBudget(self, budget, method, path, data=None):
+        queries = self.capture(method, path, data)
+        if len(queries) > budget:
+            details = '\n'.join(f'  {index}. {sql}' for index, sql in enumerate(queries, 1))
+            self.fail(f'{method.upper()} {path}: {len(queries)} queries, budget is {budget}:\n{details}')
+
+    def child_paths(self):
+        kwargs = {'patient_pk': self.patient.pk}
+        return {
+            name: reverse(f'patient-{name}-list', kwargs=kwargs)
+            for name in ('assessment', 'pts', 'session', 'report', 'survey', 'family')
+        }
+
+    def test_patient_list(self):
+        self.assertConstantQueries(reverse('patient-list'))
+
+    def test_patient_detail(self):
+        self.assertConstantQueries(reverse('patient-detail', kwargs={'pk': self.patient.pk}))
+
+    def test_patient_timeline(self):
+        self.assertConstantQueries(reverse('patient-timeline', kwargs={'pk': self.patient.pk}))
+
+    def test_patient_lookup(self):
+        self.assertConstantQueries(reverse('patient-lookup'))
+
+    def test_patient_child_lists(self):
+        for name, path in self.child_paths().items():
+            with self.subTest(name):
+                self.assertConstantQueries(path)
+
+    def test_diagnostic_list(self):
+        self.assertConstantQueries(reverse('diagnostic-assessment-list'))
+
+    def test_dashboard(self):
+        self.assertConstantQueries(reverse('dashboard'))
+
+    def test_sync(self):
+        self.assertConstantQueries(reverse('sync'))
+
+    def test_diagnostic_detail_and_pdf(self):
+        assessment = models.DiagnosticAssessment.objects.filter(patient=self.patient).first()
+        self.assertQueryBudget(1, 'get', reverse('diagnostic-assessment-detail', kwargs={'pk': assessment.pk}))
+        self.assertQueryBudget(1, 'get', reverse('diagnostic-assessment-pdf', kwargs={'pk': assessment.pk}))
+
+    def test_diagnostic_create(self):
+        # patient lookup + insert + audit log
+        self.assertQueryBudget(3, 'post', reverse('diagnostic-assessment-list'), self.diagnostic_payload())
+
+    def test_child_update_and_delete(self):
+        session = models.Session.objects.filter(patient=self.patient).first()
+        path = reverse('patient-session-detail', kwargs={'patient_pk': self.patient.pk, 'pk': session.pk})
+        # patient check + object (with patient joined) + update + search index upsert + audit log
+        self.assertQueryBudget(5, 'patch', path, {'progress_notes': 'Atualizado'})
+        # patient check + object + audit log + delete (with its cascades) + tombstone + search index
+        self.assertQueryBudget(7, 'delete', path)
+
+    def test_child_create(self):
+        path = self.child_paths()['family']
+        # patient check + insert + audit log
+        self.assertQueryBudget(3, 'post', path, {'session_date': str(date.today()), 'topic': 'Tema', 'activities': 'Atividade'})
+
+    def test_patient_update(self):
+        path = reverse('patient-detail', kwargs={'pk': self.patient.pk})
+        # object + update + search index upsert + audit log
+        self.assertQueryBudget(4, 'patch', path, {'notes': 'Atualizado'})
+
+    def test_patient_noop_update(self):
+        path = reverse('patient-detail', kwargs={'pk': self.patient.pk})
+        # object + audit log: unchanged values skip the UPDATE
+        self.assertQueryBudget(2, 'patch', path, {'notes': self.patient.notes})
+
+    def test_search(self):
+        self.assertQueryBudget(1, 'get', reverse('search'), {'q': 'conteudo'})
+
+    def test_patient_typeahead(self):
+        self.assertConstantQueries(f"{reverse('patient-list')}?q=pac&age_band=-12")
+
+
+class DirtyTrackingTestCase(TestCase):
+    def setUp(self):
+        self.professional = models.Professional.objects.create_user(
+            'dirty@teacare.local', 'dirty@teacare.local', 'dirty123', full_name='Profissional', crp='06/12345'
+        )
+        self.patient = models.Patient.objects.create(
+            professional=self.professional, full_name='Paciente', birth_date=date(2016, 5, 1), sex='F'
+        )
+        self.plan = models.TherapeuticPlan.objects.create(
+            patient=self.patient,
+            professional=self.professional,
+            general_objectives='Objetivos',
+            specific_objectives='Especificos',
+            strategies='Estrategias',
+            start_date=date.today(),
+            next_review_date=date.today() + timedelta(days=90),
+        )
+
+    def test_plan_review_change_resets_reminder(self):
+        plan = self.plan
+        models.TherapeuticPlan.objects.filter(pk=plan.pk).update(review_reminder_sent_for=plan.next_review_date)
+        plan.refresh_from_db()
+        with CaptureQueriesContext(connection) as context:
+            plan.strategies = 'Novas estrategias'
+            plan.save()
+        self.assertEqual(len(context.captured_queries), 1)
+        self.assertNotIn('"next_review_date"', context.captured_queries[0]['sql'])
+        self.assertTrue(models.TherapeuticPlan.objects.filter(pk=plan.pk, review_reminder_sent_for__isnull=False).exists())
+        plan.next_review_date += timedelta(days=30)
+        plan.save()
+        self.assertFalse(plan.has_changed('next_review_date'))
+        self.assertTrue(models.TherapeuticPlan.objects.filter(pk=plan.pk, review_reminder_sent_for__isnull=True).exists())
+
+    def test_json_changed_in_place_is_saved(self):
+        plan = models.TherapeuticPlan.objects.get(pk=self.plan.pk)
+        self.assertEqual(plan.changed_fields(), [])
+        self.assertIsInstance(plan._loaded_values['monitoring_indicators'], str)
+        plan.monitoring_indicators['comunicacao'] = 3
+        self.assertEqual(plan.changed_fields(), ['monitoring_indicators'])
+        plan.save()
+        plan.refresh_from_db()
+        self.assertEqual(plan.monitoring_indicators, {'comunicacao': 3})
+
+    def test_files_are_snapshotted_by_name(self):
+        models.Patient.objects.filter(pk=self.patient.pk).update(school_history_file='school_history/historico.pdf')
+        patient = models.Patient.objects.get(pk=self.patient.pk)
+        self.assertEqual(patient.school_history_file.name, 'school_history/historico.pdf')
+        patient._snapshot()
+        self.assertEqual(patient._loaded_values['school_history_file'], 'school_history/historico.pdf')
+        self.assertEqual(patient.changed_fields(), [])
+        patient.school_history_file = 'school_history/outro.pdf'
+        self.assertEqual(patient.changed_fields(), ['school_history_file'])
+
+
+class SearchTestCase(TestCase):
+    def setUp(self):
+        self.professional = models.Professional.objects.create_user(
+            'busca@teacare.local', 'busca@teacare.local', 'busca123', full_name='Profissional', crp='06/12345'
+        )
+        self.patient = models.Patient.objects.create(
+            professional=self.professional, full_name='Paciente', birth_date=date(2016, 5, 1), sex='F'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.professional)
+
+    def search(self, text):
+        return self.client.get(reverse('search'), {'q': text})
+
+    def test_ranked_hits_of_own_patients(self):
+        models.Session.objects.create(
+            patient=self.patient,
+            professional=self.professional,
+            session_type='psychological',
+            session_date=date.today(),
+            activities='Atividade',
+            behaviour_observations='Demonstrou <irritabilidade> com ruídos altos.',
+        )
+        other = models.Professional.objects.create_user(
+            'outro@teacare.local', 'outro@teacare.local', 'outro123', full_name='Outro', crp='06/54321'
+        )
+        models.Patient.objects.create(
+            professional=other, full_name='Alheio', birth_date=date(2015, 1, 1), sex='M', notes='Irritabilidade'
+        )
+        results = self.search('irritab ruidos').json()['results']
+        self.assertEqual([(hit['source'], hit['patient_id']) for hit in results], [('session', self.patient.pk)])
+        self.assertIn('&lt;<mark>irritabilidade</mark>&gt;', results[0]['snippet'])
+
+    def test_index_follows_saves(self):
+        self.patient.notes = 'Seletividade alimentar'
+        self.patient.save()
+        self.assertEqual(len(self.search('seletividade').json()['results']), 1)
+        self.patient.notes = ''
+        self.patient.save()
+        self.assertEqual(self.search('seletividade').json()['results'], [])
+
+    def test_short_query_is_rejected(self):
+        self.assertEqual(self.search('a').status_code, 400)
+
+
+class PatientTypeaheadTestCase(TestCase):
+    def setUp(self):
+        professional = models.Professional.objects.create_user(
+            'typeahead@teacare.local', 'typeahead@teacare.local', 'typeahead123', full_name='Profissional', crp='06/12345'
+        )
+        for full_name, birth_date in (('João Silva', date(2020, 1, 1)), ('Silvana Souza', date(2010, 1, 1)), ('Ana Sílvia', date(2019, 1, 1))):
+            models.Patient.objects.create(professional=professional, full_name=full_name, birth_date=birth_date, sex='F')
+        self.client = APIClient()
+        self.client.force_authenticate(professional)
+
+    def names(self, **params):
+        return [row['full_name'] for row in self.client.get(reverse('patient-list'), params).json()['results']]
+
+    def test_prefix_matches_ignore_case_and_accents(self):
+        self.assertEqual(self.names(q='SIL'), ['Silvana Souza', 'Ana Sílvia', 'João Silva'])
+        self.assertEqual(self.names(q='joao s'), ['João Silva'])
+
+    def test_age_band_filter(self):
+        self.assertEqual(self.names(q='sil', age_band='-12'), ['Ana Sílvia', 'João Silva'])
+        self.assertEqual(self.client.get(reverse('patient-list'), {'age_band': '12'}).status_code, 400)
+
+
+class PatientLookupTestCase(TestCase):
+    def setUp(self):
+        self.professional = models.Professional.objects.create_user(
+            'lookup@teacare.local', 'lookup@teacare.local', 'lookup123', full_name='Profissional', crp='06/12345'
+        )
+        models.Patient.objects.create(
+            professional=self.professional, full_name='Ana', birth_date=date(2016, 5, 1), sex='F'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.professional)
+
+    def test_age_uses_local_date(self):
+        # 01:00 UTC on the birthday is still the day before in America/Sao_Paulo
+        moment = datetime(2026, 5, 1, 1, 0, tzinfo=dt_timezone.utc)
+        with mock.patch('django.utils.timezone.now', return_value=moment):
+            response = self.client.get(reverse('patient-lookup'))
+        self.assertEqual(json.loads(response.content)[0]['age'], 9)
+
+    def test_not_modified(self):
+        etag = self.client.get(reverse('patient-lookup'))['ETag']
+        response = self.client.get(reverse('patient-lookup'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+
+def use_temp_metrics_dir(test_case):
+    """Point METRICS_DIR at a throwaway directory for the rest of the test."""
+    metrics_dir = tempfile.TemporaryDirectory()
+    test_case.addCleanup(metrics_dir.cleanup)
+    temp_dir = override_settings(METRICS_DIR=metrics_dir.name)
+    temp_dir.enable()
+    test_case.addCleanup(temp_dir.disable)
+    return metrics_dir.name
+
+
+class AdminSearchTestCase(TestCase):
+    def setUp(self):
+        self.admin = models.Professional.objects.create_superuser(
+            'admin@teacare.local', 'admin@teacare.local', 'admin123', full_name='Admin', crp='06/00000'
+        )
+        self.patient = models.Patient.objects.create(
+            professional=self.admin, full_name='Ângela Souza', birth_date=date(2016, 5, 1), sex='F'
+        )
+        models.Patient.objects.create(professional=self.admin, full_name='Bruna Souza', birth_date=date(2016, 5, 1), sex='F')
+        self.client.force_login(self.admin)
+
+    def search(self, model_name, term):
+        response = self.client.get(reverse(f'admin:clinical_{model_name}_changelist'), {'q': term})
+        self.assertEqual(response.status_code, 200)
+        return list(response.context['cl'].queryset)
+
+    def test_names_ignore_case_and_accents(self):
+        self.assertEqual(self.search('patient', 'ANGELA s'), [self.patient])
+        models.Session.objects.create(
+            patient=self.patient, professional=self.admin, session_type='psychological',
+            session_date=date(2024, 1, 1), activities='Jogos',
+        )
+        self.assertEqual([session.patient for session in self.search('session', 'angela')], [self.patient])
+
+    def test_audit_log_action_and_entity(self):
+        log = models.AuditLog.objects.create(professional=self.admin, action='patient.update', entity='Patient', entity_id='1')
+        self.assertEqual(self.search('auditlog', 'patient.update'), [log])
+        self.assertEqual(self.search('auditlog', 'Patient'), [log])
+        self.assertEqual(self.search('auditlog', 'patient'), [])
+
+
+class ReviewReminderTestCase(TestCase):
+    def setUp(self):
+        use_temp_metrics_dir(self)
+        professional = models.Professional.objects.create_user(
+            'lembrete@teacare.local', 'lembrete@teacare.local', 'lembrete123', full_name='Profissional', crp='06/12345'
+        )
+        patient = models.Patient.objects.create(
+            professional=professional,
+            full_name='Paciente',
+            birth_date=date(2016, 5, 1),
+            sex='F',
+            contact_email='familia@example.com',
+        )
+        self.plan = models.TherapeuticPlan.objects.create(
+            patient=patient,
+            professional=professional,
+            general_objectives='Objetivos',
+            specific_objectives='Especificos',
+            strategies='Estrategias',
+            start_date=date.today(),
+            next_review_date=date.today() + timedelta(days=3),
+        )
+
+    def run_command(self):
+        call_command('send_review_reminders', stdout=io.StringIO(), stderr=io.StringIO())
+
+    def test_sends_once(self):
+        self.run_command()
+        self.run_command()
+        self.assertEqual(len(mail.outbox), 1)
+        self.plan.refresh_from_db()
+        self.assertEqual(self.plan.review_reminder_sent_for, self.plan.next_review_date)
+        self.assertEqual(models.AuditLog.objects.filter(action='email_reminder').count(), 1)
+
+    def test_failed_reminder_is_retried_on_later_runs(self):
+        with mock.patch('clinical.management.commands.send_review_reminders.send_mail', side_effect=OSError('smtp')):
+            self.run_command()
+        self.plan.refresh_from_db()
+        self.assertIsNone(self.plan.review_reminder_sent_for)
+        # next day: the review is now two days ahead, still inside the default window
+        models.TherapeuticPlan.objects.filter(pk=self.plan.pk).update(next_review_date=date.today() + timedelta(days=2))
+        self.run_command()
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_plan_is_claimed_before_sending(self):
+        def assert_claimed(**kwargs):
+            self.plan.refresh_from_db()
+            self.assertEqual(self.plan.review_reminder_sent_for, self.plan.next_review_date)
+
+        with mock.patch('clinical.management.commands.send_review_reminders.send_mail', side_effect=assert_claimed):
+            self.run_command()
+
+    def test_review_date_changed_after_read_is_not_claimed(self):
+        stale = models.TherapeuticPlan.objects.get(pk=self.plan.pk)
+        models.TherapeuticPlan.objects.filter(pk=self.plan.pk).update(next_review_date=date.today() + timedelta(days=30))
+        self.assertFalse(ReminderCommand().claim(stale))
+        self.plan.refresh_from_db()
+        self.assertIsNone(self.plan.review_reminder_sent_for)
+
+
+class ClinicalExportTestCase(TestCase):
+    def setUp(self):
+        self.admin = models.Professional.objects.create_superuser(
+            'admin@teacare.local', 'admin@teacare.local', 'admin123', full_name='Admin', crp='06/00000'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def test_invalid_since(self):
+        path = reverse('clinical-export', kwargs={'table': 'clinical_patient'})
+        for since in ('ontem', '2024-13-01T00:00', '0001-01-01T00:00:00', '9999-12-31T23:59:59'):
+            with self.subTest(since):
+                self.assertEqual(self.client.get(path, {'since': since}).status_code, 400)
+                with self.assertRaises(CommandError):
+                    call_command('export_clinical', '/tmp', since=since, stdout=io.StringIO())
+
+    def test_since_overlaps_late_commits(self):
+        patient = models.Patient.objects.create(
+            professional=self.admin, full_name='Paciente', birth_date=date(2016, 5, 1), sex='F'
+        )
+        since = timezone.now()
+        # committed after the previous export read the table, stamped just before it
+        models.Patient.objects.filter(pk=patient.pk).update(updated_at=since - timedelta(seconds=2))
+        rows = list(exports.export_queryset(models.Patient, since))
+        self.assertEqual([row[0] for row in rows], [patient.pk])
+
+
+class SyncTestCase(TestCase):
+    def setUp(self):
+        self.professional = models.Professional.objects.create_user(
+            'sync@teacare.local', 'sync@teacare.local', 'sync123', full_name='Profissional', crp='06/12345'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.professional)
+        self.patients = [
+            models.Patient.objects.create(
+                professional=self.professional, full_name=f'Paciente {index}', birth_date=date(2016, 5, 1), sex='F'
+            )
+            for index in range(4)
+        ]
+        for patient in self.patients:
+            models.FamilySession.objects.create(
+                patient=patient, professional=self.professional, session_date=date.today(), topic='Tema', activities='Atividade'
+            )
+
+    def sync(self, **params):
+        response = self.client.get(reverse('sync'), params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def ids(self, payload, key):
+        return {item['id'] for kind in ('created', 'updated') for item in payload['changes'][key][kind]}
+
+    def test_incremental_sync_reports_changes_and_deletions(self):
+        full = self.sync()
+        self.assertTrue(full['full'])
+        self.assertEqual(self.ids(full, 'patients'), {patient.pk for patient in self.patients})
+
+        # everything below happens after the cursor, outside the overlap window
+        an_hour_ago = timezone.now() - timedelta(hours=1)
+        models.Patient.objects.update(created_at=an_hour_ago, updated_at=an_hour_ago)
+        models.FamilySession.objects.update(created_at=an_hour_ago, updated_at=an_hour_ago)
+        cursor = views_cursor(timezone.now() - timedelta(seconds=30))
+        changed, removed = self.patients[0], self.patients[1].family_sessions.get()
+        changed.notes = 'Atualizado'
+        changed.save()
+        removed_pk = removed.pk
+        removed.delete()
+
+        payload = self.sync(since=cursor)
+        self.assertFalse(payload['full'])
+        self.assertEqual(self.ids(payload, 'patients'), {changed.pk})
+        self.assertEqual([item['id'] for item in payload['changes']['patients']['updated']], [changed.pk])
+        self.assertEqual(
+            [(item['entity'], item['entity_id'], item['patient_id']) for item in payload['deleted']],
+            [('FamilySession', removed_pk, self.patients[1].pk)],
+        )
+        # the returned cursor round-trips: nothing new since it
+        models.Patient.objects.update(updated_at=timezone.now() - timedelta(minutes=1))
+        models.Tombstone.objects.update(deleted_at=timezone.now() - timedelta(minutes=1))
+        again = self.sync(since=payload['cursor'])
+        self.assertEqual(self.ids(again, 'patients'), set())
+        self.assertEqual(again['deleted'], [])
+
+    @override_settings(SYNC_PAGE_SIZE=3)
+    def test_pages_follow_next_token(self):
+        payload = self.sync()
+        pages = [payload]
+        while payload['next']:
+            payload = self.sync(page=payload['next'])
+            pages.append(payload)
+        self.assertEqual(len(pages), 3)
+        self.assertEqual({page['cursor'] for page in pages}, {pages[0]['cursor']})
+        for key, expected in (('patients', 4), ('family_sessions', 4)):
+            ids = [item['id'] for page in pages for item in page['changes'][key]['created']]
+            self.assertEqual(len(ids), expected)
+            self.assertEqual(len(set(ids)), expected)
+
+    @override_settings(SYNC_PAGE_SIZE=3)
+    def test_page_token_belongs_to_its_professional(self):
+        token = self.sync()['next']
+        other = models.Professional.objects.create_user(
+            'outro@teacare.local', 'outro@teacare.local', 'outro123', full_name='Outro', crp='06/54321'
+        )
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(reverse('sync'), {'page': token}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('sync'), {'page': token + 'x'}).status_code, 400)
+
+    def test_cursor_older_than_retention_is_gone(self):
+        cursor = views_cursor(timezone.now() - timedelta(days=31))
+        response = self.client.get(reverse('sync'), {'since': cursor})
+        self.assertEqual(response.status_code, 410)
+        self.assertTrue(response.json()['resync'])
+
+    def test_prune_tombstones(self):
+        self.patients[0].family_sessions.get().delete()
+        self.patients[1].family_sessions.get().delete()
+        models.Tombstone.objects.filter(patient_id=self.patients[0].pk).update(deleted_at=timezone.now() - timedelta(days=31))
+        call_command('prune_tombstones', stdout=io.StringIO())
+        self.assertEqual(list(models.Tombstone.objects.values_list('patient_id', flat=True)), [self.patients[1].pk])
+
+
+class BatchTestCase(TestCase):
+    def setUp(self):
+        self.professional, self.patient = self.create_professional('batch')
+        self.other_professional, self.other_patient = self.create_professional('outro')
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.professional)}')
+
+    def create_professional(self, name):
+        professional = models.Professional.objects.create_user(
+            f'{name}@teacare.local', f'{name}@teacare.local', f'{name}123', full_name=name.title(), crp='06/12345'
+        )
+        patient = models.Patient.objects.create(
+            professional=professional, full_name=f'Paciente {name}', birth_date=date(2016, 5, 1), sex='F'
+        )
+        return professional, patient
+
+    def batch(self, *paths):
+        return self.client.post(reverse('batch'), {'requests': [{'path': path} for path in paths]}, format='json')
+
+    def test_sub_requests_use_caller_credentials(self):
+        response = self.batch('/patients/lookup/', f'/patients/{self.other_patient.pk}/')
+        self.assertEqual(response.status_code, 200)
+        lookup, other = response.json()['responses']
+        self.assertEqual(lookup['status'], 200)
+        self.assertEqual([row['id'] for row in lookup['body']], [self.patient.pk])
+        self.assertEqual(other['status'], 404)
+
+    def test_authenticates_once_per_batch(self):
+        authenticate = authentication.CachedJWTAuthentication.authenticate
+        with mock.patch.object(
+            authentication.CachedJWTAuthentication, 'authenticate', autospec=True, side_effect=authenticate
+        ) as spy:
+            response = self.batch('/patients/lookup/', '/dashboard/', f'/patients/{self.patient.pk}/')
+        self.assertEqual([item['status'] for item in response.json()['responses']], [200, 200, 200])
+        self.assertEqual(spy.call_count, 1)
+
+    def test_requires_authentication(self):
+        self.client.credentials()
+        self.assertEqual(self.batch('/patients/lookup/').status_code, 401)
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer invalido')
+        self.assertEqual(self.batch('/patients/lookup/').status_code, 401)
+
+    def test_status_per_item(self):
+        response = self.batch(f'/patients/{self.patient.pk}/', '/inexistente/', '/batch/', '/sync/?since=ontem')
+        self.assertEqual(
+            [(item['path'], item['status']) for item in response.json()['responses']],
+            [
+                (f'/patients/{self.patient.pk}/', 200),
+                ('/inexistente/', 404),
+                ('/batch/', 400),
+                ('/sync/?since=ontem', 400),
+            ],
+        )
+        self.assertEqual(response.json()['responses'][0]['body']['full_name'], 'Paciente batch')
+
+    @override_settings(API_BATCH_MAX_REQUESTS=2)
+    def test_item_limit(self):
+        self.assertEqual(self.batch('/dashboard/', '/dashboard/').status_code, 200)
+        response = self.batch('/dashboard/', '/dashboard/', '/dashboard/')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('requests', response.json())
+
+
+def use_shared_cache(test_case):
+    """Switch the test to a file cache, which every worker would share, for the rest of the test."""
+    cache_dir = tempfile.TemporaryDirectory()
+    test_case.addCleanup(cache_dir.cleanup)
+    shared_cache = override_settings(
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': cache_dir.name}}
+    )
+    shared_cache.enable()
+    test_case.addCleanup(shared_cache.disable)
+
+
+class CachedJWTAuthenticationTestCase(TestCase):
+    def setUp(self):
+        use_shared_cache(self)
+        self.professional = models.Professional.objects.create_user(
+            'jwt@teacare.local', 'jwt@teacare.local', 'jwt12345', full_name='Profissional', crp='06/12345'
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.professional)}')
+        self.assertEqual(self.me().status_code, 200)
+        self.assertIsNotNone(cache.get(authentication.user_cache_key(self.professional.pk, authentication.get_user_version(self.professional.pk))))
+
+    def me(self):
+        return self.client.get(reverse('auth-profile'))
+
+    def cached_user(self):
+        pk = self.professional.pk
+        return cache.get(authentication.user_cache_key(pk, authentication.get_user_version(pk)))
+
+    def test_deactivation_is_rejected_after_commit(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.professional.is_active = False
+            self.professional.save()
+            # Still cached until the change is committed and visible to other connections.
+            self.assertIsNotNone(self.cached_user())
+        self.assertIsNone(self.cached_user())
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_password_change_drops_cached_user(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.professional.set_password('outra-senha')
+            self.professional.save()
+        self.assertEqual(self.me().status_code, 200)
+        self.assertEqual(self.cached_user().password, self.professional.password)
+
+    def test_queryset_update_invalidates(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            models.Professional.objects.filter(pk=self.professional.pk).update(is_active=False)
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_import_professionals_invalidates(self):
+        legacy_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(legacy_dir.cleanup)
+        legacy_path = f'{legacy_dir.name}/legado.sqlite3'
+        columns = (
+            'email', 'username', 'password', 'full_name', 'crp', 'profession', 'institution', 'accepts_notifications',
+            'is_active', 'is_staff', 'is_superuser', 'first_name', 'last_name', 'last_login', 'date_joined',
+        )
+        legacy = sqlite3.connect(legacy_path)
+        legacy.execute(f"CREATE TABLE clinical_professional ({', '.join(columns)})")
+        legacy.execute(
+            f"INSERT INTO clinical_professional VALUES ({', '.join('?' * len(columns))})",
+            ('jwt@teacare.local', 'jwt@teacare.local', self.professional.password, 'Profissional', '06/12345', '', '', 1,
+             0, 0, 0, '', '', None, None),
+        )
+        legacy.commit()
+        legacy.close()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('import_professionals', db_path=legacy_path, stdout=io.StringIO())
+        self.assertEqual(self.me().status_code, 401)
+
+    def test_local_memory_cache_is_bypassed(self):
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            self.assertFalse(authentication.user_cache_enabled())
+            self.assertEqual(self.me().status_code, 200)
+            self.assertIsNone(cache.get(authentication.user_cache_key(self.professional.pk, authentication.get_user_version(self.professional.pk))))
+
+
+class ImportLegacyClinicalTestCase(TestCase):
+    TABLES = {
+        'clinical_professional': (
+            ('id', 'email', 'username', 'password', 'full_name', 'crp', 'is_active', 'is_staff', 'is_superuser', 'date_joined'),
+            [
+                (7, 'existente@teacare.local', '', 'legado', 'Nome Antigo', '06/11111', 1, 1, 1, '2020-01-01T00:00:00'),
+                (8, 'novo@teacare.local', '', 'legado', 'Novo', '06/22222', 1, 0, 0, '2020-01-01T00:00:00'),
+                (9, 'existente@teacare.local', '', 'legado', 'Nome Legado', '06/33333', 1, 1, 1, '2020-01-01T00:00:00'),
+            ],
+        ),
+        'clinical_patient': (
+            ('id', 'professional_id', 'full_name', 'birth_date', 'sex', 'created_at', 'updated_at'),
+            [
+                (100, 9, 'Ana Souza', '2015-01-01', 'F', '2021-01-01T00:00:00', '2021-01-01T00:00:00'),
+                (101, 8, 'Bruno Lima', '2016-01-01', 'M', '2021-01-01T00:00:00', '2021-01-01T00:00:00'),
+            ],
+        ),
+        'clinical_session': (
+            ('id', 'patient_id', 'professional_id', 'session_type', 'session_date', 'activities', 'progress_notes', 'created_at', 'updated_at'),
+            [(500, 100, 9, 'psychological', '2024-01-01', 'Jogos', 'Evoluiu bem', '2024-01-01T00:00:00', '2024-01-01T00:00:00')],
+        ),
+        'clinical_auditlog': (
+            ('id', 'professional_id', 'action', 'entity', 'entity_id', 'created_at', 'updated_at'),
+            [(900, 7, 'update', 'Patient', '101', '2024-01-01T00:00:00', '2024-01-01T00:00:00')],
+        ),
+    }
+
+    def setUp(self):
+        legacy_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(legacy_dir.cleanup)
+        self.legacy_path = f'{legacy_dir.name}/legado.sqlite3'
+        self.checkpoint_dir = f'{legacy_dir.name}/checkpoint'
+        legacy = sqlite3.connect(self.legacy_path)
+        for table, (columns, rows) in self.TABLES.items():
+            legacy.execute(f"CREATE TABLE {table} ({', '.join(columns)})")
+            legacy.executemany(f"INSERT INTO {table} VALUES ({', '.join('?' * len(columns))})", rows)
+        legacy.commit()
+        legacy.close()
+
+        self.professional = models.Professional.objects.create_user(
+            'existente@teacare.local', 'existente@teacare.local', 'senha123', full_name='Profissional', crp='06/12345'
+        )
+
+    def run_import(self, **options):
+        call_command('import_legacy_clinical', db_path=self.legacy_path, checkpoint_dir=self.checkpoint_dir, stdout=io.StringIO(), **options)
+
+    def test_resumes_and_remaps_ids(self):
+        original_insert = LegacyImportCommand.insert
+
+        def fail_on_sessions(command, model, instances):
+            if model is models.Session:
+                raise RuntimeError('interrompido')
+            return original_insert(command, model, instances)
+
+        with mock.patch.object(LegacyImportCommand, 'insert', autospec=True, side_effect=fail_on_sessions):
+            with self.assertRaises(RuntimeError):
+                self.run_import()
+        self.assertEqual(models.Patient.objects.count(), 2)
+        self.assertFalse(models.Session.objects.exists())
+
+        with mock.patch.object(models, 'invalidate_cached_users', wraps=models.invalidate_cached_users) as invalidate:
+            self.run_import()
+        # Resumed from the checkpoint: professionals and patients are not copied twice.
+        self.assertEqual(models.Professional.objects.count(), 2)
+        self.assertEqual(models.Patient.objects.count(), 2)
+        invalidate.assert_not_called()
+
+        self.professional.refresh_from_db()
+        self.assertEqual(self.professional.full_name, 'Nome Legado')
+        self.assertTrue(self.professional.check_password('senha123'))
+        self.assertFalse(self.professional.is_superuser)
+        self.assertFalse(self.professional.is_staff)
+
+        ana = models.Patient.objects.get(full_name='Ana Souza')
+        bruno = models.Patient.objects.get(full_name='Bruno Lima')
+        self.assertEqual(ana.professional, self.professional)
+        self.assertEqual(bruno.professional.email, 'novo@teacare.local')
+        session = models.Session.objects.get()
+        self.assertEqual((session.patient, session.professional), (ana, self.professional))
+        audit = models.AuditLog.objects.get()
+        self.assertEqual(audit.entity_id, str(bruno.pk))
+        self.assertEqual(audit.professional, self.professional)
+        self.assertTrue(models.SearchDocument.objects.filter(source=models.SearchDocument.Source.SESSION, object_id=session.pk).exists())
+
+    def test_skip_search_index(self):
+        self.run_import(skip_search_index=True)
+        self.assertTrue(models.Session.objects.exists())
+        self.assertFalse(models.SearchDocument.objects.exists())
+
+    def test_existing_professional_cache_is_invalidated(self):
+        with mock.patch.object(models, 'invalidate_cached_users', wraps=models.invalidate_cached_users) as invalidate:
+            self.run_import()
+        self.assertEqual(list(invalidate.call_args.args[0]), [self.professional.pk])
+
+
+class ReplicaRouterTestCase(TestCase):
+    def setUp(self):
+        use_shared_cache(self)
+        replica_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(replica_dir.cleanup)
+        replica = {**settings.DATABASES['default'], 'NAME': f'{replica_dir.name}/replica.sqlite3'}
+        patcher = mock.patch.dict(settings.DATABASES, {db_router.REPLICA_ALIAS: replica})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.professional = models.Professional.objects.create_user(
+            'replica@teacare.local', 'replica@teacare.local', 'replica123', full_name='Profissional', crp='06/12345'
+        )
+        self.other_professional = models.Professional.objects.create_user(
+            'outro@teacare.local', 'outro@teacare.local', 'outro123', full_name='Outro', crp='06/54321'
+        )
+
+    def test_reads_go_to_replica_only_inside_use_replica(self):
+        self.assertEqual(models.Patient.objects.all().db, 'default')
+        with db_router.use_replica(self.professional.pk):
+            self.assertEqual(models.Patient.objects.all().db, db_router.REPLICA_ALIAS)
+            self.assertEqual(router.db_for_write(models.Patient), 'default')
+
+    def test_writer_is_pinned_to_primary(self):
+        models.Patient.objects.create(
+            professional=self.professional, full_name='Paciente', birth_date=date(2016, 5, 1), sex='F'
+        )
+        with db_router.use_replica(self.professional.pk):
+            self.assertEqual(models.Patient.objects.all().db, 'default')
+        with db_router.use_replica(self.other_professional.pk):
+            self.assertEqual(models.Patient.objects.all().db, db_router.REPLICA_ALIAS)
+
+    def test_local_memory_cache_keeps_reads_on_primary(self):
+        with override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}):
+            with db_router.use_replica(self.professional.pk):
+                self.assertEqual(models.Patient.objects.all().db, 'default')
+
+    def test_replica_is_never_migrated(self):
+        self.assertFalse(router.allow_migrate(db_router.REPLICA_ALIAS, 'clinical', model_name='patient'))
+        self.assertTrue(router.allow_migrate('default', 'clinical', model_name='patient'))
+
+
+class MetricsTestCase(TestCase):
+    def setUp(self):
+        self.metrics_dir = Path(use_temp_metrics_dir(self))
+
+    def exited_pid(self):
+        process = subprocess.Popen([sys.executable, '-c', ''])
+        process.wait()
+        return process.pid
+
+    def test_collect_folds_exited_processes(self):
+        exited = self.metrics_dir / f'{self.exited_pid()}-1.json'
+        running = self.metrics_dir / f'{os.getpid()}-2.json'
+        labels = [['route', 'dashboard']]
+        exited.write_text(json.dumps([['http_requests_total', labels, 3]]))
+        running.write_text(json.dumps([['http_requests_total', labels, 2]]))
+
+        expected = {('http_requests_total', (('route', 'dashboard'),)): 5}
+        self.assertEqual(metrics.collect(), expected)
+        self.assertFalse(exited.exists())
+        self.assertTrue(running.exists())
+        self.assertTrue((self.metrics_dir / metrics.AGGREGATE_FILE).exists())
+        self.assertEqual(metrics.collect(), expected)
+
+    def test_forked_process_gets_its_own_file(self):
+        metrics.inc('review_reminders_sent_total')
+        metrics.flush()
+        with mock.patch.object(metrics.os, 'getpid', return_value=os.getpid() + 1):
+            metrics.flush()
+        pids = sorted(int(path.name.split('-', 1)[0]) for path in self.metrics_dir.glob('*-*.json'))
+        self.assertEqual(pids, [os.getpid(), os.getpid() + 1])
+
+    @override_settings(METRICS_FLUSH_SECONDS=0)
+    def test_only_servers_flush_automatically(self):
+        metrics.inc('review_reminders_sent_total')
+        self.assertEqual(list(self.metrics_dir.iterdir()), [])
+
+    def test_token_is_required_outside_debug(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 200)
+        with override_settings(METRICS_TOKEN='segredo'):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+            response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer segredo')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('# TYPE http_requests_total counter', response.content.decode())
+
+
+class SlowQueryLogTestCase(TestCase):
+    def setUp(self):
+        self.professional = models.Professional.objects.create_user(
+            'lento@teacare.local', 'lento@teacare.local', 'lento123', full_name='Profissional', crp='06/12345'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.professional)
+
+    @override_settings(SLOW_QUERY_LOG_ENABLED=True, SLOW_QUERY_THRESHOLD_MS=0, SERVER_TIMING_SAMPLE_RATE=1)
+    def test_logs_queries_alongside_other_wrappers(self):
+        with mock.patch('core.slow_queries.record_slow_query') as record, mock.patch('core.metrics.observe') as observe:
+            with self.assertLogs('core.instrumentation', 'INFO'):
+                response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('Server-Timing', response)
+        self.assertTrue(record.called)
+        query_counts = [call.args[1] for call in observe.call_args_list if call.args[0] == 'http_request_db_queries']
+        self.assertEqual(query_counts, [record.call_count])
+        self.assertEqual(connection.execute_wrappers, [])
+
+    def test_report_since_accepts_naive_datetime(self):
+        log_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(log_dir.cleanup)
+        log_file = Path(log_dir.name) / 'slow.jsonl'
+        samples = [
+            {'at': '2024-01-01T12:00:00+00:00', 'fingerprint': 'SELECT antigo', 'duration_ms': 900},
+            {'at': '2024-03-01T12:00:00+00:00', 'fingerprint': 'SELECT recente', 'duration_ms': 300},
+        ]
+        log_file.write_text(''.join(json.dumps(sample) + '\n' for sample in samples))
+        stdout = io.StringIO()
+        call_command('slow_query_report', file=str(log_file), since='2024-02-01T00:00:00', json=True, stdout=stdout)
+        self.assertEqual([item['fingerprint'] for item in json.loads(stdout.getvalue())], ['SELECT recente'])
+
+    def test_disabled_by_default(self):
+        with mock.patch('core.slow_queries.record_slow_query') as record:
+            self.client.get(reverse('dashboard'))
+        self.assertFalse(record.called)
@@ -0,0 +1,42 @@
+from django.db import connection, transaction
+from rest_framework_simplejwt.token_blacklist.models import BlacklistedToken, OutstandingToken
+from rest_framework_simplejwt.utils import aware_utcnow
+
+
+def token_table_stats():
+    now = aware_utcnow()
+    stats = {
+        'outstanding': OutstandingToken.objects.count(),
+        'outstanding_expired': OutstandingToken.objects.filter(expires_at__lte=now).count(),
+        'blacklisted': BlacklistedToken.objects.count(),
+    }
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            for key, model in (('outstanding', OutstandingToken), ('blacklisted', BlacklistedToken)):
+                cursor.execute('SELECT pg_total_relation_size(%s)', [model._meta.db_table])
+                stats[f'{key}_bytes'] = cursor.fetchone()[0]
+    return stats
+
+
+def prune_expired_tokens(batch_size=5000, max_batches=None, expired_before=None):
+    """
+    Delete expired outstanding tokens (and their blacklist entries) in bounded
+    batches, each in its own transaction. Returns (outstanding, blacklisted) deleted.
+    """
+    expired_before = expired_before or aware_utcnow()
+    outstanding_deleted = 0
+    blacklisted_deleted = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        ids = list(
+            OutstandingToken.objects.filter(expires_at__lte=expired_before)
+            .order_by('pk')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        if not ids:
+            break
+        with transaction.atomic():
+            blacklisted_deleted += BlacklistedToken.objects.filter(token_id__in=ids).delete()[0]
+            outstanding_deleted += OutstandingToken.objects.filter(pk__in=ids).delete()[0]
+        batches += 1
+    return outstanding_deleted, blacklisted_deleted
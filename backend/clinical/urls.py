@@ -34,6 +34,10 @@ urlpatterns = [
     path('auth/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
     path('auth/me/', views.ProfessionalProfileView.as_view(), name='auth-profile'),
     path('dashboard/', views.DashboardView.as_view(), name='dashboard'),
+    path('search/', views.SearchView.as_view(), name='search'),
+    path('sync/', views.SyncView.as_view(), name='sync'),
+    path('batch/', views.BatchView.as_view(), name='batch'),
+    path('export/<str:table>/', views.ClinicalExportView.as_view(), name='clinical-export'),
     path('', include(router.urls)),
     path('patients/<int:patient_pk>/assessments/', patient_assessment_list, name='patient-assessment-list'),
     path('patients/<int:patient_pk>/assessments/<int:pk>/', patient_assessment_detail, name='patient-assessment-detail'),
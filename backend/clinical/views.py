@@ -1,16 +1,60 @@
+import copy
+import gzip
+import hashlib
+import json
+import logging
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.cache import cache
 from django.db import transaction
-from django.http import FileResponse
+from django.db.models import Count, Max, Q
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, QueryDict, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.urls import Resolver404, resolve
+from django.utils import timezone
+from django.utils.http import parse_etags
 from rest_framework import permissions, status, viewsets, parsers
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from . import models, permissions as clinical_permissions, serializers, services
+
+from core.db_router import reads_from_replica
+
+from . import exports, models, permissions as clinical_permissions, search, serializers, services
 from .constants import DIAGNOSTIC_AXES
 
+logger = logging.getLogger(__name__)
+
 Professional = get_user_model()
 
+PATIENT_LOOKUP_CACHE_TIMEOUT = 60 * 60
+
+SEARCH_MIN_LENGTH = 2
+AGE_BAND_PATTERN = re.compile(r'^(\d{1,3})?-(\d{1,3})?$')
+BOOLEAN_PARAMS = {'true': True, '1': True, 'false': False, '0': False}
+SEARCH_MAX_RESULTS = 100
+
+# Rows committed by transactions that were still open when a cursor was issued
+# can carry an updated_at slightly older than the cursor; re-sending this window
+# keeps them from being skipped (clients upsert by id, so repeats are harmless).
+SYNC_OVERLAP = exports.SINCE_OVERLAP
+
+SYNC_SOURCES = (
+    ('patients', models.Patient, serializers.PatientSerializer),
+    ('assessments', models.Assessment, serializers.AssessmentSerializer),
+    ('diagnostic_assessments', models.DiagnosticAssessment, serializers.DiagnosticAssessmentSerializer),
+    ('therapeutic_plans', models.TherapeuticPlan, serializers.TherapeuticPlanSerializer),
+    ('sessions', models.Session, serializers.SessionSerializer),
+    ('reports', models.Report, serializers.ReportSerializer),
+    ('surveys', models.SatisfactionSurvey, serializers.SatisfactionSurveySerializer),
+    ('family_sessions', models.FamilySession, serializers.FamilySessionSerializer),
+)
+
 
 def log_audit(professional, action, entity, entity_id, metadata=None, request=None):
     models.AuditLog.objects.create(
@@ -41,7 +85,9 @@ class ProfessionalProfileView(APIView):
         return Response(serializer.data)
 
     def put(self, request, *args, **kwargs):
-        serializer = serializers.ProfessionalSerializer(request.user, data=request.data, partial=True)
+        # request.user may come from the authentication cache; update a fresh row.
+        professional = Professional.objects.get(pk=request.user.pk)
+        serializer = serializers.ProfessionalSerializer(professional, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()
         return Response(serializer.data)
@@ -53,7 +99,35 @@ class PatientViewSet(viewsets.ModelViewSet):
     parser_classes = (parsers.JSONParser, parsers.FormParser, parsers.MultiPartParser)
 
     def get_queryset(self):
-        return models.Patient.objects.filter(professional=self.request.user)
+        queryset = models.Patient.objects.filter(professional=self.request.user)
+        if self.action == 'list':
+            queryset = self.filter_list(queryset)
+        return queryset
+
+    def filter_list(self, queryset):
+        params = self.request.query_params
+        if params.get('active'):
+            active = BOOLEAN_PARAMS.get(params['active'].lower())
+            if active is None:
+                raise ValidationError({'active': 'Use true ou false.'})
+            queryset = queryset.filter(active=active)
+        if params.get('sex'):
+            if params['sex'] not in models.Patient.Sex.values:
+                raise ValidationError({'sex': f"Use um dos valores: {', '.join(models.Patient.Sex.values)}."})
+            queryset = queryset.filter(sex=params['sex'])
+        if params.get('age_band'):
+            match = AGE_BAND_PATTERN.match(params['age_band'])
+            if match is None or match.groups() == (None, None):
+                raise ValidationError({'age_band': 'Use o formato min-max em anos (ex.: 3-6, 12- ou -5).'})
+            min_age, max_age = (int(value) if value else None for value in match.groups())
+            earliest, latest = search.birth_date_range(min_age, max_age)
+            if earliest is not None:
+                queryset = queryset.filter(birth_date__gte=earliest)
+            if latest is not None:
+                queryset = queryset.filter(birth_date__lte=latest)
+        if params.get('q', '').strip():
+            queryset = search.patient_typeahead(queryset, params['q'])
+        return queryset
 
     def perform_create(self, serializer):
         patient = serializer.save(professional=self.request.user)
@@ -73,7 +147,45 @@ class PatientViewSet(viewsets.ModelViewSet):
         serializer = serializers.PatientDetailSerializer(patient)
         return Response(serializer.data)
 
+    @action(detail=False, methods=['get'], url_path='lookup')
+    def lookup(self, request):
+        patients = self.get_queryset()
+        today = timezone.localdate()
+        summary = patients.aggregate(last_update=Max('updated_at'), total=Count('id'))
+        # Ages change with the calendar, so the current date is part of the version.
+        version = f"{request.user.pk}:{summary['total']}:{summary['last_update']}:{today}"
+        etag = f'"{hashlib.md5(version.encode()).hexdigest()}"'
+
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            cache_key = f'patient-lookup:{etag}'
+            payload = cache.get(cache_key)
+            if payload is None:
+                rows = [
+                    {'id': pk, 'full_name': full_name, 'active': active, 'age': serializers.calculate_age(birth_date, today)}
+                    for pk, full_name, active, birth_date in patients.order_by('full_name').values_list(
+                        'id', 'full_name', 'active', 'birth_date'
+                    )
+                ]
+                body = json.dumps(rows, ensure_ascii=False).encode('utf-8')
+                payload = (body, gzip.compress(body))
+                cache.set(cache_key, payload, PATIENT_LOOKUP_CACHE_TIMEOUT)
+
+            body, compressed_body = payload
+            if 'gzip' in request.headers.get('Accept-Encoding', ''):
+                response = HttpResponse(compressed_body, content_type='application/json')
+                response['Content-Encoding'] = 'gzip'
+            else:
+                response = HttpResponse(body, content_type='application/json')
+
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        response['Vary'] = 'Accept-Encoding, Authorization'
+        return response
+
     @action(detail=True, methods=['get'], url_path='timeline')
+    @reads_from_replica
     def timeline(self, request, pk=None):
         patient = self.get_object()
         data = {
@@ -99,7 +211,8 @@ class PatientChildBaseViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         patient = self.get_patient()
-        return self.model.objects.filter(patient=patient, professional=self.request.user)
+        # patient is joined because log_audit reads instance.patient.full_name on update/delete
+        return self.model.objects.filter(patient=patient, professional=self.request.user).select_related('patient')
 
     def perform_update(self, serializer):
         instance = serializer.save()
@@ -122,7 +235,7 @@ class TherapeuticPlanViewSet(PatientChildBaseViewSet):
 
     def get_queryset(self):
         patient = self.get_patient()
-        return self.model.objects.filter(patient=patient, professional=self.request.user)
+        return self.model.objects.filter(patient=patient, professional=self.request.user).select_related('patient')
 
 
 class SessionViewSet(PatientChildBaseViewSet):
@@ -135,6 +248,7 @@ class ReportViewSet(PatientChildBaseViewSet):
     model = models.Report
 
     @action(detail=True, methods=['get'], url_path='pdf')
+    @reads_from_replica
     def pdf(self, request, patient_pk=None, pk=None):
         report = self.get_object()
         buffer = services.generate_report_pdf(report)
@@ -158,7 +272,9 @@ class DiagnosticAssessmentViewSet(viewsets.ModelViewSet):
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
-        return models.DiagnosticAssessment.objects.filter(professional=self.request.user)
+        return models.DiagnosticAssessment.objects.filter(professional=self.request.user).select_related(
+            'patient', 'professional'
+        )
 
     def perform_create(self, serializer):
         assessment = serializer.save()
@@ -177,6 +293,7 @@ class DiagnosticAssessmentViewSet(viewsets.ModelViewSet):
         return Response(DIAGNOSTIC_AXES)
 
     @action(detail=True, methods=['get'], url_path='pdf')
+    @reads_from_replica
     def pdf(self, request, pk=None):
         assessment = self.get_object()
         buffer = services.generate_diagnostic_pdf(assessment)
@@ -185,7 +302,226 @@ class DiagnosticAssessmentViewSet(viewsets.ModelViewSet):
 
 
 class DashboardView(APIView):
+    @reads_from_replica
     def get(self, request, *args, **kwargs):
         indicators = services.build_dashboard_context(request.user)
         serializer = serializers.DashboardIndicatorSerializer(indicators)
         return Response(serializer.data)
+
+
+class SearchView(APIView):
+    @reads_from_replica
+    def get(self, request, *args, **kwargs):
+        query = request.query_params.get('q', '').strip()
+        if len(query) < SEARCH_MIN_LENGTH:
+            return Response(
+                {'q': f'Informe ao menos {SEARCH_MIN_LENGTH} caracteres.'}, status=status.HTTP_400_BAD_REQUEST
+            )
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), SEARCH_MAX_RESULTS)
+        except ValueError:
+            return Response({'limit': 'Valor inválido.'}, status=status.HTTP_400_BAD_REQUEST)
+        results = search.search(request.user, query, limit=max(limit, 1))
+        return Response({'query': query, 'results': results})
+
+
+def encode_sync_cursor(moment):
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def decode_sync_cursor(cursor):
+    return datetime.fromtimestamp(int(cursor) / 1_000_000, tz=dt_timezone.utc)
+
+
+class SyncView(APIView):
+    """
+    Changes since `since`, at most SYNC_PAGE_SIZE rows per response. When more
+    rows remain, `next` is a signed token for the following page; the `cursor`
+    to store for the next sync is the same on every page of one sync.
+    """
+
+    PAGE_SALT = 'clinical.sync.page'
+
+    def get(self, request, *args, **kwargs):
+        if request.query_params.get('page'):
+            try:
+                since, cursor, position = self.read_page_token(request.query_params['page'], request.user)
+            except (signing.BadSignature, KeyError, TypeError, ValueError, OverflowError, OSError):
+                return Response({'page': 'Token de página inválido.'}, status=status.HTTP_400_BAD_REQUEST)
+        else:
+            since = None
+            if request.query_params.get('since'):
+                try:
+                    since = decode_sync_cursor(request.query_params['since'])
+                except (TypeError, ValueError, OverflowError, OSError):
+                    return Response({'since': 'Cursor inválido.'}, status=status.HTTP_400_BAD_REQUEST)
+            cursor = timezone.now()
+            position = (0, None, None)
+
+        # Removals older than the retention window may be pruned, so an older
+        # cursor cannot be brought up to date incrementally.
+        if since is not None and since < models.Tombstone.retention_start():
+            return Response(
+                {'since': 'Cursor expirado. Faça uma sincronização completa (sem since).', 'resync': True},
+                status=status.HTTP_410_GONE,
+            )
+
+        remaining = settings.SYNC_PAGE_SIZE
+        changes = {key: {'created': [], 'updated': []} for key, _model, _serializer in SYNC_SOURCES}
+        next_page = None
+        source_index, after_updated_at, after_pk = position
+        for index, (key, model, serializer_class) in enumerate(SYNC_SOURCES):
+            if index < source_index:
+                continue
+            queryset = model.objects.filter(professional=request.user, updated_at__lte=cursor)
+            if since is not None:
+                queryset = queryset.filter(updated_at__gt=since - SYNC_OVERLAP)
+            if index == source_index and after_updated_at is not None:
+                queryset = queryset.filter(
+                    Q(updated_at__gt=after_updated_at) | Q(updated_at=after_updated_at, pk__gt=after_pk)
+                )
+            if model is models.DiagnosticAssessment:
+                queryset = queryset.select_related('patient', 'professional')
+            instances = list(queryset.order_by('updated_at', 'pk')[: remaining + 1])
+            if len(instances) > remaining:
+                instances = instances[:remaining]
+                last = instances[-1] if instances else None
+                next_page = (index, last)
+            remaining -= len(instances)
+            data = serializer_class(instances, many=True, context={'request': request}).data
+            for instance, item in zip(instances, data):
+                if model is not models.Patient:
+                    item['patient_id'] = instance.patient_id
+                if since is None or instance.created_at > since - SYNC_OVERLAP:
+                    changes[key]['created'].append(item)
+                else:
+                    changes[key]['updated'].append(item)
+            if next_page is not None:
+                break
+
+        deleted = []
+        if since is not None and next_page is None:
+            deleted = list(
+                models.Tombstone.objects.filter(
+                    professional=request.user,
+                    deleted_at__gt=since - SYNC_OVERLAP,
+                    deleted_at__lte=cursor,
+                ).values('entity', 'entity_id', 'patient_id', 'deleted_at')
+            )
+
+        next_token = None
+        if next_page is not None:
+            index, last = next_page
+            next_token = signing.dumps(
+                {
+                    'user': request.user.pk,
+                    'since': encode_sync_cursor(since) if since else None,
+                    'cursor': encode_sync_cursor(cursor),
+                    'source': index,
+                    'after': [encode_sync_cursor(last.updated_at), last.pk] if last else None,
+                },
+                salt=self.PAGE_SALT,
+            )
+
+        return Response(
+            {
+                'cursor': encode_sync_cursor(cursor),
+                'full': since is None,
+                'changes': changes,
+                'deleted': deleted,
+                'next': next_token,
+            }
+        )
+
+    def read_page_token(self, token, user):
+        page = signing.loads(token, salt=self.PAGE_SALT)
+        if page['user'] != user.pk:
+            raise ValueError('token de outro profissional')
+        since = decode_sync_cursor(page['since']) if page['since'] else None
+        after_updated_at, after_pk = (decode_sync_cursor(page['after'][0]), page['after'][1]) if page['after'] else (None, None)
+        return since, decode_sync_cursor(page['cursor']), (page['source'], after_updated_at, after_pk)
+
+
+class BatchView(APIView):
+    # Sub-requests are copies of the caller's request that reuse its already
+    # authenticated user and token, so the JWT is verified once per batch;
+    # conditional/encoding headers are dropped so every body is plain JSON.
+    STRIPPED_HEADERS = ('HTTP_IF_NONE_MATCH', 'HTTP_IF_MODIFIED_SINCE', 'HTTP_ACCEPT_ENCODING', 'CONTENT_LENGTH', 'CONTENT_TYPE')
+
+    def post(self, request, *args, **kwargs):
+        serializer = serializers.BatchRequestSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        responses = [self.dispatch_sub_request(request, item['path']) for item in serializer.validated_data['requests']]
+        return Response({'responses': responses})
+
+    def dispatch_sub_request(self, request, raw_path):
+        path, _separator, query_string = raw_path.partition('?')
+        if not path.startswith('/api/'):
+            path = '/api/' + path.lstrip('/')
+        try:
+            match = resolve(path)
+        except Resolver404:
+            match = None
+        if match is None or not hasattr(match.func, 'cls'):
+            return {'path': raw_path, 'status': status.HTTP_404_NOT_FOUND, 'body': {'detail': 'Não encontrado.'}}
+        if getattr(match.func, 'view_class', None) is type(self):
+            return {'path': raw_path, 'status': status.HTTP_400_BAD_REQUEST, 'body': {'detail': 'Lotes aninhados não são permitidos.'}}
+
+        sub_request = copy.copy(request._request)
+        sub_request.method = 'GET'
+        sub_request.path = sub_request.path_info = path
+        sub_request.META = {key: value for key, value in request.META.items() if key not in self.STRIPPED_HEADERS}
+        sub_request.META.update({'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query_string})
+        sub_request.GET = QueryDict(query_string)
+        sub_request.POST = QueryDict()
+        sub_request.resolver_match = match
+        # DRF's Request swaps its authenticators for ForcedAuthentication when these are set.
+        sub_request._force_auth_user = request.user
+        sub_request._force_auth_token = request.auth
+
+        try:
+            response = match.func(sub_request, *match.args, **match.kwargs)
+        except Exception:
+            logger.exception('Falha ao processar sub-requisição em lote: %s', raw_path)
+            return {'path': raw_path, 'status': status.HTTP_500_INTERNAL_SERVER_ERROR, 'body': {'detail': 'Erro interno.'}}
+
+        if hasattr(response, 'data'):
+            body = response.data
+        elif response.streaming or not response.get('Content-Type', '').startswith('application/json'):
+            return {'path': raw_path, 'status': status.HTTP_406_NOT_ACCEPTABLE, 'body': {'detail': 'Somente respostas JSON podem ser agrupadas.'}}
+        else:
+            body = json.loads(response.content or b'null')
+        return {'path': raw_path, 'status': response.status_code, 'body': body}
+
+
+class ClinicalExportView(APIView):
+    permission_classes = [permissions.IsAdminUser]
+
+    @reads_from_replica
+    def get(self, request, table, *args, **kwargs):
+        model = exports.get_export_model(table)
+        if model is None:
+            return Response({'detail': 'Tabela desconhecida.'}, status=status.HTTP_404_NOT_FOUND)
+
+        export_format = request.query_params.get('export_format', 'ndjson')
+        if export_format not in exports.EXPORT_FORMATS:
+            return Response({'detail': 'Formato inválido.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        since = None
+        if request.query_params.get('since'):
+            try:
+                since = exports.parse_since(request.query_params['since'])
+            except ValueError:
+                return Response({'since': 'Data inválida.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        # The body streams after the view returns, outside the replica context,
+        # so pin the database alias chosen now.
+        queryset = exports.export_queryset(model, since)
+        rows = queryset.using(queryset.db).iterator(chunk_size=2000)
+        response = StreamingHttpResponse(
+            exports.gzip_stream(exports.iter_lines(model, export_format, rows)),
+            content_type='application/gzip',
+        )
+        response['Content-Disposition'] = f'attachment; filename="{model._meta.db_table}.{export_format}.gz"'
+        log_audit(request.user, 'export', model.__name__, '*', metadata={'since': since.isoformat() if since else None}, request=request)
+        return response
@@ -7,6 +7,11 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 import os
 from django.core.asgi import get_asgi_application
 
+from core import metrics
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_asgi_application()
+
+# Only server processes publish metrics; management commands and tests do not.
+metrics.enable()
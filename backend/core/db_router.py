@@ -0,0 +1,72 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+
+from core.caching import cache_is_shared
+
+REPLICA_ALIAS = 'replica'
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+def replica_configured():
+    # Pins live in the cache, so without a shared one read-your-writes cannot be
+    # guaranteed across workers and every read stays on the primary.
+    return REPLICA_ALIAS in settings.DATABASES and cache_is_shared()
+
+
+def _pin_key(professional_id):
+    return f'replica-pin:{professional_id}'
+
+
+def pin_to_primary(professional_id):
+    """Send this professional's replica-eligible reads to the primary for the read-your-writes window."""
+    if professional_id and replica_configured():
+        cache.set(_pin_key(professional_id), True, settings.READ_YOUR_WRITES_SECONDS)
+
+
+@contextmanager
+def use_replica(professional_id=None):
+    """Route reads made inside the block to the replica, unless the professional wrote recently."""
+    enabled = replica_configured() and not (professional_id and cache.get(_pin_key(professional_id)))
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def reads_from_replica(view_method):
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        with use_replica(getattr(request.user, 'pk', None)):
+            return view_method(self, request, *args, **kwargs)
+
+    return wrapper
+
+
+class ReplicaRouter:
+    """
+    Reads go to the replica only inside use_replica()/reads_from_replica; all
+    other reads and every write use the default database.
+    """
+
+    def db_for_read(self, model, **hints):
+        if _replica_reads.get():
+            return REPLICA_ALIAS
+        return None
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica receives its schema from the primary through replication.
+        if db == REPLICA_ALIAS:
+            return False
+        return None
@@ -0,0 +1,126 @@
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_current_timings = ContextVar('request_timings', default=None)
+
+
+class RequestTimings:
+    def __init__(self):
+        self.durations = {}
+        self.active = set()
+        self.query_count = 0
+
+    def add(self, name, seconds):
+        self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+
+def current_timings():
+    return _current_timings.get()
+
+
+@contextmanager
+def timed(name):
+    """
+    Add the block's wall time to the current request's Server-Timing entry `name`.
+    No-op outside a sampled request; nested blocks with the same name count once.
+    Also usable as a decorator.
+    """
+    timings = _current_timings.get()
+    if timings is None or name in timings.active:
+        yield
+        return
+    timings.active.add(name)
+    started_at = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - started_at)
+        timings.active.discard(name)
+
+
+def _query_timer(timings):
+    def wrapper(execute, sql, params, many, context):
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            timings.query_count += 1
+            timings.add('db', time.perf_counter() - started_at)
+
+    return wrapper
+
+
+class ServerTimingMiddleware:
+    """
+    For a sampled share of requests (SERVER_TIMING_SAMPLE_RATE), records query count,
+    DB time, serialization, render, CPU and total time, returns them in the
+    Server-Timing header and logs them as one JSON line.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        sample_rate = settings.SERVER_TIMING_SAMPLE_RATE
+        if sample_rate <= 0 or (sample_rate < 1 and random.random() >= sample_rate):
+            return self.get_response(request)
+
+        timings = RequestTimings()
+        token = _current_timings.set(timings)
+        started_at = time.perf_counter()
+        cpu_started_at = time.thread_time()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(_query_timer(timings)))
+                response = self.get_response(request)
+        finally:
+            _current_timings.reset(token)
+        timings.add('cpu', time.thread_time() - cpu_started_at)
+        timings.add('total', time.perf_counter() - started_at)
+
+        response['Server-Timing'] = self.header(timings)
+        self.log(request, response, timings)
+        return response
+
+    def process_template_response(self, request, response):
+        timings = _current_timings.get()
+        if timings is not None:
+            render_started_at = time.perf_counter()
+            response.add_post_render_callback(lambda rendered: timings.add('render', time.perf_counter() - render_started_at))
+        return response
+
+    @staticmethod
+    def header(timings):
+        entries = []
+        for name, seconds in timings.durations.items():
+            entry = f'{name};dur={seconds * 1000:.1f}'
+            if name == 'db':
+                entry += f';desc="{timings.query_count} queries"'
+            entries.append(entry)
+        return ', '.join(entries)
+
+    @staticmethod
+    def log(request, response, timings):
+        match = request.resolver_match
+        logger.info(
+            json.dumps(
+                {
+                    'method': request.method,
+                    'path': request.path,
+                    'url_name': match.view_name if match else None,
+                    'status': response.status_code,
+                    'queries': timings.query_count,
+                    **{f'{name}_ms': round(seconds * 1000, 2) for name, seconds in timings.durations.items()},
+                }
+            )
+        )
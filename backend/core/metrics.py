@@ -0,0 +1,292 @@
+import atexit
+import json
+import math
+import os
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+from django.conf import settings
+from django.db import connections
+
+# name -> (type, help, buckets)
+METRICS = {
+    'http_requests_total': ('counter', 'Requisicoes HTTP por rota, metodo e status.', None),
+    'http_request_duration_seconds': (
+        'histogram',
+        'Latencia das requisicoes HTTP por rota.',
+        (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ),
+    'http_response_size_bytes': (
+        'histogram',
+        'Tamanho do corpo das respostas HTTP por rota.',
+        (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+    ),
+    'http_request_db_queries': (
+        'histogram',
+        'Queries SQL executadas por requisicao, por rota.',
+        (0, 1, 2, 5, 10, 20, 50, 100, 200),
+    ),
+    'pdf_render_duration_seconds': (
+        'histogram',
+        'Tempo de geracao dos PDFs (ReportLab) por documento.',
+        (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+    ),
+    'review_reminders_sent_total': ('counter', 'Lembretes de reavaliacao enviados.', None),
+    'review_reminders_failed_total': ('counter', 'Lembretes de reavaliacao que falharam.', None),
+    'review_reminder_run_duration_seconds': (
+        'histogram',
+        'Duracao de cada execucao do send_review_reminders.',
+        (1, 5, 15, 60, 300, 900, 3600),
+    ),
+}
+
+_lock = threading.Lock()
+_values = {}
+_last_flush = 0.0
+_enabled = False
+# (pid, file name) of this process's snapshot; see _process_file().
+_process_file_name = (None, None)
+AGGREGATE_FILE = 'aggregate.json'
+
+
+def enable():
+    """Publish this process's metrics periodically and at exit; called by the WSGI/ASGI entry points."""
+    global _enabled
+    if not _enabled:
+        _enabled = True
+        atexit.register(flush)
+
+
+def _key(name, labels):
+    return name, tuple(sorted((labels or {}).items()))
+
+
+def inc(name, labels=None, value=1):
+    with _lock:
+        key = _key(name, labels)
+        _values[key] = _values.get(key, 0) + value
+    maybe_flush()
+
+
+def observe(name, value, labels=None):
+    buckets = METRICS[name][2]
+    with _lock:
+        key = _key(name, labels)
+        state = _values.get(key)
+        if state is None:
+            state = _values[key] = {'buckets': [0] * len(buckets), 'sum': 0.0, 'count': 0}
+        for index, bound in enumerate(buckets):
+            if value <= bound:
+                state['buckets'][index] += 1
+                break
+        state['sum'] += value
+        state['count'] += 1
+    maybe_flush()
+
+
+def _metrics_dir():
+    return Path(settings.METRICS_DIR)
+
+
+def _write(path, data):
+    tmp_path = path.with_name(f'.{path.name}.tmp')
+    tmp_path.write_text(json.dumps(data))
+    os.replace(tmp_path, path)
+
+
+def _process_file():
+    """
+    One cumulative file per process lifetime, so a reused pid never overwrites
+    another process; files of processes that exited are folded into AGGREGATE_FILE.
+    Named on first use and again whenever the pid changes, so workers forked from
+    a preloaded parent (gunicorn --preload) don't share the parent's file.
+    """
+    global _process_file_name
+    pid = os.getpid()
+    if _process_file_name[0] != pid:
+        _process_file_name = (pid, f'{pid}-{time.time_ns()}.json')
+    return _process_file_name[1]
+
+
+def flush():
+    """Write this process's cumulative snapshot to METRICS_DIR."""
+    global _last_flush
+    with _lock:
+        payload = [[name, list(labels), value] for (name, labels), value in _values.items()]
+        _last_flush = time.monotonic()
+        path_name = _process_file()
+    if not payload:
+        return
+    directory = _metrics_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    _write(directory / path_name, payload)
+
+
+def maybe_flush():
+    if _enabled and time.monotonic() - _last_flush >= settings.METRICS_FLUSH_SECONDS:
+        flush()
+
+
+def _process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+@contextmanager
+def _locked(directory):
+    if fcntl is None:
+        yield
+        return
+    with open(directory / '.lock', 'a') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _read(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        return None
+
+
+def _add(totals, payload):
+    for name, labels, value in payload:
+        if name not in METRICS:
+            continue
+        key = (name, tuple(tuple(label) for label in labels))
+        current = totals.get(key)
+        if not isinstance(value, dict):
+            totals[key] = (current or 0) + value
+        elif current is None or len(current['buckets']) != len(value['buckets']):
+            totals[key] = {'buckets': list(value['buckets']), 'sum': value['sum'], 'count': value['count']}
+        else:
+            current['buckets'] = [a + b for a, b in zip(current['buckets'], value['buckets'])]
+            current['sum'] += value['sum']
+            current['count'] += value['count']
+
+
+def collect():
+    """
+    Sum the aggregate and the snapshot of every process in METRICS_DIR, first
+    folding the snapshots of processes that have exited into the aggregate.
+    """
+    directory = _metrics_dir()
+    if not directory.exists():
+        return {}
+    with _locked(directory):
+        aggregate = _read(directory / AGGREGATE_FILE) or {'merged': [], 'values': []}
+        totals = {}
+        _add(totals, aggregate['values'])
+        merged = set(aggregate['merged'])
+        exited = []
+        for path in directory.glob('*-*.json'):
+            if path.name in merged:
+                # Folded already; only the unlink was interrupted.
+                path.unlink(missing_ok=True)
+                continue
+            payload = _read(path)
+            if payload is None:
+                continue
+            _add(totals, payload)
+            # Liveness is only checked where signal 0 is a probe (os.kill terminates on Windows).
+            if os.name == 'posix' and not _process_alive(int(path.name.split('-', 1)[0])):
+                exited.append((path, payload))
+
+        if exited:
+            folded = {}
+            _add(folded, aggregate['values'])
+            for _path, payload in exited:
+                _add(folded, payload)
+            _write(
+                directory / AGGREGATE_FILE,
+                {
+                    'merged': [path.name for path, _payload in exited],
+                    'values': [[name, list(labels), value] for (name, labels), value in folded.items()],
+                },
+            )
+            for path, _payload in exited:
+                path.unlink(missing_ok=True)
+    return totals
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _format_bound(bound):
+    return '+Inf' if math.isinf(bound) else repr(float(bound))
+
+
+def render():
+    totals = collect()
+    lines = []
+    for name, (metric_type, help_text, buckets) in METRICS.items():
+        series = sorted((labels, value) for (metric, labels), value in totals.items() if metric == name)
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {metric_type}')
+        for labels, value in series:
+            if metric_type == 'counter':
+                lines.append(f'{name}{_format_labels(labels)} {value}')
+                continue
+            cumulative = 0
+            for bound, count in zip(buckets + (math.inf,), value['buckets'] + [None]):
+                cumulative = value['count'] if count is None else cumulative + count
+                lines.append(f'{name}_bucket{_format_labels(labels, [("le", _format_bound(bound))])} {cumulative}')
+            lines.append(f'{name}_sum{_format_labels(labels)} {value["sum"]}')
+            lines.append(f'{name}_count{_format_labels(labels)} {value["count"]}')
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    """Feeds the per-route latency, response size, status and query-count metrics."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        query_count = 0
+
+        def count_query(execute, sql, params, many, context):
+            nonlocal query_count
+            query_count += 1
+            return execute(sql, params, many, context)
+
+        started_at = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count_query))
+            response = self.get_response(request)
+        duration = time.perf_counter() - started_at
+
+        match = request.resolver_match
+        route = match.view_name if match else 'unmatched'
+        inc('http_requests_total', {'route': route, 'method': request.method, 'status': str(response.status_code)})
+        observe('http_request_duration_seconds', duration, {'route': route})
+        observe('http_request_db_queries', query_count, {'route': route})
+        if not response.streaming:
+            observe('http_response_size_bytes', len(response.content), {'route': route})
+        elif response.has_header('Content-Length'):
+            observe('http_response_size_bytes', int(response['Content-Length']), {'route': route})
+        return response
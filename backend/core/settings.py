@@ -1,7 +1,9 @@
 from datetime import timedelta
 from pathlib import Path
 import os
+import tempfile
 import environ
+from django.core.exceptions import ImproperlyConfigured
 
 # ============================================
 # BASE PATHS
@@ -54,6 +56,9 @@ INSTALLED_APPS = [
 # MIDDLEWARE
 # ============================================
 MIDDLEWARE = [
+    'core.instrumentation.ServerTimingMiddleware',
+    'core.metrics.MetricsMiddleware',
+    'core.slow_queries.SlowQueryMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',  # Necessário pro Render
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -65,6 +70,48 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Fração das requisições instrumentadas (0 desliga, 1 todas): contagem e tempo de queries,
+# serialização, renderização, CPU e PDFs no header Server-Timing e no log core.instrumentation.
+SERVER_TIMING_SAMPLE_RATE = env.float('SERVER_TIMING_SAMPLE_RATE', default=0.0)
+
+# Métricas Prometheus em /metrics: cada worker (processos WSGI/ASGI) grava um snapshot acumulado
+# em METRICS_DIR (no máximo a cada METRICS_FLUSH_SECONDS) e o endpoint soma todos os arquivos,
+# consolidando em aggregate.json os de processos encerrados. Use um diretório local ao host.
+# O endpoint exige "Authorization: Bearer <METRICS_TOKEN>"; sem token só responde com DEBUG=True.
+METRICS_DIR = env('METRICS_DIR', default=str(Path(tempfile.gettempdir()) / 'teacare-metrics'))
+METRICS_FLUSH_SECONDS = env.float('METRICS_FLUSH_SECONDS', default=5.0)
+METRICS_TOKEN = env('METRICS_TOKEN', default='')
+
+# Log de queries lentas (opt-in): queries das requisições acima de SLOW_QUERY_THRESHOLD_MS são gravadas com a
+# origem no app clinical e o plano (EXPLAIN / EXPLAIN QUERY PLAN) capturado em segundo plano,
+# num arquivo rotativo resumido pelo comando slow_query_report.
+SLOW_QUERY_LOG_ENABLED = env.bool('SLOW_QUERY_LOG_ENABLED', default=False)
+SLOW_QUERY_THRESHOLD_MS = env.float('SLOW_QUERY_THRESHOLD_MS', default=200.0)
+SLOW_QUERY_EXPLAIN = env.bool('SLOW_QUERY_EXPLAIN', default=True)
+SLOW_QUERY_LOG_FILE = env('SLOW_QUERY_LOG_FILE', default=str(BASE_DIR / 'logs' / 'slow_queries.jsonl'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'core.instrumentation': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
+if SLOW_QUERY_LOG_ENABLED:
+    LOGGING['formatters'] = {'message': {'format': '%(message)s'}}
+    LOGGING['handlers']['slow_queries'] = {
+        'class': 'logging.handlers.RotatingFileHandler',
+        'filename': SLOW_QUERY_LOG_FILE,
+        'maxBytes': env.int('SLOW_QUERY_LOG_MAX_BYTES', default=10 * 1024 * 1024),
+        'backupCount': env.int('SLOW_QUERY_LOG_BACKUPS', default=5),
+        'formatter': 'message',
+        'delay': True,
+    }
+    LOGGING['loggers']['core.slow_queries'] = {'handlers': ['slow_queries'], 'level': 'WARNING', 'propagate': False}
+
 # ============================================
 # ROOT URLS & WSGI
 # ============================================
@@ -90,6 +137,9 @@ TEMPLATES = [
     },
 ]
 
+# index.html gerado pelo Webpack, servido pelo SPAShellView para as rotas do React
+SPA_INDEX_FILE = BASE_DIR.parent / 'frontend' / 'dist' / 'index.html'
+
 # ============================================
 # DATABASE CONFIG
 # ============================================
@@ -106,6 +156,62 @@ else:
         }
     }
 
+# Perfil SQLite para alta concorrência (opt-in, para clínicas que rodam no SQLite com vários
+# workers do gunicorn): WAL, synchronous, busy_timeout, mmap e cache aplicados a cada conexão
+# (core/sqlite.py) e transações IMMEDIATE para evitar "database is locked" em escritas.
+SQLITE_HIGH_CONCURRENCY = env.bool('SQLITE_HIGH_CONCURRENCY', default=False)
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': env('SQLITE_SYNCHRONOUS', default='NORMAL'),
+    'busy_timeout': env.int('SQLITE_BUSY_TIMEOUT_MS', default=5000),
+    'mmap_size': env.int('SQLITE_MMAP_SIZE', default=128 * 1024 * 1024),
+    # Valor negativo = tamanho em KiB
+    'cache_size': -env.int('SQLITE_CACHE_SIZE_KB', default=64 * 1024),
+    'temp_store': 'MEMORY',
+}
+if SQLITE_HIGH_CONCURRENCY:
+    for database in DATABASES.values():
+        if database['ENGINE'] == 'django.db.backends.sqlite3':
+            database.setdefault('OPTIONS', {})['transaction_mode'] = 'IMMEDIATE'
+
+# Réplica somente leitura opcional para dashboards, linhas do tempo, PDFs e exportações.
+# Para testar localmente aponte para uma cópia do arquivo SQLite (sqlite:////tmp/replica.db);
+# o migrate não roda na réplica, que recebe o schema do principal.
+# Requer CACHE_URL compartilhado (os pins de read-your-writes ficam no cache); com locmem a réplica não é usada.
+database_replica_url = env('DATABASE_REPLICA_URL', default='')
+if database_replica_url:
+    DATABASES['replica'] = env.db('DATABASE_REPLICA_URL')
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+
+# Janela (s) em que leituras de um profissional que acabou de gravar ficam no banco principal.
+READ_YOUR_WRITES_SECONDS = env.int('READ_YOUR_WRITES_SECONDS', default=15)
+
+# Modo de conexão com o banco (DB_CONN_MODE):
+#   none       -> nova conexão a cada requisição (comportamento antigo)
+#   persistent -> conexões reaproveitadas por DB_CONN_MAX_AGE segundos, com health check
+#   pool       -> pool nativo do Django 5.1 (PostgreSQL + psycopg 3 com psycopg[pool]),
+#                 indicado para workers com threads/async
+DB_CONN_MODE = env('DB_CONN_MODE', default='persistent')
+if DB_CONN_MODE not in ('none', 'persistent', 'pool'):
+    raise ImproperlyConfigured(f'DB_CONN_MODE inválido: {DB_CONN_MODE}')
+for database in DATABASES.values():
+    if DB_CONN_MODE == 'none':
+        database['CONN_MAX_AGE'] = 0
+    elif DB_CONN_MODE == 'persistent':
+        database['CONN_MAX_AGE'] = env.int('DB_CONN_MAX_AGE', default=600)
+        database['CONN_HEALTH_CHECKS'] = True
+    else:
+        if 'postgresql' not in database['ENGINE']:
+            raise ImproperlyConfigured('DB_CONN_MODE=pool requer PostgreSQL com psycopg 3.')
+        database['CONN_MAX_AGE'] = 0
+        database.setdefault('OPTIONS', {})['pool'] = {
+            'min_size': env.int('DB_POOL_MIN_SIZE', default=2),
+            'max_size': env.int('DB_POOL_MAX_SIZE', default=10),
+            'timeout': env.int('DB_POOL_TIMEOUT', default=10),
+        }
+
 # ============================================
 # AUTHENTICAÇÃO
 # ============================================
@@ -150,7 +256,7 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # ============================================
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'clinical.authentication.CachedJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -160,6 +266,21 @@ REST_FRAMEWORK = {
     'PAGE_SIZE': 20,
 }
 
+API_BATCH_MAX_REQUESTS = env.int('API_BATCH_MAX_REQUESTS', default=10)
+
+# /api/sync/: linhas por resposta (as demais seguem pelo token `next`) e dias que as
+# remocoes (tombstones) ficam guardadas; cursores mais antigos recebem 410 e fazem sync completo.
+SYNC_PAGE_SIZE = env.int('SYNC_PAGE_SIZE', default=500)
+SYNC_TOMBSTONE_RETENTION_DAYS = env.int('SYNC_TOMBSTONE_RETENTION_DAYS', default=30)
+
+# Cache padrao. locmem e por processo: com varios workers use um cache compartilhado
+# (ex.: redis://127.0.0.1:6379/1, filecache:///var/tmp/teacare-cache ou dbcache://tabela).
+CACHES = {'default': env.cache('CACHE_URL', default='locmemcache://')}
+
+# Tempo (s) que o profissional autenticado fica em cache após validar o JWT.
+# Alterações no cadastro invalidam o cache; só vale com cache compartilhado (com locmem é ignorado).
+JWT_USER_CACHE_TIMEOUT = env.int('JWT_USER_CACHE_TIMEOUT', default=60)
+
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
@@ -176,6 +297,13 @@ SPECTACULAR_SETTINGS = {
     'SERVE_PERMISSIONS': ('rest_framework.permissions.IsAuthenticated',),
 }
 
+# Gerado no deploy por `python manage.py build_openapi_schema`; fora do DEBUG o
+# /api/schema/ serve este arquivo (ou um schema gerado uma vez por processo).
+OPENAPI_SCHEMA_FILE = env(
+    'OPENAPI_SCHEMA_FILE',
+    default=str(BASE_DIR / 'schema' / f"openapi-{SPECTACULAR_SETTINGS['VERSION']}.yaml"),
+)
+
 # ============================================
 # CORS / CSRF
 # ============================================
@@ -0,0 +1,126 @@
+import json
+import logging
+import queue
+import re
+import threading
+import time
+import traceback
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+EXPLAINABLE = re.compile(r'^\s*(SELECT|WITH)\b', re.IGNORECASE)
+
+_explain_queue = queue.Queue(maxsize=200)
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def fingerprint(sql):
+    """Normalize a statement so executions that differ only in literals group together."""
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'\b\d+(?:\.\d+)?\b', '?', sql)
+    sql = sql.replace('%s', '?')
+    sql = re.sub(r'\(\s*\?(?:\s*,\s*\?)+\s*\)', '(?...)', sql)
+    return re.sub(r'\s+', ' ', sql).strip()
+
+
+def clinical_frames(limit=5):
+    """Innermost-first `file:line in function` entries of the current stack inside the clinical app."""
+    clinical_path = apps.get_app_config('clinical').path
+    root = str(Path(clinical_path).parent)
+    frames = [
+        f'{frame.filename[len(root) + 1:]}:{frame.lineno} in {frame.name}'
+        for frame in reversed(traceback.extract_stack())
+        if frame.filename.startswith(clinical_path)
+    ]
+    return frames[:limit]
+
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    started_at = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration_ms = (time.perf_counter() - started_at) * 1000
+        if duration_ms >= settings.SLOW_QUERY_THRESHOLD_MS and threading.current_thread() is not _worker:
+            record_slow_query(context['connection'].alias, sql, params, many, duration_ms)
+
+
+def record_slow_query(alias, sql, params, many, duration_ms):
+    frames = clinical_frames()
+    sample = {
+        'at': timezone.now().isoformat(),
+        'alias': alias,
+        'duration_ms': round(duration_ms, 2),
+        'fingerprint': fingerprint(sql),
+        # Only the parameterized SQL is stored: bound values may carry patient data.
+        'sql': sql,
+        'origin': frames[0] if frames else None,
+        'stack': frames,
+    }
+    explain = settings.SLOW_QUERY_EXPLAIN and not many and EXPLAINABLE.match(sql)
+    try:
+        # The plan is captured off the request thread; params live only in memory until then.
+        _explain_queue.put_nowait((sample, params if explain else None, bool(explain)))
+    except queue.Full:
+        return
+    _ensure_worker()
+
+
+def _ensure_worker():
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_process_samples, name='slow-query-explain', daemon=True)
+            _worker.start()
+
+
+def _process_samples():
+    Path(settings.SLOW_QUERY_LOG_FILE).parent.mkdir(parents=True, exist_ok=True)
+    while True:
+        sample, params, explain = _explain_queue.get()
+        if explain:
+            sample['plan'] = explain_query(sample['alias'], sample['sql'], params)
+        logger.warning(json.dumps(sample, ensure_ascii=False, default=str))
+
+
+def explain_query(alias, sql, params):
+    connection = connections[alias]
+    prefix = 'EXPLAIN QUERY PLAN' if connection.vendor == 'sqlite' else 'EXPLAIN'
+    try:
+        connection.close_if_unusable_or_obsolete()
+        with connection.cursor() as cursor:
+            cursor.execute(f'{prefix} {sql}', params)
+            rows = cursor.fetchall()
+    except Exception as exc:  # the plan is best effort; the sample is logged either way
+        return f'EXPLAIN falhou: {exc}'
+    if connection.vendor == 'sqlite':
+        return '\n'.join(str(row[-1]) for row in rows)
+    return '\n'.join(str(row[0]) for row in rows)
+
+
+class SlowQueryMiddleware:
+    """
+    Times every query of the request and logs the slow ones. Scoped per request
+    with execute_wrapper, like MetricsMiddleware, so nested wrappers cannot drop it.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.SLOW_QUERY_LOG_ENABLED:
+            return self.get_response(request)
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(slow_query_wrapper))
+            return self.get_response(request)
@@ -0,0 +1,9 @@
+from django.conf import settings
+
+
+def apply_sqlite_pragmas(sender, connection, **kwargs):
+    """connection_created hook for the high-concurrency SQLite profile."""
+    if connection.vendor != 'sqlite' or not settings.SQLITE_HIGH_CONCURRENCY:
+        return
+    for pragma, value in settings.SQLITE_PRAGMAS.items():
+        connection.connection.execute(f'PRAGMA {pragma} = {value}')
@@ -0,0 +1,146 @@
+import gzip
+import hashlib
+import json
+import threading
+from pathlib import Path
+
+import yaml
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotFound, HttpResponseNotModified
+from django.utils.crypto import constant_time_compare
+from django.utils.http import parse_etags
+from django.views import View
+from drf_spectacular.views import SpectacularAPIView
+
+import clinical.schema  # noqa: F401  (registers the OpenAPI auth extension)
+
+from . import metrics
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it only gzip is precompressed
+    brotli = None
+
+
+class CachedSpectacularAPIView(SpectacularAPIView):
+    """
+    Serves the OpenAPI document built at deploy time (build_openapi_schema) or,
+    if the file is missing, generated once per process. Live generation on
+    every request only happens with DEBUG enabled.
+    """
+
+    _lock = threading.Lock()
+    _schema = None
+    _version = None
+    _rendered = {}
+
+    def get(self, request, *args, **kwargs):
+        if settings.DEBUG:
+            return super().get(request, *args, **kwargs)
+
+        schema, version = self.load_schema(request)
+        renderer = request.accepted_renderer
+        etag = f'"{version}-{renderer.format}"'
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            body = self._rendered.get(renderer.format)
+            if body is None:
+                body = renderer.render(schema, request.accepted_media_type, self.get_renderer_context())
+                self._rendered[renderer.format] = body
+            response = HttpResponse(body, content_type=request.accepted_media_type)
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def load_schema(self, request):
+        cls = type(self)
+        if cls._schema is None:
+            with cls._lock:
+                if cls._schema is None:
+                    schema_file = Path(settings.OPENAPI_SCHEMA_FILE)
+                    if schema_file.exists():
+                        schema = yaml.safe_load(schema_file.read_text(encoding='utf-8'))
+                    else:
+                        generator = self.generator_class(
+                            urlconf=self.urlconf,
+                            api_version=self.api_version,
+                            patterns=self.patterns,
+                        )
+                        schema = generator.get_schema(request=request, public=self.serve_public)
+                    canonical = json.dumps(schema, sort_keys=True, default=str).encode('utf-8')
+                    cls._rendered = {}
+                    cls._version = hashlib.sha256(canonical).hexdigest()[:16]
+                    cls._schema = schema
+        return cls._schema, cls._version
+
+
+class SPAShellView(View):
+    """
+    Serves the React index.html for client-side routes. The file is read once,
+    stored with gzip/brotli variants and answered with a strong ETag, so a
+    navigation is a byte copy (or a 304) instead of a template render.
+    """
+
+    _lock = threading.Lock()
+    _shell = None
+
+    def get(self, request, *args, **kwargs):
+        shell = self.load_shell()
+        if shell is None:
+            return HttpResponseNotFound('Frontend não compilado (frontend/dist/index.html ausente).')
+
+        accepted = request.headers.get('Accept-Encoding', '')
+        encoding = next(
+            (name for name in ('br', 'gzip') if name in shell['variants'] and name in accepted),
+            'identity',
+        )
+        etag = shell['etag'] if encoding == 'identity' else f'"{shell["digest"]}-{encoding}"'
+
+        if etag in parse_etags(request.headers.get('If-None-Match', '')):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(shell['variants'][encoding], content_type='text/html; charset=utf-8')
+            if encoding != 'identity':
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        response['Vary'] = 'Accept-Encoding'
+        return response
+
+    @classmethod
+    def load_shell(cls):
+        index_file = Path(settings.SPA_INDEX_FILE)
+        try:
+            mtime = index_file.stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+        shell = cls._shell
+        # A new frontend build replaces index.html; re-read it when the file changes.
+        if shell is None or shell['mtime'] != mtime:
+            with cls._lock:
+                shell = cls._shell
+                if shell is None or shell['mtime'] != mtime:
+                    content = index_file.read_bytes()
+                    digest = hashlib.sha256(content).hexdigest()[:32]
+                    variants = {'identity': content, 'gzip': gzip.compress(content, compresslevel=9)}
+                    if brotli is not None:
+                        variants['br'] = brotli.compress(content)
+                    shell = {'mtime': mtime, 'digest': digest, 'etag': f'"{digest}"', 'variants': variants}
+                    cls._shell = shell
+        return shell
+
+
+class MetricsView(View):
+    """Prometheus text exposition of the metrics aggregated from every worker (core.metrics)."""
+
+    def get(self, request, *args, **kwargs):
+        token = settings.METRICS_TOKEN
+        if not token and not settings.DEBUG:
+            # Route and status labels are not public: outside DEBUG a token is mandatory.
+            return HttpResponse(status=403)
+        if token and not constant_time_compare(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return HttpResponse(status=401)
+        metrics.flush()
+        return HttpResponse(metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
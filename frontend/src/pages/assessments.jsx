@@ -21,7 +21,7 @@ export function AssessmentsPage() {
 
   useEffect(() => {
     async function loadPatients() {
-      const { data } = await api.get("/patients/");
+      const { data } = await api.get("/patients/lookup/");
       const result = extractArray(data);
       setPatients(result);
       if (result.length) {
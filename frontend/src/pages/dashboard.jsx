@@ -20,7 +20,8 @@ export function DashboardPage() {
   useEffect(() => {
     async function load() {
       try {
-        const [metricsResponse, patientsResponse] = await Promise.all([api.get("/dashboard/"), api.get("/patients/")]);
+        // lookup fora do /batch/: assim o navegador revalida pelo ETag e recebe 304 quando nada mudou
+        const [metricsResponse, patientsResponse] = await Promise.all([api.get("/dashboard/"), api.get("/patients/lookup/")]);
         setMetrics(metricsResponse.data);
 
         const patientPayload = patientsResponse.data;
@@ -37,7 +37,7 @@ export function DiagnosticAssessmentPage() {
   useEffect(() => {
     async function loadPatients() {
         try {
-          const { data } = await api.get("/patients/");
+          const { data } = await api.get("/patients/lookup/");
           const patientList = extractArray(data);
           setPatients(patientList);
           setSelectedPatient((patientList[0] && String(patientList[0].id)) || "");
@@ -27,7 +27,7 @@ export function InterventionsPage() {
 
   useEffect(() => {
     async function loadPatients() {
-      const { data } = await api.get("/patients/");
+      const { data } = await api.get("/patients/lookup/");
       const list = extractArray(data);
       setPatients(list);
       if (list.length) {
@@ -51,22 +51,30 @@ export function PatientsPage() {
   const isLastStep = currentStep === steps.length - 1;
 
   useEffect(() => {
-    async function load() {
+    const query = search.trim();
+    let cancelled = false;
+    // A busca por nome e feita no servidor (sem acentos, ordenada por relevancia); o atraso evita uma requisicao por tecla.
+    const timer = setTimeout(async () => {
       try {
-        const { data } = await api.get("/patients/");
-        setPatients(extractArray(data));
+        const { data } = await api.get("/patients/", { params: query ? { q: query } : {} });
+        if (!cancelled) {
+          setPatients(extractArray(data));
+        }
       } catch (error) {
         console.error("Erro ao carregar pacientes", error);
       } finally {
         setLoading(false);
       }
-    }
-    load();
-  }, []);
+    }, query ? 250 : 0);
+    return () => {
+      cancelled = true;
+      clearTimeout(timer);
+    };
+  }, [search]);
 
-  const filteredPatients = ensureArray(patients)
-    .filter((patient) => patient.full_name.toLowerCase().includes(search.toLowerCase()))
-    .sort((a, b) => a.full_name.localeCompare(b.full_name));
+  const filteredPatients = search.trim()
+    ? ensureArray(patients)
+    : [...ensureArray(patients)].sort((a, b) => a.full_name.localeCompare(b.full_name));
 
   const handleToggleStatus = async (patientId, currentStatus) => {
     setUpdatingStatusId(patientId);
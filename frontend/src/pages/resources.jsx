@@ -1,7 +1,7 @@
 import React, { useEffect, useState } from "react";
 import { BookOpen, Users } from "lucide-react";
 
-import api from "@/services/api";
+import api, { batchGet } from "@/services/api";
 import { extractArray, ensureArray } from "@/utils/data-helpers";
 
 export function ResourcesPage() {
@@ -21,7 +21,7 @@ export function ResourcesPage() {
 
   useEffect(() => {
     async function loadPatients() {
-      const { data } = await api.get("/patients/");
+      const { data } = await api.get("/patients/lookup/");
       const list = extractArray(data);
       setPatients(list);
       if (list.length) {
@@ -36,9 +36,9 @@ export function ResourcesPage() {
       if (!selectedPatient) {
         return;
       }
-      const [familyResponse, surveyResponse] = await Promise.all([
-        api.get(`/patients/${selectedPatient}/family-sessions/`),
-        api.get(`/patients/${selectedPatient}/surveys/`)
+      const [familyResponse, surveyResponse] = await batchGet([
+        `/patients/${selectedPatient}/family-sessions/`,
+        `/patients/${selectedPatient}/surveys/`
       ]);
       setFamilySessions(extractArray(familyResponse.data));
       setSurveys(extractArray(surveyResponse.data));
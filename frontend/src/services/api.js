@@ -93,4 +93,16 @@ api.interceptors.response.use(
   }
 );
 
+export const batchGet = async (paths) => {
+  const { data } = await api.post("/batch/", { requests: paths.map((path) => ({ path })) });
+  return (data?.responses || []).map((item) => {
+    if (item.status >= 400) {
+      const error = new Error(`Falha na requisicao em lote: ${item.path}`);
+      error.response = { status: item.status, data: item.body };
+      throw error;
+    }
+    return { data: item.body, status: item.status };
+  });
+};
+
 export default api;